@@ -72,6 +72,10 @@ tile_instrnMem_size = 2048 # in entries
 # num_tile_compute: positive integer
 # inj_rate < 0.2 (depends on the mapping)
 # num_port: 4, 8
+# noc_model: 'fixed' (noc_intra_lat within a node, noc_inter_lat added across nodes), 'cmesh' (latency by the route in a
+#   cmesh of noc_num_port/2 dimensions with cmesh_c tiles per router - see node_modules.noc)
+# noc_contention: 0 (unlimited link bandwidth), 1 (a packet holds each link & the ejection port on its route for
+#   packet_width cycles - packets competing for them are serialized)
 
 # Fixed parameters
 # NOC topology: cmesh (n=2, k=4, c=4) - can fit k*n*c tiles
@@ -87,6 +91,8 @@ num_tile_max = 168.0 # maximum number of tiles per node
 num_inj_max = num_tile_max # [conservative] max number of packet injections that can occur in a cycle (each tile injects a packet into NOC each cycle)
 noc_inj_rate = 0.005
 noc_num_port = 4
+noc_model = 'fixed'
+noc_contention = 0
 
 ## Node parameters - Our way of simulation just assumes all tile in one actual node
 num_node = 1
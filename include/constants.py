@@ -500,6 +500,8 @@ noc_intra_lat = noc_lat_dict[str(cfg.noc_inj_rate)]
 noc_intra_pow_dyn = noc_pow_dyn_dict[str(cfg.noc_num_port)] # per router
 noc_intra_pow_leak = noc_pow_leak_dict[str(cfg.noc_num_port)]# per router
 noc_intra_area = noc_area_dict[str(cfg.noc_num_port)] # per router
+# cmesh noc model - router pipeline & link traversal per hop (noc_intra_lat is the average over the routes in a node)
+noc_hop_lat = 2
 
 # Hypertransport network (HT)
 # Note HT is external to a node, but we consider all tiles in one
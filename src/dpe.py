@@ -1,6 +1,3 @@
-from functools import partial
-from multiprocessing import Pool
-
 #****************************************************************************************
 # Designed by - Aayush Ankit
 #               School of Elctrical and Computer Engineering
@@ -22,7 +19,6 @@ from multiprocessing import Pool
 import time
 
 import sys
-import getopt
 import os
 import argparse
 
@@ -43,25 +39,171 @@ from record_xbar import *
 from hw_stats import *
 import numpy as np
 
-import argparse
-import config as cfg
-import constants
-import ima_modules
-import ima
-import tile_modules
+import dpe_config
+import ima_sample
+import ima_loop
+import ima_tlm
 import tile
-import node_modules
 import node
-import ima_metrics
-import tile_metrics
-import node_metrics
+import node_parallel
+import node_checkpoint
+import node_functional
+import run_cache
+import tile_dedup
+import tile_replay
+import heartbeat as hb
+import noc_stats
 
 compiler_path = os.path.join(root_dir, "test/testasm/")
 trace_path = os.path.join(root_dir, "test/traces/")
+snapshot_path = os.path.join(root_dir, "test/snapshots/")
+cache_path = os.path.join(root_dir, "test/cache/")
 
 class DPE:
 
-    def run(self, net):
+    # config - dpe_config of the simulated node (default: include/config.py & constants.py)
+    def __init__(self, config = None):
+        self.config = dpe_config.get_config(config)
+
+    # Read the input data (input.npy) into the input tile's edram
+    def load_input(self, temp_tile):
+        inp_filename = self.instrnpath + 'input.npy'
+        assert (os.path.exists(inp_filename)
+                ), 'Input Error: Provide input before running the DPE'
+        inp = np.load(inp_filename).item()
+        self.write_input(temp_tile, inp)
+
+    # Write the input data (dict of data/counter/valid arrays) into the input tile's edram
+    def write_input(self, temp_tile, inp):
+        print ('length of input data:', len(inp['data']))
+        for i in range(len(inp['data'])):
+            data = float2fixed(inp['data'][i], temp_tile.cfg.int_bits, temp_tile.cfg.frac_bits)
+            temp_tile.edram_controller.mem.memfile[i] = data
+            temp_tile.edram_controller.counter[i] = int(
+                inp['counter'][i])
+            temp_tile.edram_controller.valid[i] = int(
+                inp['valid'][i])
+
+    # Program DNN weights of tile i on its xbars
+    def program_weights(self, temp_tile, i):
+        print ('Programming weights of tile no: ', i)
+        for j in range(temp_tile.cfg.num_ima):
+            print ('Programming ima no: ', j)
+            for k in range(temp_tile.cfg.num_matrix):
+                for l in range(temp_tile.cfg.phy2log_ratio):
+                    wt_filename = self.instrnpath + 'weights/tile' + str(i) + '/core'+str(j)+\
+                            '/mat'+str(k)+'-phy_xbar'+str(l)+'.npy'
+                    if (os.path.exists(wt_filename)):  # check if weights for the xbar exist
+                        print ('wtfile exits: ' + 'tile ' + str(i) +
+                               'ima ' + str(j) + 'matrix ' + str(k) + 'xbar' + str(l))
+                        wt_temp = np.load(wt_filename)
+                        temp_tile.ima_list[j].matrix_list[k]['f'][l].program(wt_temp)
+                        temp_tile.ima_list[j].matrix_list[k]['b'][l].program(wt_temp)
+
+    ### Initialize the tiles of node_dut - all tiles, or the partition of a parallel worker (see node_parallel)
+    # Simulation modes are set up, the input data is loaded & the weights are programmed
+    def init_node(self, node_dut, record = 0, sample = 0, warmup = 2, loop_forward = 0, transaction = 0, dedup = 0,
+            snapshot = 0):
+        # Initialize the node with instrn & trace paths
+        # instrnpath provides instrns for tile & resident imas
+        # tracepath is where all tile & ima traces will be stored
+        node_dut.node_init(self.instrnpath, self.tracepath)
+
+        # Record the packets delivered by the noc (for single-tile replay)
+        if (record):
+            node_dut.noc_record = []
+
+        # Sampled simulation: loop iterations of imas are simulated in detail till sampled, then functionally
+        if (sample):
+            ima_sample.sample_init (node_dut, warmup, sample)
+
+        # Loop fast-forward: steady-state loop iterations of imas are executed at once (same results)
+        if (loop_forward):
+            ima_loop.loop_init (node_dut)
+
+        # Transaction-level timing: instructions of imas execute atomically, only ld/st/hlt run in their cycle
+        if (transaction):
+            assert (not sample and not loop_forward), 'transaction-level imas have no pipeline to sample/fast-forward'
+            ima_tlm.tlm_init (node_dut)
+
+        # Tile deduplication: one representative per class of tiles with the same program is simulated in detail
+        if (dedup):
+            dedup_list = tile_dedup.dedup_init (node_dut, self.instrnpath)
+            print ('Tile deduplication (approximate): ' + str(len(dedup_list)) + ' classes ' + str(dedup_list))
+
+        # Read the input data (input.t7) into the input tile's edram
+        inp_tileId = 0
+        if (node_dut.tile_list[inp_tileId] != None):
+            self.load_input(node_dut.tile_list[inp_tileId])
+
+        # Snapshot cache: map the xbar values programmed by an earlier run of the same net (weights & config)
+        if (snapshot):
+            snapshot_dir = snapshot_path + node_checkpoint.snapshot_key (self.instrnpath, self.config)
+        if (snapshot and os.path.exists(snapshot_dir)):
+            node_checkpoint.load_snapshot (snapshot_dir, node_dut)
+            print ('Weights restored from snapshot: ' + snapshot_dir)
+        else:
+            ## Program DNN weights on the xbars
+            for i in range(1, node_dut.cfg.num_tile):
+                if (node_dut.tile_list[i] != None):
+                    self.program_weights(node_dut.tile_list[i], i)
+            # a partition can't be saved as a snapshot of the net
+            if (snapshot and None not in node_dut.tile_list):
+                if not os.path.exists(snapshot_path):
+                    os.makedirs(snapshot_path)
+                node_checkpoint.save_snapshot (snapshot_dir, node_dut)
+                print ('Weights saved to snapshot: ' + snapshot_dir)
+
+    ### Serial run loop - simulate node_dut from cycle till it halts, reaches cycles_max or deadlocks (returns the
+    # cycle count). Shared by run and dpe_session.infer
+    # fast_forward - jump over cycles in which all tiles/imas/noc only count down latencies
+    # deadlock_window - abort if the node makes no progress (see node_progress, node_busy) for this many cycles
+    # (0 - never). Progress is checked every deadlock_window/10 cycles - fast-forward stops at the checks, so runs
+    # with and without it abort in the same cycle
+    # reporter - progress heartbeat (None - none)
+    # checkpoint - save the node state to checkpoint_file every checkpoint cycles (0 - never)
+    # loop_state - [progress, progress_cycle, check_cycle] of deadlock detection saved with a checkpoint (None - new run)
+    def run_loop(self, node_dut, cycle, fast_forward = 0, deadlock_window = 0, reporter = None, checkpoint = 0,
+            checkpoint_file = '', loop_state = None):
+        cycles_max = node_dut.cfg.cycles_max
+        if (loop_state == None):
+            loop_state = [node_dut.node_progress(), cycle, cycle]
+        [progress, progress_cycle, check_cycle] = loop_state
+        check_interval = max (1, deadlock_window / 10)
+        next_checkpoint = cycle + checkpoint
+        while (not node_dut.node_halt and cycle < cycles_max):
+            node_dut.node_run(cycle)
+            cycle = cycle + 1
+            # Event-driven mode: jump over cycles in which all tiles/imas/noc only count down latencies
+            # Note: per-cycle debug traces are not written for the skipped cycles
+            if (fast_forward and not node_dut.node_halt):
+                next_cycle = min (node_dut.node_next_event (cycle-1), cycles_max)
+                if (deadlock_window):
+                    next_cycle = min (next_cycle, check_cycle + check_interval)
+                node_dut.node_skip (next_cycle - cycle)
+                cycle = next_cycle
+            if (reporter != None):
+                reporter.update(node_dut, cycle)
+            if (deadlock_window and cycle - check_cycle >= check_interval):
+                check_cycle = cycle
+                temp_progress = node_dut.node_progress()
+                if (temp_progress != progress or node_dut.node_busy(cycle)):
+                    progress = temp_progress
+                    progress_cycle = cycle
+                elif (cycle - progress_cycle >= deadlock_window):
+                    break
+            # Checkpoint: save the node state every checkpoint cycles (a later run can --resume from it)
+            if (checkpoint and cycle >= next_checkpoint and not node_dut.node_halt):
+                node_dut.node_sync (cycle-1)
+                node_checkpoint.save_checkpoint (checkpoint_file, node_dut, cycle, \
+                        [progress, progress_cycle, check_cycle])
+                next_checkpoint = cycle + checkpoint
+        return cycle
+
+    def run(self, net, fast_forward = 0, active_set = 0, num_proc = 1, multi_node = 0, deadlock_window = 0,
+            checkpoint = 0, resume = 0, snapshot = 0, dedup = 0, record = 0, replay = -1, sample = 0,
+            warmup = 2, loop_forward = 0, transaction = 0, functional = 0, cache = 0, cache_dir = cache_path,
+            cache_size = 1024, cache_shared = 0, heartbeat = 5.0, heartbeat_file = ''):
         print(test_dir)
         instrndir = compiler_path + net
         #tracedir = os.path.join(os.path.join(test_dir, 'traces'), net.split('/')[-1])
@@ -72,13 +214,13 @@ class DPE:
         assert (os.path.exists(instrndir) ==1), 'Instructions for net missing: generate intuctions (in folder hierarchy) hierarchy'
         '''if not os.path.exists(instrndir):
             os.makedirs(instrndir)
-            for i in range (cfg.num_tile):
+            for i in range (self.config.cfg.num_tile):
                 temp_tiledir = instrndir + '/tile' + str(i)
                 os.makedirs(temp_tiledir)'''
 
         if not os.path.exists(tracedir):
             os.makedirs(tracedir)
-        for i in range(cfg.num_tile):
+        for i in range(self.config.cfg.num_tile):
             temp_tiledir = tracedir + '/tile' + str(i)
             if not os.path.exists(temp_tiledir):
                 os.makedirs(temp_tiledir)
@@ -86,87 +228,299 @@ class DPE:
         self.instrnpath = instrndir + '/'
         self.tracepath = tracedir + '/'
 
-        # Instantiate the node under test
-        # A physical node consists of several logical nodes equal to the actual node size
-        node_dut = node.node()
+        # Single-tile replay: simulate one tile fed by the noc traffic of an earlier --record run
+        record_file = self.tracepath + 'noc_record.npy'
+        if (replay >= 0):
+            self.run_replay (replay, record_file)
+            return
 
-        # Initialize the node with instrn & trace paths
-        # instrnpath provides instrns for tile & resident imas
-        # tracepath is where all tile & ima traces will be stored
-        node_dut.node_init(self.instrnpath, self.tracepath)
+        # Result cache: runs with the same net files, config/constants values & result-changing options are looked up
+        # by their hash (results are copied to the trace directory, traces aren't written)
+        if (cache):
+            assert (not (resume or checkpoint or record)), 'cached runs write only output & stats files'
+            cache_key = run_cache.run_key (self.instrnpath, {'dedup':dedup, 'sample':sample, 'warmup':warmup, \
+                    'transaction':transaction, 'functional':functional, 'deadlock_window':deadlock_window}, self.config)
+            [hit, metric_dict] = run_cache.cache_load (cache_dir, cache_key, self.tracepath)
+            if (hit):
+                print ('Result cache hit: ' + cache_key + ' (results copied to ' + self.tracepath + ')')
+                return metric_dict
+            print ('Result cache miss: ' + cache_key)
 
-        # Read the input data (input.t7) into the input tile's edram
-        inp_filename = self.instrnpath + 'input.npy'
-        inp_tileId = 0
-        assert (os.path.exists(inp_filename)
-                ), 'Input Error: Provide input before running the DPE'
-        inp = np.load(inp_filename).item()
-        print ('length of input data:', len(inp['data']))
-        for i in range(len(inp['data'])):
-            data = float2fixed(inp['data'][i], cfg.int_bits, cfg.frac_bits)
-            node_dut.tile_list[inp_tileId].edram_controller.mem.memfile[i] = data
-            node_dut.tile_list[inp_tileId].edram_controller.counter[i] = int(
-                inp['counter'][i])
-            node_dut.tile_list[inp_tileId].edram_controller.valid[i] = int(
-                inp['valid'][i])
+        # Resume a checkpointed simulation (node state incl. programmed weights is restored from the checkpoint)
+        checkpoint_file = self.tracepath + 'checkpoint.pkl'
+        if (resume):
+            assert (os.path.exists(checkpoint_file)), 'Resume Error: no checkpoint in the trace directory'
+            [node_dut, cycle, loop_state] = node_checkpoint.load_checkpoint (checkpoint_file)
+            assert (node_dut.active_set == active_set), 'Resume Error: checkpoint was saved with a different active_set'
+            assert (not record or node_dut.noc_record != None), 'Resume Error: checkpoint was saved without --record'
+            assert ((node_dut.tile_list[0].ima_list[0].sample != None) == (sample > 0)), \
+                    'Resume Error: checkpoint was saved with a different --sample'
+            assert ((node_dut.tile_list[0].ima_list[0].loop != None) == loop_forward), \
+                    'Resume Error: checkpoint was saved with a different --loop_forward'
+            assert ((node_dut.tile_list[0].ima_list[0].tlm != None) == transaction), \
+                    'Resume Error: checkpoint was saved with a different --transaction'
+            assert (not functional), 'Resume Error: functional mode has no cycles to resume'
+            print ('Resuming from checkpoint at cycle: ' + str(cycle))
+        else:
+            # Parallel modes: the workers instantiate & initialize the tiles of their partitions, the node of this
+            # process has no tiles - it coordinates the workers (see node_parallel)
+            split_list = []
+            if (num_proc > 1 or multi_node):
+                node_dut = node.node(active_set, self.config, [])
+                if (multi_node):
+                    split_list = node_parallel.node_split(node_dut.noc)
+                else:
+                    split_list = node_parallel.tile_split(node_dut, num_proc)
+            if (len(split_list) <= 1):
+                # Instantiate the node under test
+                # A physical node consists of several logical nodes equal to the actual node size
+                node_dut = node.node(active_set, self.config)
 
-        ## Program DNN weights on the xbars
-        for i in range(1, cfg.num_tile):
-            print ('Programming weights of tile no: ', i)
-            for j in range(cfg.num_ima):
-                print ('Programming ima no: ', j)
-                for k in range(cfg.num_matrix):
-                    for l in range(cfg.phy2log_ratio):
-                        wt_filename = self.instrnpath + 'weights/tile' + str(i) + '/core'+str(j)+\
-                                '/mat'+str(k)+'-phy_xbar'+str(l)+'.npy'
-                        if (os.path.exists(wt_filename)):  # check if weights for the xbar exist
-                            print ('wtfile exits: ' + 'tile ' + str(i) +
-                                   'ima ' + str(j) + 'matrix ' + str(k) + 'xbar' + str(l))
-                            wt_temp = np.load(wt_filename)
-                            node_dut.tile_list[i].ima_list[j].matrix_list[k]['f'][l].program(wt_temp)
-                            node_dut.tile_list[i].ima_list[j].matrix_list[k]['b'][l].program(wt_temp)
+                self.init_node(node_dut, record, sample, warmup, loop_forward, transaction, dedup, snapshot)
 
         #raw_input ('Press Enter')
 
         # Run all the tiles
-        cycle = 0
+        if (not resume):
+            cycle = 0
+            loop_state = None
         start = time.time()
-        while (not node_dut.node_halt and cycle < cfg.cycles_max):
-            node_dut.node_run(cycle)
-            cycle = cycle + 1
+        # Progress heartbeats every heartbeat wall-seconds (json lines to heartbeat_file) - none in functional mode
+        heartbeat_fid = open(heartbeat_file, 'w') if (heartbeat_file != '') else None
+        reporter = None
+        # Parallel modes (same results): tiles are split across num_proc processes (tile-parallel) or
+        # each logical node runs in its own process (multi-node)
+        if (functional):
+            # Functional mode: programs interpreted in dependency order, no timing (outputs only)
+            assert (num_proc == 1 and not multi_node), 'functional mode runs in a single process'
+            assert (not fast_forward and not active_set and not checkpoint), \
+                    'functional mode has no cycles to skip/checkpoint'
+            assert (not dedup and not record), 'functional mode has no timing to replay/record'
+            assert (not sample and not loop_forward and not transaction), 'functional mode has no ima timing'
+            cycle = node_functional.functional_run (node_dut)
+        elif (num_proc > 1 or multi_node):
+            assert (not fast_forward and not active_set), 'parallel modes run every cycle of their tiles'
+            assert (not checkpoint and not resume), 'checkpoints are supported in serial mode only'
+            assert (not dedup), 'followers replay their representative (simulated in the same process)'
+            assert (not record), 'noc record is supported in serial mode only'
+            assert (not sample), 'sampled simulation is supported in serial mode only'
+            assert (not node_dut.noc.noc_contention), 'noc contention is modeled by the delivery heap of node_run (serial mode only)'
+            if (len(split_list) == 1):
+                # a single partition (e.g. one logical node) has nothing to run in parallel - serial run loop
+                print ('Parallel simulation: a single partition - simulated serially')
+                reporter = hb.heartbeat(node_dut, cycle, node_dut.cfg.cycles_max, heartbeat, heartbeat_fid)
+                cycle = self.run_loop(node_dut, cycle, 0, deadlock_window, reporter)
+            else:
+                reporter = hb.heartbeat(node_dut, cycle, node_dut.cfg.cycles_max, heartbeat, heartbeat_fid, ['node', 'noc'])
+                init_func = lambda node_part: self.init_node(node_part, loop_forward = loop_forward, \
+                        transaction = transaction, snapshot = snapshot)
+                cycle = node_parallel.node_run_parallel(node_dut, split_list, init_func, self.tracepath, \
+                        node_dut.cfg.cycles_max, deadlock_window, reporter)
+        else:
+            assert (not (dedup and (fast_forward or active_set))), \
+                    'tile deduplication runs every cycle of all tiles with tile_run'
+            assert (not (dedup and sample)), 'followers replay their representative - its imas are not sampled'
+            assert (not (sample and loop_forward)), 'sampled imas execute loop iterations functionally'
+            reporter = hb.heartbeat(node_dut, cycle, node_dut.cfg.cycles_max, heartbeat, heartbeat_fid)
+            cycle = self.run_loop(node_dut, cycle, fast_forward, deadlock_window, reporter, checkpoint, checkpoint_file,
+                    loop_state)
+        # Active-set mode: sleeping tiles/imas catch up till the last cycle (if node didn't halt)
+        node_dut.node_sync (cycle-1)
+        if (reporter != None):
+            reporter.finish(node_dut, cycle)
+        if (heartbeat_fid != None):
+            heartbeat_fid.close()
+
+        # Deadlock - report what the tiles/imas are blocked on
+        if (not node_dut.node_halt and functional):
+            print ('Deadlock: no progress in round ' + str(cycle) + ' - functional run aborted')
+            for temp_str in node_dut.node_diagnose():
+                print (temp_str)
+        elif (not node_dut.node_halt and cycle < node_dut.cfg.cycles_max):
+            print ('Deadlock: no progress (window ' + str(deadlock_window) + ' cycles) - simulation aborted at cycle ' + \
+                    str(cycle))
+            for temp_str in node_dut.node_diagnose():
+                print (temp_str)
 
         end = time.time()
         print ('simulation time: ' + str(end-start) + 'secs')
+        if (functional):
+            print ('Functional mode: ' + str(cycle) + ' rounds')
+        if (loop_forward):
+            [num_iter, num_cycle] = ima_loop.loop_stats (node_dut)
+            print ('Loop fast-forward: ' + str(num_iter) + ' iterations (' + str(num_cycle) + ' ima cycles) fast-forwarded')
+
+        if (node_dut.noc_record != None):
+            tile_replay.save_record (record_file, node_dut.noc_record)
+            print ('Noc record saved: ' + str(len(node_dut.noc_record)) + ' packets')
 
-        # For DEBUG only - dump the contents of all tiles
+        # For DEBUG only - dump the contents of all tiles (parallel modes - dumped by the workers)
         # NOTE: Output and input tiles are dummy tiles to enable self-contained simulation
-        if (cfg.debug):
+        if (node_dut.cfg.debug and node_dut.tile_result_list == None):
             node_dump(node_dut, self.tracepath)
 
         # Dump the contents of output tile (DNN output) to output file (output.txt)
         output_file = self.tracepath + 'output.txt'
         fid = open(output_file, 'w')
-        tile_id = cfg.num_tile - 1
+        tile_id = node_dut.cfg.num_tile - 1
+        if (node_dut.tile_result_list != None):
+            memfile = node_dut.tile_result_list[tile_id]['memfile']
+        else:
+            memfile = node_dut.tile_list[tile_id].edram_controller.mem.memfile
         mem_dump(
-            fid, node_dut.tile_list[tile_id].edram_controller.mem.memfile, 'EDRAM')
+            fid, memfile, 'EDRAM')
         fid.close()
         print('Output Tile dump finished')
 
         # Dump the harwdare access traces (For now - later upgrade to actual energy numbers)
         hwtrace_file = self.tracepath + 'harwdare_stats.txt'
         fid = open(hwtrace_file, 'w')
-        metric_dict = get_hw_stats(fid, node_dut, cycle)
+        if (node_dut.dedup_list):
+            tile_dedup.dedup_finish (node_dut)
+            fid.write ('APPROXIMATE: tile deduplication - tiles ' + str(node_dut.dedup_list) + \
+                    ' (first of each class simulated)\n')
+            print ('Note: results are approximate (tile deduplication)')
+        if (sample):
+            fid.write ('APPROXIMATE: sampled simulation - cycles & ima access counts extrapolated (see sampling_stats.txt)\n')
+            print ('Note: results are approximate (sampled simulation)')
+        metric_dict = None
+        if (functional):
+            fid.write ('FUNCTIONAL: no timing - cycles & access counts not modeled (see output.txt)\n')
+            print ('Note: no hardware results (functional mode)')
+        else:
+            metric_dict = get_hw_stats(fid, node_dut, cycle)
         fid.close()
+
+        # NoC statistics - flows, packet delays, links & send_queues (see noc_stats)
+        if (not functional):
+            fid = open(self.tracepath + 'noc_stats.txt', 'w')
+            stats_dict = noc_stats.get_noc_stats(fid, node_dut, cycle)
+            fid.close()
+            np.save(self.tracepath + 'noc_stats.npy', stats_dict)
+
+        # Sampled simulation - extrapolated cycles & access counts with confidence bounds
+        if (sample):
+            fid = open(self.tracepath + 'sampling_stats.txt', 'w')
+            cycle_bound = ima_sample.sample_stats(fid, node_dut, cycle)
+            fid.close()
+            print ('Sampled simulation: cycles ' + str(cycle) + ' +- ' + str(int(np.ceil(cycle_bound))) + ' (95% confidence & switch error)')
         print('Success: Hardware results compiled!!')
 
+        if (cache):
+            name_list = run_cache.result_list[:2]
+            if (not functional):
+                name_list = run_cache.result_list[:4]
+            if (sample):
+                name_list = run_cache.result_list
+            run_cache.cache_save (cache_dir, cache_key, self.tracepath, metric_dict, cache_size, cache_shared, name_list)
+        return metric_dict
+
+    ### Simulate tile tile_id alone - packets arrive (leave) as recorded (traces in the replay/tile<tile_id> directory)
+    def run_replay(self, tile_id, record_file):
+        assert (os.path.exists(record_file)), 'Replay Error: no noc record in the trace directory (run with --record)'
+        assert (0 <= tile_id < self.config.cfg.num_tile), 'Replay Error: tile_id out of range'
+        replaydir = self.tracepath + 'replay/tile' + str(tile_id) + '/'
+        if not os.path.exists(replaydir):
+            os.makedirs(replaydir)
+
+        temp_tile = tile.tile(config = self.config)
+        temp_tile.tile_init(self.instrnpath + 'tile' + str(tile_id) + '/', replaydir)
+        if (tile_id == 0):
+            self.load_input(temp_tile)
+        else:
+            self.program_weights(temp_tile, tile_id)
+
+        start = time.time()
+        fid = open(replaydir + 'tile_trace.txt', 'w')
+        cycle = tile_replay.tile_replay(temp_tile, tile_id, tile_replay.load_record(record_file), fid, temp_tile.cfg.cycles_max)
+        fid.close()
+        end = time.time()
+        if (temp_tile.tile_halt):
+            print ('Tile ' + str(tile_id) + ' halted at cycle: ' + str(cycle-1))
+        else:
+            print ('Tile ' + str(tile_id) + ' did not halt in ' + str(cycle) + ' cycles')
+        print ('simulation time: ' + str(end-start) + 'secs')
+
+        if (temp_tile.cfg.debug):
+            tile_dump(temp_tile, replaydir + 'memsim.txt')
+        if (tile_id == temp_tile.cfg.num_tile - 1):
+            fid = open(replaydir + 'output.txt', 'w')
+            mem_dump(fid, temp_tile.edram_controller.mem.memfile, 'EDRAM')
+            fid.close()
+
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "-n", "--net", help="The net name as it is in test/testasm.", default='large')
+    parser.add_argument(
+        "-f", "--fast_forward", help="Skip cycles in which no tile/ima/noc changes state (same results).",
+        action='store_true')
+    parser.add_argument(
+        "-a", "--active_set", help="Simulate only tiles/imas with a pending event in a cycle (same results).",
+        action='store_true')
+    parser.add_argument(
+        "-p", "--num_proc", help="Split the tiles across NUM_PROC processes (same results).",
+        type=int, default=1)
+    parser.add_argument(
+        "-m", "--multi_node", help="Run each logical node in its own process (same results).",
+        action='store_true')
+    parser.add_argument(
+        "-d", "--deadlock_window", help="Abort (and report blocked instructions) after this many cycles without progress (0 - never).",
+        type=int, default=0)
+    parser.add_argument(
+        "-c", "--checkpoint", help="Save the node state to the trace directory every CHECKPOINT cycles (0 - never).",
+        type=int, default=0)
+    parser.add_argument(
+        "--resume", help="Resume the simulation from the checkpoint in the trace directory (same results).",
+        action='store_true')
+    parser.add_argument(
+        "-s", "--snapshot", help="Reuse the programmed xbars from the snapshot cache (test/snapshots) if the net was run before (same results).",
+        action='store_true')
+    parser.add_argument(
+        "--dedup", help="Simulate one representative per class of tiles with the same program, others replay its timing (APPROXIMATE results).",
+        action='store_true')
+    parser.add_argument(
+        "--record", help="Record the packets delivered by the noc to the trace directory (for --replay).",
+        action='store_true')
+    parser.add_argument(
+        "--replay", help="Simulate only tile REPLAY, fed by the packets of an earlier --record run.",
+        type=int, default=-1)
+    parser.add_argument(
+        "--sample", help="Sampled simulation: time SAMPLE iterations of each loop (per basic block vector) in detail, execute the rest functionally (APPROXIMATE results).",
+        type=int, default=0)
+    parser.add_argument(
+        "--warmup", help="Loop iterations simulated in detail before sampling (with --sample).",
+        type=int, default=2)
+    parser.add_argument(
+        "--loop_forward", help="Execute steady-state loop iterations of cores at once (same results).",
+        action='store_true')
+    parser.add_argument(
+        "-t", "--transaction", help="Transaction-level ima timing: instructions execute atomically, cycles computed from stage latencies (documented deviations, see README).",
+        action='store_true')
+    parser.add_argument(
+        "--functional", help="Functional mode: interpret the programs in dependency order without timing (same outputs, no hardware stats).",
+        action='store_true')
+    parser.add_argument(
+        "--cache", help="Look up the results in the result cache (same net files, config & options) and save them after a run.",
+        action='store_true')
+    parser.add_argument(
+        "--cache_dir", help="Result cache directory (default test/cache).", default=cache_path)
+    parser.add_argument(
+        "--cache_size", help="Result cache size in MB (least recently used results are evicted).", type=int, default=1024)
+    parser.add_argument(
+        "--cache_shared", help="Create the result cache (and its entries) writable by all users.", action='store_true')
+    parser.add_argument(
+        "--heartbeat", help="Seconds between progress heartbeats (cycle, halted tiles, cycles/s per subsystem, ETA), 0 - none.",
+        type=float, default=5.0)
+    parser.add_argument(
+        "--heartbeat_file", help="Also write the heartbeats to this file as json lines (for job schedulers).", default='')
     args = parser.parse_args()
     net = args.net
 
     print('Input net is {}'.format(net))
-    DPE().run(net)
+    DPE().run(net, args.fast_forward, args.active_set, args.num_proc, args.multi_node, args.deadlock_window,
+            args.checkpoint, args.resume, args.snapshot, args.dedup,
+            args.record, args.replay, args.sample, args.warmup, args.loop_forward, args.transaction, args.functional,
+            args.cache, args.cache_dir, args.cache_size, args.cache_shared, args.heartbeat, args.heartbeat_file)
 
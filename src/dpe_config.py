@@ -0,0 +1,74 @@
+# Precomputed simulator configuration - the values of include/config.py (cfg) and include/constants.py (param)
+# as plain (picklable) objects. node, tile, ima, their modules and the *_metrics functions take a dpe_config and
+# read cfg/param through it - nodes of different configurations can be simulated in one process, without
+# re-importing config/constants.
+# 1. default_config () - the values of the config & constants modules the process imported (same for all callers)
+# 2. make_config (override_dict) - config.py executed with the values of override_dict in place of its own - the
+#    values derived from them in config.py (num_adc, datamem_off, num_tile, ...) and constants.py (latencies, power,
+#    area) follow
+#
+# Usage (src on the path):
+#   config = dpe_config.make_config ({'xbar_size': 64, 'num_ima': 4})
+#   node_dut = node.node (config = config)
+
+import os
+import ast
+import imp
+import types
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+include_dir = os.path.join(root_dir, "include")
+config_file = os.path.join(include_dir, "config.py")
+constants_file = os.path.join(include_dir, "constants.py")
+
+# values of a module (or module dict) - modules, functions & private names are left out
+class config_values (object):
+    def __init__ (self, value_dict):
+        for name in value_dict:
+            value = value_dict[name]
+            if (not name.startswith ('_') and type(value) not in [types.ModuleType, types.FunctionType]):
+                setattr (self, name, value)
+
+class dpe_config (object):
+    def __init__ (self, cfg, param):
+        self.cfg = cfg
+        self.param = param
+
+### Module of file (config.py/constants.py) with the values of override_dict (applied after every statement)
+def load_module (file_path, module_name, override_dict):
+    module = imp.new_module (module_name)
+    module.__file__ = file_path
+    fid = open (file_path)
+    tree = ast.parse (fid.read (), file_path)
+    fid.close ()
+    for stmt in tree.body:
+        exec (compile (ast.Module ([stmt]), file_path, 'exec'), module.__dict__)
+        module.__dict__.update (override_dict)
+    return module
+
+### Configuration of include/config.py with the values of override_dict (constants.py follows it)
+def make_config (override_dict = {}):
+    cfg_module = load_module (config_file, 'config', override_dict)
+    # constants.py imports config as cfg - it reads cfg_module instead
+    param_module = load_module (constants_file, 'constants', {'cfg': cfg_module})
+    return dpe_config (config_values (cfg_module.__dict__), config_values (param_module.__dict__))
+
+default = None
+
+### Configuration of the config & constants modules imported by the process
+def default_config ():
+    global default
+    if (default == None):
+        import config
+        import constants
+        default = dpe_config (config_values (config.__dict__), config_values (constants.__dict__))
+    return default
+
+# config, or the default configuration if None
+def get_config (config):
+    return default_config () if (config == None) else config
+
+# [cfg, param] of config (or of the default configuration if None)
+def get_values (config):
+    config = get_config (config)
+    return [config.cfg, config.param]
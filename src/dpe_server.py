@@ -0,0 +1,348 @@
+# Local simulation job server - a pool of worker processes with warm (programmed) nodes
+# Clients send jobs over a unix socket (or localhost tcp) as json lines: the net, options (dpe_session modes, see
+# option_list), config (config.py values in place of its own, see dpe_config.make_config - default none) and input
+# (data, counter, valid - default from the net's input.npy). A job runs on a worker holding a dpe_session of its
+# (net, options, config), so only the first job of a (net, options, config) pays for start-up, imports, node
+# instantiation and weight programming. Replies are streamed back as json lines:
+#   queued (position in queue) -> running (worker, warm) -> result (output, metric_dict, cycles, blocked) -> stats
+#   (harwdare_stats text) -> done, or error/rejected
+# Dispatch - a job goes to an idle worker warm with its (net, options, config), else to a new worker, else to an idle
+# worker started afresh for it (the least recently used). Admission control - the resident memory of each worker is
+# reported after every job, a new worker starts only if the pool stays under max_memory (with the largest footprint seen
+# for the (net, options, config)), jobs beyond max_queue and jobs whose footprint alone exceeds max_memory are rejected
+#
+# Serve:  python dpe_server.py --socket /tmp/dpe.sock --max_workers 4 --max_memory 8000
+# Submit: python dpe_server.py --socket /tmp/dpe.sock --submit -n mlp --input inp.npy --fast_forward \
+#             --config '{"xbar_size": 64}'
+
+import os
+import sys
+import json
+import time
+import socket
+import resource
+import threading
+import Queue
+import SocketServer
+import multiprocessing
+import argparse
+import numpy as np
+
+# dpe_session modes a worker is warm for (with the net)
+option_list = ['snapshot', 'fast_forward', 'active_set', 'transaction', 'functional', 'deadlock_window']
+final_list = ['done', 'error', 'rejected']
+
+# Key of the session a job runs on - (net, options, config values in canonical json)
+def get_key (job):
+    options = job.get ('options', {})
+    config_dict = job.get ('config', {})
+    if (type(config_dict) != dict):
+        raise TypeError ('config should be a json object')
+    return (str(job['net']), tuple ([int (options.get (name, 0)) for name in option_list]), \
+            json.dumps (config_dict, sort_keys = True))
+
+# Resident memory of this process (bytes)
+def get_rss ():
+    try:
+        fid = open ('/proc/self/statm')
+        rss = int (fid.read ().split ()[1]) * os.sysconf ('SC_PAGE_SIZE')
+        fid.close ()
+        return rss
+    except (IOError, OSError, ValueError):
+        return resource.getrusage (resource.RUSAGE_SELF).ru_maxrss * 1024 # peak (kB on linux)
+
+def json_default (obj):
+    if (isinstance (obj, np.ndarray)):
+        return obj.tolist ()
+    if (isinstance (obj, np.generic)):
+        return obj.item ()
+    return str (obj)
+
+### Worker process - runs the jobs received on conn on a warm session, replies [result, rss]
+def worker_run (conn):
+    sys.stdout = open (os.devnull, 'w') # the simulator prints its progress
+    import dpe_session
+    import dpe_config
+    session = None
+    key = None
+    while (1):
+        msg = conn.recv ()
+        if (msg == None):
+            break
+        [job_key, job] = msg
+        try:
+            if (job_key != key):
+                # drop the node of the old (net, options, config) before programming the new one
+                session = None
+                key = None
+                config_dict = json.loads (job_key[2])
+                config = dpe_config.make_config (config_dict) if (config_dict) else None
+                session = dpe_session.dpe_session (job_key[0], config = config, **dict (zip (option_list, job_key[1])))
+                key = job_key
+            data = job['data'] if ('data' in job) else session.input_dict['data']
+            [output, metric_dict] = session.infer (np.array (data, dtype = float), job.get ('counter'), \
+                    job.get ('valid'))
+            result = {'status':'done', 'output':output, 'metric_dict':metric_dict, 'cycles':session.cycle, \
+                    'blocked':session.blocked_list, 'harwdare_stats':session.hw_stats}
+        except Exception as e:
+            result = {'status':'error', 'error':repr (e)}
+        conn.send ([result, get_rss ()])
+
+class worker (object):
+    def __init__ (self, worker_id):
+        self.worker_id = worker_id
+        [self.conn, child_conn] = multiprocessing.Pipe ()
+        self.process = multiprocessing.Process (target = worker_run, args = (child_conn,))
+        self.process.daemon = True
+        self.process.start ()
+        self.key = None
+        self.job = None # [job_id, job, reply queue] being run (None - idle)
+        self.rss = 0
+        self.last_time = time.time ()
+
+class job_server (object):
+
+    def __init__ (self, max_workers = 4, max_memory = 0, max_queue = 1000):
+        self.max_workers = max_workers
+        self.max_memory = max_memory * (1 << 20) # MB (0 - no limit)
+        self.max_queue = max_queue
+        self.lock = threading.Lock ()
+        self.worker_list = []
+        self.job_list = [] # queued [key, job_id, job, reply queue]
+        self.footprint_dict = {} # (net, options, config) -> largest rss of a worker warm for it
+        self.num_job = 0
+        self.num_worker = 0
+
+    ### Queue a job - replies (dicts) are put to reply
+    def submit (self, job, reply):
+        try:
+            key = get_key (job)
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            reply.put ({'status':'rejected', 'reason':'bad job ' + repr (e)})
+            return
+        self.lock.acquire ()
+        try:
+            if (self.max_memory and self.footprint_dict.get (key, 0) > self.max_memory):
+                reply.put ({'status':'rejected', 'reason':'footprint ' + str(self.footprint_dict[key] >> 20) + \
+                        'MB exceeds max_memory'})
+            elif (len(self.job_list) >= self.max_queue):
+                reply.put ({'status':'rejected', 'reason':'queue full'})
+            else:
+                self.num_job += 1
+                self.job_list.append ([key, self.num_job, job, reply])
+                reply.put ({'status':'queued', 'job':self.num_job, 'position':len(self.job_list)})
+                self.dispatch ()
+        finally:
+            self.lock.release ()
+
+    # Footprint of a worker warm for key (not seen yet - the largest footprint seen)
+    def get_footprint (self, key):
+        if (key in self.footprint_dict):
+            return self.footprint_dict[key]
+        return max (self.footprint_dict.values () + [0])
+
+    # Pool memory stays under max_memory if temp_worker (None - a new worker) is (re)started for key
+    def fits (self, key, temp_worker):
+        if (not self.max_memory):
+            return 1
+        total = sum ([max (w.rss, self.footprint_dict.get (w.key, 0)) for w in self.worker_list if (w != temp_worker)])
+        return (total + self.get_footprint (key) <= self.max_memory)
+
+    # Worker to run a job of key (None - wait)
+    def get_worker (self, key):
+        idle_list = [w for w in self.worker_list if (w.job == None)]
+        for w in idle_list:
+            if (w.key == key):
+                return w
+        if (len(self.worker_list) < self.max_workers and self.fits (key, None)):
+            return self.start_worker ()
+        # restart the least recently used idle worker (its node is freed with its process)
+        idle_list.sort (key = lambda w: w.last_time)
+        for w in idle_list:
+            if (self.fits (key, w)):
+                self.stop_worker (w)
+                return self.start_worker ()
+        return None
+
+    def start_worker (self):
+        self.num_worker += 1
+        w = worker (self.num_worker)
+        self.worker_list.append (w)
+        temp_thread = threading.Thread (target = self.collect, args = (w,))
+        temp_thread.daemon = True
+        temp_thread.start ()
+        return w
+
+    def stop_worker (self, w):
+        self.worker_list.remove (w)
+        try:
+            w.conn.send (None)
+        except (IOError, EOFError):
+            pass
+
+    # Dispatch queued jobs (in order) to workers (called with the lock held)
+    def dispatch (self):
+        for temp_job in self.job_list[:]:
+            [key, job_id, job, reply] = temp_job
+            w = self.get_worker (key)
+            if (w == None):
+                continue
+            self.job_list.remove (temp_job)
+            reply.put ({'status':'running', 'job':job_id, 'worker':w.worker_id, 'warm':int (w.key == key)})
+            w.key = key
+            w.job = [job_id, job, reply]
+            w.conn.send ([key, job])
+
+    ### Collect the results of worker w (a thread per worker)
+    def collect (self, w):
+        while (1):
+            try:
+                [result, rss] = w.conn.recv ()
+            except (IOError, EOFError):
+                result = None
+            self.lock.acquire ()
+            try:
+                [job_id, job, reply] = w.job if (w.job != None) else [0, None, None]
+                if (result == None): # worker exited (stopped or crashed)
+                    if (reply != None):
+                        reply.put ({'status':'error', 'job':job_id, 'error':'worker exited'})
+                    if (w in self.worker_list):
+                        self.worker_list.remove (w)
+                    self.dispatch ()
+                    return
+                w.job = None
+                w.rss = rss
+                w.last_time = time.time ()
+                if (result['status'] == 'done'):
+                    self.footprint_dict[w.key] = max (self.footprint_dict.get (w.key, 0), rss)
+                    reply.put ({'status':'result', 'job':job_id, 'output':result['output'], \
+                            'metric_dict':result['metric_dict'], 'cycles':result['cycles'], 'blocked':result['blocked']})
+                    reply.put ({'status':'stats', 'job':job_id, 'harwdare_stats':result['harwdare_stats']})
+                    reply.put ({'status':'done', 'job':job_id})
+                else:
+                    w.key = None # the session may be half-built
+                    reply.put ({'status':'error', 'job':job_id, 'error':result['error']})
+                self.dispatch ()
+            finally:
+                self.lock.release ()
+
+    def shutdown (self):
+        self.lock.acquire ()
+        for w in self.worker_list[:]:
+            self.stop_worker (w)
+        self.lock.release ()
+
+### A connection - one job per json line, its replies are streamed back as json lines
+class job_handler (SocketServer.StreamRequestHandler):
+    def handle (self):
+        for line in self.rfile:
+            if (not line.strip ()):
+                continue
+            reply = Queue.Queue ()
+            try:
+                job = json.loads (line)
+                assert (type(job) == dict), 'job should be a json object'
+            except (ValueError, AssertionError) as e:
+                reply.put ({'status':'rejected', 'reason':'bad job ' + repr (e)})
+            else:
+                self.server.job_server.submit (job, reply)
+            while (1):
+                msg = reply.get ()
+                self.wfile.write (json.dumps (msg, default = json_default) + '\n')
+                self.wfile.flush ()
+                if (msg['status'] in final_list):
+                    break
+
+class unix_server (SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    daemon_threads = True
+
+class tcp_server (SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+### Serve jobs on address (path - unix socket, (host, port) - tcp)
+def serve (address, max_workers = 4, max_memory = 0, max_queue = 1000):
+    if (type(address) == str):
+        if (os.path.exists (address)):
+            os.remove (address)
+        server = unix_server (address, job_handler)
+    else:
+        server = tcp_server (address, job_handler)
+    server.job_server = job_server (max_workers, max_memory, max_queue)
+    print ('Serving simulation jobs on ' + str(address))
+    try:
+        server.serve_forever ()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.job_server.shutdown ()
+        server.server_close ()
+        if (type(address) == str and os.path.exists (address)):
+            os.remove (address)
+
+### Client - submit a job, yields the replies (dicts) as they arrive
+def submit (address, job):
+    family = socket.AF_UNIX if (type(address) == str) else socket.AF_INET
+    sock = socket.socket (family, socket.SOCK_STREAM)
+    sock.connect (address)
+    fid = sock.makefile ('rw')
+    fid.write (json.dumps (job, default = json_default) + '\n')
+    fid.flush ()
+    try:
+        for line in fid:
+            msg = json.loads (line)
+            yield msg
+            if (msg['status'] in final_list):
+                break
+    finally:
+        fid.close ()
+        sock.close ()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--socket", help="Unix socket of the server.", default='/tmp/dpe_server.sock')
+    parser.add_argument(
+        "--port", help="Serve on localhost PORT (tcp) instead of the unix socket.", type=int, default=0)
+    parser.add_argument(
+        "--max_workers", help="Maximum number of worker processes.", type=int, default=4)
+    parser.add_argument(
+        "--max_memory", help="Maximum resident memory of the workers in MB (0 - no limit).", type=int, default=0)
+    parser.add_argument(
+        "--max_queue", help="Maximum number of queued jobs.", type=int, default=1000)
+    parser.add_argument(
+        "--submit", help="Submit a job to the server and print its replies.", action='store_true')
+    parser.add_argument(
+        "-n", "--net", help="The net name as it is in test/testasm (with --submit).", default='large')
+    parser.add_argument(
+        "--config", help="Config values of the job as a json object (with --submit), e.g. '{\"xbar_size\": 64}'.",
+        default='')
+    parser.add_argument(
+        "--input", help="Input (.npy - array of data or dict of data/counter/valid) of the job (default - the net's input.npy).",
+        default='')
+    for name in option_list:
+        if (name == 'deadlock_window'):
+            parser.add_argument("--" + name, help="dpe_session option of the job (see dpe.py).", type=int, default=0)
+        else:
+            parser.add_argument("--" + name, help="dpe_session option of the job (see dpe.py).", action='store_true')
+    args = parser.parse_args()
+    address = ('127.0.0.1', args.port) if (args.port) else args.socket
+
+    if (not args.submit):
+        serve (address, args.max_workers, args.max_memory, args.max_queue)
+    else:
+        job = {'net':args.net, 'options':dict ([(name, int (getattr (args, name))) for name in option_list])}
+        if (args.config != ''):
+            job['config'] = json.loads (args.config)
+        if (args.input != ''):
+            inp = np.load (args.input)
+            if (inp.dtype == object):
+                job.update (inp.item ())
+            else:
+                job['data'] = inp
+        for msg in submit (address, job):
+            if (msg['status'] == 'stats'):
+                print (msg['harwdare_stats'])
+            else:
+                print (json.dumps (msg, default = json_default))
@@ -0,0 +1,155 @@
+# In-process simulation api - a node is constructed & programmed once and runs many inferences
+# A session loads the net's programs, programs the xbars (or maps them from the snapshot cache) and keeps the result
+# as a pristine node (pickled). An inference runs on a copy of the pristine node that shares its xbar values - the run-time
+# state (edram, receive buffers, send_queues, pipelines, memories, access counters) starts as in a fresh node, so
+# outputs and stats are the same as those of a DPE.run of the net with the same input. No files are written (traces
+# go to os.devnull).
+#
+# Usage (src on the path):
+#   session = dpe_session.dpe_session ('mlp')
+#   [output, metric_dict] = session.infer (data) # data - numpy array of input values (float)
+
+import os
+import sys
+import cPickle
+import cStringIO
+import numpy as np
+
+# dpe sets up the module paths (src, include & the repo root)
+from dpe import DPE, compiler_path, snapshot_path
+import dpe_config
+import node
+import ima_tlm
+import node_checkpoint
+import node_functional
+import heartbeat as hb
+from data_convert import *
+from hw_stats import get_hw_stats
+
+# os.devnull shared by the trace files of a session's inferences - halting tiles/nodes close their trace files, the
+# handle stays open for the next inference
+class devnull_file (file):
+    def close (self):
+        pass
+
+class dpe_session (DPE):
+
+    ### Construct & program the node of net (in test/testasm, or instrnpath - a directory with the same layout)
+    # fast_forward/active_set/transaction/functional - simulation modes as in DPE.run (same outputs)
+    # deadlock_window/heartbeat - deadlock detection & progress heartbeats of an inference as in DPE.run (no heartbeats
+    # by default - a session is embedded in a caller's process)
+    # config - dpe_config of the node (default - the config & constants modules)
+    def __init__ (self, net = '', instrnpath = '', snapshot = 0, fast_forward = 0, active_set = 0, transaction = 0,
+            functional = 0, deadlock_window = 0, heartbeat = 0, config = None):
+        self.instrnpath = instrnpath if (instrnpath != '') else compiler_path + net + '/'
+        assert (not (functional and (fast_forward or active_set or transaction))), \
+                'functional mode has no timing to skip/model'
+        self.fast_forward = fast_forward
+        self.functional = functional
+        self.deadlock_window = deadlock_window
+        self.heartbeat = heartbeat
+        # trace files of all inferences (os.devnull, opened once per session)
+        self.devnull = devnull_file (os.devnull, 'w')
+
+        self.config = dpe_config.get_config (config)
+        node_dut = node.node (active_set, config = self.config)
+        node_dut.node_init (self.instrnpath, None)
+        if (transaction):
+            ima_tlm.tlm_init (node_dut)
+        if (snapshot):
+            snapshot_dir = snapshot_path + node_checkpoint.snapshot_key (self.instrnpath, self.config)
+        if (snapshot and os.path.exists (snapshot_dir)):
+            node_checkpoint.load_snapshot (snapshot_dir, node_dut)
+        else:
+            for i in range (1, node_dut.cfg.num_tile):
+                self.program_weights (node_dut.tile_list[i], i)
+            if (snapshot):
+                node_checkpoint.save_snapshot (snapshot_dir, node_dut)
+        self.pristine = node_dut
+        self.save_pristine ()
+
+        # counter/valid of the input tile's edram entries (the net's input.npy) - used if infer isn't given any
+        self.input_dict = None
+        if (os.path.exists (self.instrnpath + 'input.npy')):
+            self.input_dict = np.load (self.instrnpath + 'input.npy').item ()
+
+        # stats of the last inference (harwdare_stats.txt contents), its cycles and what its tiles/imas were blocked on
+        # if it deadlocked (empty otherwise)
+        self.hw_stats = ''
+        self.cycle = 0
+        self.blocked_list = []
+
+    # Pickle the pristine node - xbar values, config objects (and the dpe_config), trace files are persistent
+    # references
+    def save_pristine (self):
+        obj_dict = node_checkpoint.get_module_object_dict ()
+        obj_dict[id(self.config)] = 'dpe_config:'
+        obj_dict[id(self.config.cfg)] = 'dpe_config:cfg'
+        obj_dict[id(self.config.param)] = 'dpe_config:param'
+        self.xbar_list = []
+        for temp_matrix in node_checkpoint.get_xbar_dict_list (self.pristine):
+            for key in temp_matrix:
+                for temp_xbar in temp_matrix[key]:
+                    obj_dict[id(temp_xbar.xbar_value)] = 'xbar:' + str(len(self.xbar_list))
+                    self.xbar_list.append (temp_xbar.xbar_value)
+        for fid in self.pristine.tile_fid_list:
+            obj_dict[id(fid)] = 'fid:'
+        for temp_tile in self.pristine.tile_list:
+            for fid in temp_tile.fid_list:
+                obj_dict[id(fid)] = 'fid:'
+        fid = cStringIO.StringIO ()
+        pickler = cPickle.Pickler (fid, cPickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = lambda temp_obj: obj_dict.get (id(temp_obj))
+        pickler.dump (self.pristine)
+        self.pristine_pickle = fid.getvalue ()
+
+    ### A node with the run-time state of the pristine node (xbar values & config objects are shared)
+    def reset (self):
+        def persistent_load (pid):
+            [module_name, name] = pid.split (':')
+            if (module_name == 'xbar'):
+                return self.xbar_list[int(name)]
+            elif (module_name == 'fid'):
+                return self.devnull
+            elif (module_name == 'dpe_config'):
+                return getattr (self.config, name) if (name != '') else self.config
+            return getattr (sys.modules[module_name], name)
+        unpickler = cPickle.Unpickler (cStringIO.StringIO (self.pristine_pickle))
+        unpickler.persistent_load = persistent_load
+        return unpickler.load ()
+
+    ### Run an inference - returns [output, metric_dict]
+    # data - input values (float), counter/valid - of the input tile's edram entries (default - from input.npy)
+    # output - numpy array of the output tile's edram values (float, as in output.txt), metric_dict - as returned by
+    # get_hw_stats (None in functional mode)
+    def infer (self, data, counter = None, valid = None):
+        if (counter is None or valid is None):
+            assert (self.input_dict != None), 'Input Error: no input.npy for the default counter/valid'
+        inp = {'data': np.asarray (data).ravel (), \
+                'counter': self.input_dict['counter'] if (counter is None) else np.asarray (counter).ravel (), \
+                'valid': self.input_dict['valid'] if (valid is None) else np.asarray (valid).ravel ()}
+        node_dut = self.reset ()
+        cfg = node_dut.cfg
+        self.write_input (node_dut.tile_list[0], inp)
+
+        if (self.functional):
+            cycle = node_functional.functional_run (node_dut)
+        else:
+            reporter = hb.heartbeat (node_dut, 0, cfg.cycles_max, self.heartbeat)
+            cycle = self.run_loop (node_dut, 0, self.fast_forward, self.deadlock_window, reporter)
+            node_dut.node_sync (cycle-1)
+            reporter.finish (node_dut, cycle)
+        self.cycle = cycle
+        self.blocked_list = []
+        if (not node_dut.node_halt and cycle < cfg.cycles_max):
+            self.blocked_list = node_dut.node_diagnose ()
+
+        memfile = node_dut.tile_list[cfg.num_tile-1].edram_controller.mem.memfile
+        output = np.array ([fixed2float (value, cfg.int_bits, cfg.frac_bits) for value in memfile if (value != '')])
+        metric_dict = None
+        self.hw_stats = ''
+        if (not self.functional):
+            fid = cStringIO.StringIO ()
+            metric_dict = get_hw_stats (fid, node_dut, cycle)
+            self.hw_stats = fid.getvalue ()
+        return [output, metric_dict]
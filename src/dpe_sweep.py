@@ -0,0 +1,175 @@
+# Parallel configuration sweep - runs every point of a parameter grid in a process pool, one table row per point
+# A grid maps names to lists of values - config.py parameters (xbar_size, num_ima, ...), 'net' and dpe_session modes
+# (session_option_list). Points run in a pool of processes, each point with its own configuration:
+# 1. include/config.py is executed with the point's values in place of its own (dpe_config.make_config) - values
+#    derived from them in config.py (num_adc, datamem_off, num_tile, ...) and constants.py (latencies, power, area)
+#    follow
+# 2. the net is programmed & run once with its input.npy (dpe_session with the point's dpe_config - no traces are
+#    written)
+# Rows (point values, status, metric_dict) are appended to a csv table as points finish - a sweep started again with
+# the same table skips the points it already has (failed points are retried). The pool is sized to the cores and
+# the available memory (mem_per_run MB per process)
+#
+# python dpe_sweep.py -n mlp -g xbar_size=64,128 -g num_ima=4,8 -o sweep.csv
+
+import os
+import sys
+import ast
+import csv
+import json
+import time
+import itertools
+import multiprocessing
+import argparse
+
+import dpe_config
+import dpe_session
+
+session_option_list = ['snapshot', 'fast_forward', 'active_set', 'transaction', 'functional', 'deadlock_window']
+metric_list = ['cycles', 'time', 'total_energy', 'dynamic_energy', 'leakage_energy', 'average_power', 'peak_power',
+        'leakage_power', 'node_area', 'tile_area', 'core_area']
+
+### Points of grid (dict name -> list of values) - list of dicts, in grid order
+def grid_points (grid):
+    name_list = sorted (grid.keys ())
+    return [dict (zip (name_list, value_list)) for value_list in itertools.product (*[grid[name] for name in name_list])]
+
+# Key of a point in the table (same point - same key)
+def point_key (point):
+    return json.dumps (point, sort_keys = True)
+
+### Run a point - returns [key, row]
+def run_point (point):
+    row = dict (point)
+    row['status'] = 'ok'
+    start = time.time ()
+    stdout = sys.stdout
+    sys.stdout = open (os.devnull, 'w') # the simulator prints its progress
+    try:
+        config_dict = dict ([(name, value) for (name, value) in point.items () \
+                if (name != 'net' and name not in session_option_list)])
+        config = dpe_config.make_config (config_dict)
+        option_dict = dict ([(name, point[name]) for name in session_option_list if (name in point)])
+        session = dpe_session.dpe_session (point['net'], config = config, **option_dict)
+        [output, metric_dict] = session.infer (session.input_dict['data'])
+        if (metric_dict != None):
+            row.update (metric_dict)
+        if (session.blocked_list):
+            row['status'] = 'deadlock: ' + '; '.join (session.blocked_list)
+    except Exception as e:
+        row['status'] = 'error: ' + repr (e)
+    sys.stdout = stdout
+    row['run_time'] = time.time () - start
+    return [point_key (point), row]
+
+### Processes for a sweep - cores, and available memory / mem_per_run (MB)
+def get_num_proc (mem_per_run):
+    num_proc = multiprocessing.cpu_count ()
+    try:
+        fid = open ('/proc/meminfo')
+        for line in fid:
+            if (line.startswith ('MemAvailable:')):
+                num_proc = min (num_proc, int (line.split ()[1]) / 1024 / mem_per_run)
+        fid.close ()
+    except (IOError, ValueError):
+        pass
+    return max (1, num_proc)
+
+# Keys of the points in table_file that finished (ok)
+def read_done (table_file):
+    done_set = set ()
+    if (not os.path.exists (table_file)):
+        return done_set
+    fid = open (table_file)
+    for row in csv.DictReader (fid):
+        if (row.get ('status') == 'ok'):
+            done_set.add (row['point'])
+    fid.close ()
+    return done_set
+
+### Run the points of grid not in table_file yet - rows are appended as points finish
+def run_sweep (grid, table_file, num_proc = 0, mem_per_run = 2048):
+    name_list = sorted (grid.keys ())
+    assert ('net' in grid), 'Sweep Error: the grid needs a net'
+    config_dict = dpe_config.make_config ().cfg.__dict__
+    for name in name_list:
+        assert (name == 'net' or name in session_option_list or name in config_dict), \
+                'Sweep Error: ' + name + ' is not a config.py parameter'
+    column_list = ['point'] + name_list + ['status', 'run_time'] + metric_list
+    done_set = read_done (table_file)
+    point_list = [point for point in grid_points (grid) if (point_key (point) not in done_set)]
+    print ('Sweep: ' + str(len(point_list)) + ' points to run (' + str(len(done_set)) + ' done)')
+    if (not point_list):
+        return
+
+    # a table of a different grid can't be resumed (columns differ)
+    if (os.path.exists (table_file)):
+        fid = open (table_file)
+        header = csv.reader (fid).next ()
+        fid.close ()
+        assert (header == column_list), 'Sweep Error: ' + table_file + ' has the columns of another grid'
+        fid = open (table_file, 'ab')
+        writer = csv.DictWriter (fid, column_list, extrasaction = 'ignore')
+    else:
+        fid = open (table_file, 'wb')
+        writer = csv.DictWriter (fid, column_list, extrasaction = 'ignore')
+        writer.writeheader ()
+        fid.flush ()
+
+    if (num_proc == 0):
+        num_proc = get_num_proc (mem_per_run)
+    print ('Sweep: ' + str(num_proc) + ' processes')
+    pool = multiprocessing.Pool (num_proc)
+    try:
+        count = 0
+        for [key, row] in pool.imap_unordered (run_point, point_list):
+            row['point'] = key
+            writer.writerow (row)
+            fid.flush ()
+            count += 1
+            print ('Sweep: ' + str(count) + '/' + str(len(point_list)) + ' ' + key + ' ' + row['status'])
+        pool.close ()
+    except KeyboardInterrupt:
+        pool.terminate ()
+        raise
+    finally:
+        pool.join ()
+        fid.close ()
+
+# Grid value list of a string (comma separated python literals, plain strings otherwise)
+def parse_values (text):
+    value_list = []
+    for temp_str in text.split (','):
+        try:
+            value_list.append (ast.literal_eval (temp_str))
+        except (ValueError, SyntaxError):
+            value_list.append (temp_str)
+    return value_list
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--net", help="The net name(s) as in test/testasm (comma separated).", default='large')
+    parser.add_argument(
+        "-g", "--grid", help="Grid dimension NAME=V1,V2,... (config.py parameter or dpe_session option), repeatable.",
+        action='append', default=[])
+    parser.add_argument(
+        "--grid_file", help="Grid as a json object (name -> list of values).", default='')
+    parser.add_argument(
+        "-o", "--output", help="Table (csv) of the sweep - an existing table is resumed.", default='sweep.csv')
+    parser.add_argument(
+        "-p", "--num_proc", help="Number of processes (0 - from the cores and available memory).", type=int, default=0)
+    parser.add_argument(
+        "--mem_per_run", help="Memory (MB) a run is assumed to take (sizes the pool).", type=int, default=2048)
+    args = parser.parse_args()
+
+    grid = {'net': args.net.split (',')}
+    if (args.grid_file != ''):
+        fid = open (args.grid_file)
+        grid.update (json.load (fid))
+        fid.close ()
+    for temp_str in args.grid:
+        [name, text] = temp_str.split ('=', 1)
+        grid[name] = parse_values (text)
+    run_sweep (grid, args.output, args.num_proc, args.mem_per_run)
@@ -0,0 +1,83 @@
+# Rate-limited progress reporting of a simulation (at most one heartbeat per interval wall-seconds)
+# A heartbeat shows the cycle, the number of halted tiles, the simulation rate of each subsystem (simulated cycles per
+# wall-second since the last heartbeat) and the ETA against cycles_max (at the average node rate of the run):
+# - node: cycles of the run loop (cycles skipped by fast-forward included)
+# - tile/ima: cycles of all tiles/imas (cycle_count - power-gated imas don't count)
+# - noc: cycles the noc was busy
+# When the run ends, a last record has the average rates of the run.
+# Heartbeats (and the last record) can also be written to a stream as json lines, for job schedulers:
+# {"cycle", "halted_tiles", "num_tile", "elapsed", "rate": {subsystem: cycles/s}, "eta", "done"}
+# Note: in the parallel modes tiles/imas are simulated by the workers - only node & noc rates are reported
+
+import time
+import json
+
+subsystem_list = ['node', 'tile', 'ima', 'noc']
+
+class heartbeat (object):
+
+    # interval - wall-seconds between heartbeats (0 - none), stream - file for the json lines (None - none)
+    def __init__ (self, node_dut, cycle, cycles_max, interval = 5.0, stream = None, subsystem_list = subsystem_list):
+        self.cycles_max = cycles_max
+        self.interval = interval
+        self.stream = stream
+        self.subsystem_list = subsystem_list
+        self.start_time = time.time ()
+        self.start_cycle = cycle
+        self.next_time = self.start_time + interval if (interval > 0) else float('inf')
+        self.start_count = self.get_count (node_dut, cycle)
+        self.last_time = self.start_time
+        self.last_count = self.start_count
+
+    # Simulated cycles of each subsystem so far
+    def get_count (self, node_dut, cycle):
+        count = {'node': cycle}
+        if ('tile' in self.subsystem_list):
+            count['tile'] = sum ([temp_tile.cycle_count for temp_tile in node_dut.tile_list])
+        if ('ima' in self.subsystem_list):
+            count['ima'] = sum ([sum ([temp_ima.cycle_count for temp_ima in temp_tile.ima_list]) \
+                    for temp_tile in node_dut.tile_list])
+        if ('noc' in self.subsystem_list):
+            count['noc'] = node_dut.noc.num_cycles_intra + \
+                    ((cycle - node_dut.noc.start_cycle) if (node_dut.noc_start) else 0)
+        return count
+
+    ### Called every iteration of a run loop - a heartbeat if interval has passed
+    def update (self, node_dut, cycle):
+        if (time.time () >= self.next_time):
+            self.report (node_dut, cycle, 0)
+
+    ### Last record of the run (average rates)
+    def finish (self, node_dut, cycle):
+        self.report (node_dut, cycle, 1)
+
+    def report (self, node_dut, cycle, done):
+        now = time.time ()
+        count = self.get_count (node_dut, cycle)
+        [last_time, last_count] = [self.start_time, self.start_count] if (done) else [self.last_time, self.last_count]
+        rate = {}
+        for name in self.subsystem_list:
+            rate[name] = (count[name] - last_count[name]) / max (now - last_time, 1e-9)
+        node_rate = (cycle - self.start_cycle) / max (now - self.start_time, 1e-9)
+        eta = (self.cycles_max - cycle) / node_rate if (node_rate > 0 and not done) else None
+        num_halt = sum (node_dut.tile_halt_list)
+        num_tile = len (node_dut.tile_halt_list)
+        self.last_time = now
+        self.last_count = count
+        while (self.next_time <= now):
+            self.next_time += self.interval
+
+        if (self.interval > 0):
+            temp_str = ' '.join ([name + ' ' + ('%.1f' % rate[name]) for name in self.subsystem_list])
+            if (done):
+                print ('Progress: done at cycle ' + str(cycle) + ' | halted tiles ' + str(num_halt) + '/' + \
+                        str(num_tile) + ' | cycles/s ' + temp_str)
+            else:
+                print ('Progress: cycle ' + str(cycle) + ' | halted tiles ' + str(num_halt) + '/' + str(num_tile) + \
+                        ' | cycles/s ' + temp_str + ' | ETA (cycles_max) ' + ('%.1f' % eta if (eta != None) else '-') + \
+                        's')
+        if (self.stream != None):
+            record = {'cycle': cycle, 'halted_tiles': num_halt, 'num_tile': num_tile, 'elapsed': now - self.start_time, \
+                    'rate': rate, 'eta': eta, 'done': done}
+            self.stream.write (json.dumps (record, sort_keys = True) + '\n')
+            self.stream.flush ()
@@ -1,8 +1,6 @@
 # API to extract hardware trace (stats) from DPE execution
 # Write to file
 import sys
-import config as cfg
-import constants as param
 import node_metrics
 import tile_metrics
 import ima_metrics
@@ -13,33 +11,32 @@ mw = 10 ** (-3)
 nj = 10 ** (-9)
 
 # Copied from /include/constants.py file
-# Enlists components at core, tile, and node levels
-hw_comp_energy = {'xbar_mvm':param.xbar_ip_pow_dyn*param.xbar_ip_lat, 'xbar_op':param.xbar_op_pow_dyn*param.xbar_op_lat,
-                  'xbar_mtvm':param.xbar_ip_pow_dyn*param.xbar_ip_lat,
-        'xbar_rd':param.xbar_rd_pow_dyn*param.xbar_rd_lat, 'xbar_wr':param.xbar_wr_pow_dyn*param.xbar_wr_lat,
-        'dac':param.dac_pow_dyn, 'snh':param.snh_pow_dyn, \
-        'mux1':param.mux_pow_dyn, 'mux2':param.mux_pow_dyn, 'adc':param.adc_pow_dyn, \
-        'alu_div': param.alu_pow_div_dyn, 'alu_mul':param.alu_pow_mul_dyn, \
-        'alu_act': param.act_pow_dyn, 'alu_other':param.alu_pow_others_dyn, \
-        'alu_sna': param.sna_pow_dyn, \
-        'imem':param.instrnMem_pow_dyn, 'dmem':param.dataMem_pow_dyn, 'xbInmem_rd':param.xbar_inMem_pow_dyn_read, \
-        'xbInmem_wr':param.xbar_inMem_pow_dyn_write, 'xbOutmem':param.xbar_outMem_pow_dyn, \
-        'imem_t':param.tile_instrnMem_pow_dyn, 'rbuff':param.receive_buffer_pow_dyn,\
-        'edram':param.edram_pow_dyn, 'edctrl':param.edram_ctrl_pow_dyn, \
-        'edram_bus':param.edram_bus_pow_dyn, 'edctrl_counter':param.counter_buff_pow_dyn, \
-        'noc_intra':param.noc_intra_pow_dyn,
-        'noc_inter':param.noc_inter_pow_dyn*5, # HT takes 5 ns per packet transfer
-        # Added new components
-        'core_control':param.ccu_pow,
-        'tile_control':param.tcu_pow
-        }
-
-# Used to calculate dynamic energy consumption and other metrics (area/time/total_power/peak_power)
-def get_hw_stats (fid, node_dut, cycle):
+# Enlists components at core, tile, and node levels (param - constants.py values of the node's dpe_config)
+def get_hw_comp_energy (param):
+    return {'xbar_mvm':param.xbar_ip_pow_dyn*param.xbar_ip_lat, 'xbar_op':param.xbar_op_pow_dyn*param.xbar_op_lat,
+            'xbar_mtvm':param.xbar_ip_pow_dyn*param.xbar_ip_lat,
+            'xbar_rd':param.xbar_rd_pow_dyn*param.xbar_rd_lat, 'xbar_wr':param.xbar_wr_pow_dyn*param.xbar_wr_lat,
+            'dac':param.dac_pow_dyn, 'snh':param.snh_pow_dyn, \
+            'mux1':param.mux_pow_dyn, 'mux2':param.mux_pow_dyn, 'adc':param.adc_pow_dyn, \
+            'alu_div': param.alu_pow_div_dyn, 'alu_mul':param.alu_pow_mul_dyn, \
+            'alu_act': param.act_pow_dyn, 'alu_other':param.alu_pow_others_dyn, \
+            'alu_sna': param.sna_pow_dyn, \
+            'imem':param.instrnMem_pow_dyn, 'dmem':param.dataMem_pow_dyn, 'xbInmem_rd':param.xbar_inMem_pow_dyn_read, \
+            'xbInmem_wr':param.xbar_inMem_pow_dyn_write, 'xbOutmem':param.xbar_outMem_pow_dyn, \
+            'imem_t':param.tile_instrnMem_pow_dyn, 'rbuff':param.receive_buffer_pow_dyn,\
+            'edram':param.edram_pow_dyn, 'edctrl':param.edram_ctrl_pow_dyn, \
+            'edram_bus':param.edram_bus_pow_dyn, 'edctrl_counter':param.counter_buff_pow_dyn, \
+            'noc_intra':param.noc_intra_pow_dyn,
+            'noc_inter':param.noc_inter_pow_dyn*5, # HT takes 5 ns per packet transfer
+            # Added new components
+            'core_control':param.ccu_pow,
+            'tile_control':param.tcu_pow
+            }
 
-    # List of all components that dissipate power
-    hw_comp_access = {'xbar_mvm':0, 'xbar_op':0,
-                      'xbar_mtvm':0,
+# Access counts of all components that dissipate power (zero)
+def get_hw_comp_access ():
+    return {'xbar_mvm':0, 'xbar_op':0,
+            'xbar_mtvm':0,
             'xbar_rd':0, 'xbar_wr':0,
             'dac':0, 'snh':0, \
             'mux1':0, 'mux2':0, 'adc':0, \
@@ -55,93 +52,114 @@ def get_hw_stats (fid, node_dut, cycle):
             'core_control':0, 'tile_control': 0 \
             }
 
+# Add the access counts of a tile's components to hw_comp_access - the cycles of the tile & its imas go to
+# core_control & tile_control (leakage energy)
+def add_tile_access (hw_comp_access, temp_tile):
+    cfg = temp_tile.cfg
+    # cycles for leakage energy (control units of the tile & imas)
+    hw_comp_access['core_control'] += temp_tile.cycle_count
+
+    hw_comp_access['imem_t'] += temp_tile.instrn_memory.num_access
+    hw_comp_access['rbuff'] += temp_tile.receive_buffer.num_access
+    hw_comp_access['edram'] += temp_tile.edram_controller.mem.num_access
+    hw_comp_access['edram_bus'] += temp_tile.edram_controller.mem.num_access
+    hw_comp_access['edctrl'] += temp_tile.edram_controller.num_access
+    hw_comp_access['edctrl_counter'] += temp_tile.edram_controller.num_access_counter
+
+    for j in range (cfg.num_ima):
+        hw_comp_access['tile_control'] += temp_tile.ima_list[j].cycle_count
+
+        mvmu_type = ['f', 'b', 'd']
+        for k in range (cfg.num_matrix):
+            for mvmu_t in mvmu_type:
+                # Xbar accesses
+                for m in range(cfg.phy2log_ratio):
+                    if (mvmu_t == 'd'):
+                        hw_comp_access['xbar_op'] += temp_tile.ima_list[j].matrix_list[k][mvmu_t][m].num_access
+                    elif (mvmu_t == 'b'):
+                        hw_comp_access['xbar_mtvm'] += temp_tile.ima_list[j].matrix_list[k][mvmu_t][m].num_access
+                    else:
+                        hw_comp_access['xbar_mvm'] += temp_tile.ima_list[j].matrix_list[k][mvmu_t][m].num_access
+                    hw_comp_access['xbar_rd'] += \
+                    temp_tile.ima_list[j].matrix_list[k][mvmu_t][m].num_access_rd / (cfg.xbar_size**2)
+                    hw_comp_access['xbar_wr'] += \
+                    temp_tile.ima_list[j].matrix_list[k][mvmu_t][m].num_access_wr / (cfg.xbar_size**2)
+                # Xb_InMem accesses
+                hw_comp_access['xbInmem_rd'] += temp_tile.ima_list[j].xb_inMem_list[k][mvmu_t].num_access_read
+                hw_comp_access['xbInmem_wr'] += temp_tile.ima_list[j].xb_inMem_list[k][mvmu_t].num_access_write
+                # Xb_OutMem accesses
+                hw_comp_access['xbOutmem'] += temp_tile.ima_list[j].xb_outMem_list[k][mvmu_t].num_access
+
+        for k in range(cfg.num_matrix):
+            dac_type = ['f', 'b', 'd_r', 'd_c']
+            for dac_t in dac_type:
+                for l in range(cfg.xbar_size):
+                    hw_comp_access['dac'] += temp_tile.ima_list[j].dacArray_list[k][dac_t].dac_list[l].num_access
+
+        for k in range (2*cfg.num_matrix*cfg.phy2log_ratio):
+            hw_comp_access['snh'] += (temp_tile.ima_list[j].snh_list[k].num_access * cfg.xbar_size) # each snh is
+            # basically an array of multiple snhs (individual power in constants file must be for one discerete snh)
+
+        for k in range (2*cfg.num_matrix):
+            hw_comp_access['mux1'] += temp_tile.ima_list[j].mux1_list[k].num_access
+
+        for k in range (cfg.num_adc):
+            hw_comp_access['mux2'] += temp_tile.ima_list[j].mux1_list[k].num_access
+
+        for k in range (cfg.num_adc):
+            hw_comp_access['adc'] += temp_tile.ima_list[j].adc_list[k].num_access
+
+        for k in range (cfg.num_ALU):
+            hw_comp_access['alu_div'] += temp_tile.ima_list[j].alu_list[k].num_access_div + \
+                    temp_tile.ima_list[j].alu_int.num_access_div
+
+            hw_comp_access['alu_mul'] += temp_tile.ima_list[j].alu_list[k].num_access_mul + \
+                    temp_tile.ima_list[j].alu_int.num_access_mul
+
+            hw_comp_access['alu_other'] += temp_tile.ima_list[j].alu_list[k].num_access_other + \
+                    temp_tile.ima_list[j].alu_int.num_access_other
+
+            hw_comp_access['alu_act'] += temp_tile.ima_list[j].alu_list[k].num_access_act
+
+            hw_comp_access['alu_sna'] += temp_tile.ima_list[j].alu_list[k].num_access_sna
+
+        hw_comp_access['imem'] += temp_tile.ima_list[j].instrnMem.num_access
+
+        hw_comp_access['dmem'] += temp_tile.ima_list[j].dataMem.num_access
+
+# Used to calculate dynamic energy consumption and other metrics (area/time/total_power/peak_power)
+def get_hw_stats (fid, node_dut, cycle):
+    cfg = node_dut.cfg
+    param = node_dut.param
+    hw_comp_energy = get_hw_comp_energy (param)
+
+    # List of all components that dissipate power
+    hw_comp_access = get_hw_comp_access ()
+
     # traverse components to populate dict (hw_comp_access)
     hw_comp_access['noc_intra'] += node_dut.noc.num_cycles_intra
     # From tile0 instructions find the repetitions and scale down
     # HACK - modify this based on data sharing across output tiles [IZZAT] terminology] in a node
-    hw_comp_access['noc_inter'] += node_dut.noc.num_access_inter/12
+    # (cmesh noc model - inter-node packets take the HT link of their route, counted as is)
+    if (node_dut.noc.noc_model == 'cmesh'):
+        hw_comp_access['noc_inter'] += node_dut.noc.num_access_inter
+    else:
+        hw_comp_access['noc_inter'] += node_dut.noc.num_access_inter/12
+
+    for i in range (1, cfg.num_tile): # ignore dummy (input & output) tiles
+        if (node_dut.tile_result_list != None):
+            # parallel modes - the tile's accesses were counted by its worker (see node_parallel)
+            tile_access = node_dut.tile_result_list[i]['access']
+            for key in tile_access:
+                hw_comp_access[key] += tile_access[key]
+        else:
+            add_tile_access (hw_comp_access, node_dut.tile_list[i])
 
     # Count num_cycles for leakage energy computations (power-gating granularity: ima/tile/noc)
-    sum_num_cycle_tile = 0
-    sum_num_cycle_ima = 0
+    sum_num_cycle_tile = hw_comp_access['core_control']
+    sum_num_cycle_ima = hw_comp_access['tile_control']
     sum_num_cycle_noc = node_dut.noc.num_cycles_intra
 
-
-    for i in range (1, cfg.num_tile): # ignore dummy (input & output) tiles
-        sum_num_cycle_tile += node_dut.tile_list[i].cycle_count # used for leakage energy of tiles
-
-        hw_comp_access['imem_t'] += node_dut.tile_list[i].instrn_memory.num_access
-        hw_comp_access['rbuff'] += node_dut.tile_list[i].receive_buffer.num_access
-        hw_comp_access['edram'] += node_dut.tile_list[i].edram_controller.mem.num_access
-        hw_comp_access['edram_bus'] += node_dut.tile_list[i].edram_controller.mem.num_access
-        hw_comp_access['edctrl'] += node_dut.tile_list[i].edram_controller.num_access
-        hw_comp_access['edctrl_counter'] += node_dut.tile_list[i].edram_controller.num_access_counter
-
-        for j in range (cfg.num_ima):
-            sum_num_cycle_ima += node_dut.tile_list[i].ima_list[j].cycle_count # used for leakage energy of imas
-
-            mvmu_type = ['f', 'b', 'd']
-            for k in range (cfg.num_matrix):
-                for mvmu_t in mvmu_type:
-                    # Xbar accesses
-                    for m in range(cfg.phy2log_ratio):
-                        if (mvmu_t == 'd'):
-                            hw_comp_access['xbar_op'] += node_dut.tile_list[i].ima_list[j].matrix_list[k][mvmu_t][m].num_access
-                        elif (mvmu_t == 'b'):
-                            hw_comp_access['xbar_mtvm'] += node_dut.tile_list[i].ima_list[j].matrix_list[k][mvmu_t][m].num_access
-                        else:
-                            hw_comp_access['xbar_mvm'] += node_dut.tile_list[i].ima_list[j].matrix_list[k][mvmu_t][m].num_access
-                        hw_comp_access['xbar_rd'] += \
-                        node_dut.tile_list[i].ima_list[j].matrix_list[k][mvmu_t][m].num_access_rd / (cfg.xbar_size**2)
-                        hw_comp_access['xbar_wr'] += \
-                        node_dut.tile_list[i].ima_list[j].matrix_list[k][mvmu_t][m].num_access_wr / (cfg.xbar_size**2)
-                    # Xb_InMem accesses
-                    hw_comp_access['xbInmem_rd'] += node_dut.tile_list[i].ima_list[j].xb_inMem_list[k][mvmu_t].num_access_read
-                    hw_comp_access['xbInmem_wr'] += node_dut.tile_list[i].ima_list[j].xb_inMem_list[k][mvmu_t].num_access_write
-                    # Xb_OutMem accesses
-                    hw_comp_access['xbOutmem'] += node_dut.tile_list[i].ima_list[j].xb_outMem_list[k][mvmu_t].num_access
-
-            for k in range(cfg.num_matrix):
-                dac_type = ['f', 'b', 'd_r', 'd_c']
-                for dac_t in dac_type:
-                    for l in range(cfg.xbar_size):
-                        hw_comp_access['dac'] += node_dut.tile_list[i].ima_list[j].dacArray_list[k][dac_t].dac_list[l].num_access
-
-            for k in range (2*cfg.num_matrix*cfg.phy2log_ratio):
-                hw_comp_access['snh'] += (node_dut.tile_list[i].ima_list[j].snh_list[k].num_access * cfg.xbar_size) # each snh is
-                # basically an array of multiple snhs (individual power in constants file must be for one discerete snh)
-
-            for k in range (2*cfg.num_matrix):
-                hw_comp_access['mux1'] += node_dut.tile_list[i].ima_list[j].mux1_list[k].num_access
-
-            for k in range (cfg.num_adc):
-                hw_comp_access['mux2'] += node_dut.tile_list[i].ima_list[j].mux1_list[k].num_access
-
-            for k in range (cfg.num_adc):
-                hw_comp_access['adc'] += node_dut.tile_list[i].ima_list[j].adc_list[k].num_access
-
-            for k in range (cfg.num_ALU):
-                hw_comp_access['alu_div'] += node_dut.tile_list[i].ima_list[j].alu_list[k].num_access_div + \
-                        node_dut.tile_list[i].ima_list[j].alu_int.num_access_div
-
-                hw_comp_access['alu_mul'] += node_dut.tile_list[i].ima_list[j].alu_list[k].num_access_mul + \
-                        node_dut.tile_list[i].ima_list[j].alu_int.num_access_mul
-
-                hw_comp_access['alu_other'] += node_dut.tile_list[i].ima_list[j].alu_list[k].num_access_other + \
-                        node_dut.tile_list[i].ima_list[j].alu_int.num_access_other
-
-                hw_comp_access['alu_act'] += node_dut.tile_list[i].ima_list[j].alu_list[k].num_access_act
-
-                hw_comp_access['alu_sna'] += node_dut.tile_list[i].ima_list[j].alu_list[k].num_access_sna
-
-            hw_comp_access['imem'] += node_dut.tile_list[i].ima_list[j].instrnMem.num_access
-
-            hw_comp_access['dmem'] += node_dut.tile_list[i].ima_list[j].dataMem.num_access
-
-    # Added for core and tile control units
-    hw_comp_access['core_control'] = sum_num_cycle_tile
-    hw_comp_access['tile_control'] = sum_num_cycle_ima
-
     total_energy = 0
     # Compute the total dynamic energy consumption
     for key, value in hw_comp_access.items():
@@ -162,8 +180,8 @@ def get_hw_stats (fid, node_dut, cycle):
 
     # Evaluate leakage_energy (tile/ima/noc is power-gated if unused
     leakage_energy = sum_num_cycle_noc * param.noc_intra_pow_leak + \
-            sum_num_cycle_tile * tile_metrics.compute_pow_leak_non_ima () + \
-            sum_num_cycle_ima * ima_metrics.compute_pow_leak()
+            sum_num_cycle_tile * tile_metrics.compute_pow_leak_non_ima (node_dut.config) + \
+            sum_num_cycle_ima * ima_metrics.compute_pow_leak (node_dut.config)
 
 
     # Write the leakage energy(J), total_energy(J), average_power (mW), peak_power (mW),
@@ -180,11 +198,11 @@ def get_hw_stats (fid, node_dut, cycle):
             'cycles':0,
             'time':0.0}
 
-    metric_dict['leakage_power'] = node_metrics.compute_pow_leak () # in mW
-    metric_dict['peak_power'] = node_metrics.compute_pow_peak () # in mW
-    metric_dict['node_area'] = node_metrics.compute_area () # in mm2
-    metric_dict['tile_area'] = tile_metrics.compute_area ()# in mm2
-    metric_dict['core_area'] = ima_metrics.compute_area ()# in mm2
+    metric_dict['leakage_power'] = node_metrics.compute_pow_leak (node_dut.config) # in mW
+    metric_dict['peak_power'] = node_metrics.compute_pow_peak (node_dut.config) # in mW
+    metric_dict['node_area'] = node_metrics.compute_area (node_dut.config) # in mm2
+    metric_dict['tile_area'] = tile_metrics.compute_area (node_dut.config)# in mm2
+    metric_dict['core_area'] = ima_metrics.compute_area (node_dut.config)# in mm2
     metric_dict['cycles'] = cycle
     metric_dict['time'] = cycle * param.cycle_time * (10**(-9)) # in sec
     metric_dict['dynamic_energy'] = total_energy * ns * mw # in joule
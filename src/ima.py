@@ -6,17 +6,12 @@ import sys, json
 # import dependancy files
 import numpy as np
 import math
-import config as cfg
 #import include.configTest as cfg
-import include.constants as param
+import dpe_config
 import src.ima_modules as imod
 
 from data_convert import *
 
-phy2log_ratio = cfg.phy2log_ratio # ratio of physical to logical xbar
-# datamem_off is the start of address sapce of datamemory
-datamem_off = cfg.datamem_off # each matrix has 6 memory spaces (1 for f/b, 2 for d)
-
 class ima (object):
 
     instances_created = 0
@@ -24,7 +19,13 @@ class ima (object):
     #######################################################
     ### Instantiate different modules
     #######################################################
-    def __init__ (self):
+    # config - dpe_config (default - the config & constants modules)
+    def __init__ (self, config = None):
+
+        # Configuration (cfg - config.py values, param - constants.py values)
+        self.config = dpe_config.get_config (config)
+        self.cfg = self.config.cfg
+        self.param = self.config.param
 
         # Assign a ima_id for identification purpose in debug trace
         self.ima_id = ima.instances_created
@@ -39,31 +40,31 @@ class ima (object):
         self.xb_inMem_list = [] # list of dicts of xbar input memory
         self.xb_outMem_list = [] # list of dicts of xbar output memory
 
-        for i in xrange(cfg.num_matrix):
+        for i in xrange(self.cfg.num_matrix):
             # each matrix represents three mvmus - 1 mvmu for fw, 1 mvmu for bw, 1 mvmu (2X width) for delta
             temp_xbar_dict = {'f':[], 'b':[], 'd':[]}
             temp_inMem_dict = {'f':[], 'b':[], 'd':[]}
             temp_outMem_dict = {'f':[], 'b':[], 'd':[]}
 
             for key in temp_xbar_dict:
-                phy2log_ratio = cfg.data_width/cfg.xbar_bits # ratio of physical to logical xbars
+                phy2log_ratio = self.cfg.data_width/self.cfg.xbar_bits # ratio of physical to logical xbars
                 numXbar_temp = (2*phy2log_ratio) if (key == 'd') else (phy2log_ratio)
 
                 # assign xbars to the dict elements
                 temp_list_xbar = []
                 for j in xrange (numXbar_temp):
                     if (key != 'd'):
-                        temp_xbar = imod.xbar (cfg.xbar_size)
+                        temp_xbar = imod.xbar (self.cfg.xbar_size, config = self.config)
                     else:
-                        temp_xbar = imod.xbar_op (cfg.xbar_size)
+                        temp_xbar = imod.xbar_op (self.cfg.xbar_size, config = self.config)
                     temp_list_xbar.append (temp_xbar)
                 temp_xbar_dict[key] = temp_list_xbar
 
                 # assign input memory to mvmu
-                temp_inMem_dict[key] = imod.xb_inMem (cfg.xbar_size)
+                temp_inMem_dict[key] = imod.xb_inMem (self.cfg.xbar_size, config = self.config)
 
                 # assign output memory to mvmu
-                temp_outMem_dict[key] = imod.xb_outMem (cfg.xbar_size)
+                temp_outMem_dict[key] = imod.xb_outMem (self.cfg.xbar_size, config = self.config)
 
             self.matrix_list.append(temp_xbar_dict)
             self.xb_inMem_list.append(temp_inMem_dict)
@@ -72,28 +73,28 @@ class ima (object):
         # Instantiate DACs
         self.dacArray_list = [] # list of dicts
         # each matrix will have mutiple dac_arrays for each of its mvmu (f,b,d)
-        for i in xrange(cfg.num_matrix):
+        for i in xrange(self.cfg.num_matrix):
             temp_dict = {'f':[], 'b':[], 'd_r':[], 'd_c':[]} # separate dac_array for delta xbar row and columns
             for key in temp_dict:
                 if (key in ['f', 'b', 'd_r']):
-                    temp_dacArray = imod.dac_array (cfg.xbar_size, cfg.dac_res)
+                    temp_dacArray = imod.dac_array (self.cfg.xbar_size, self.cfg.dac_res, config = self.config)
                 else:
                     # 2-bit (=xbar_bits) are fed to columns of crossbar)
-                    temp_dacArray = imod.dac_array (cfg.xbar_size, 2*cfg.dac_res)
+                    temp_dacArray = imod.dac_array (self.cfg.xbar_size, 2*self.cfg.dac_res, config = self.config)
                 temp_dict[key] = temp_dacArray
             self.dacArray_list.append(temp_dict)
 
         # Instatiate ADCs
         # num_adc is 2*num_matrix (no adc needed for delta xbar)
         self.adc_list = []
-        for i in xrange(cfg.num_adc):
-            temp_adc = imod.adc (cfg.adc_res)
+        for i in xrange(self.cfg.num_adc):
+            temp_adc = imod.adc (self.cfg.adc_res, config = self.config)
             self.adc_list.append(temp_adc)
 
         # Instantiate sample and hold
         self.snh_list = []
-        for i in xrange (2*cfg.num_matrix*phy2log_ratio):
-            temp_snh = imod.sampleNhold (cfg.xbar_size)
+        for i in xrange (2*self.cfg.num_matrix*phy2log_ratio):
+            temp_snh = imod.sampleNhold (self.cfg.xbar_size, config = self.config)
             self.snh_list.append(temp_snh)
 
         # Instatiate mux (num_mux depends on num_xbars and num_adcs)
@@ -106,36 +107,36 @@ class ima (object):
         # A mux with inp_size = 1 is basically a dammy mux (wire)
 
         self.mux1_list = [] # from xbar
-        inp1_size = cfg.xbar_size
-        for i in xrange(2*cfg.num_matrix): # 2 for f and b xbar
-            temp_mux = imod.mux (inp1_size)
+        inp1_size = self.cfg.xbar_size
+        for i in xrange(2*self.cfg.num_matrix): # 2 for f and b xbar
+            temp_mux = imod.mux (inp1_size, config = self.config)
             self.mux1_list.append(temp_mux)
 
         self.mux2_list = [] # to adc
         # intuition: delta xbar don't need additional adc. During crs, when delta xbar needs adc, f/b xbar's adc can be
         # used as f/b xbars won't be read then
-        inp2_size = 2*cfg.num_matrix / cfg.num_adc # ratio of xbar (f+b) to adc, delta xbar don't need additional adc
-        for i in xrange(cfg.num_adc):
-            temp_mux = imod.mux (inp2_size)
+        inp2_size = 2*self.cfg.num_matrix / self.cfg.num_adc # ratio of xbar (f+b) to adc, delta xbar don't need additional adc
+        for i in xrange(self.cfg.num_adc):
+            temp_mux = imod.mux (inp2_size, config = self.config)
             self.mux2_list.append(temp_mux)
 
         # Instantiate ALUs
         self.alu_list = []
-        for i in xrange(cfg.num_ALU):
-            temp_alu = imod.alu ()
+        for i in xrange(self.cfg.num_ALU):
+            temp_alu = imod.alu (config = self.config)
             self.alu_list.append(temp_alu)
 
         # Instantiate integger ALU
-        self.alu_int = imod.alu_int ()
+        self.alu_int = imod.alu_int (config = self.config)
 
         # Instantiate  data memory (stores data)
-        self.dataMem = imod.memory (cfg.dataMem_size, datamem_off)
+        self.dataMem = imod.memory (self.cfg.dataMem_size, self.cfg.datamem_off, config = self.config)
 
         # Instantiate instruction memory (stores instruction)
-        self.instrnMem = imod.instrn_memory (cfg.instrnMem_size)
+        self.instrnMem = imod.instrn_memory (self.cfg.instrnMem_size, config = self.config)
 
         # Instantiate the memory interface (interface to edram controller)
-        self.mem_interface = imod.mem_interface ()
+        self.mem_interface = imod.mem_interface (config = self.config)
 
         #############################################################################################################
         ## Define virtual (currently for software emulation purpose (doesn't have a corresponding hardware currenty)
@@ -144,15 +145,17 @@ class ima (object):
         # Define stage-wise pipeline registers (f - before fetch, fd -fetch_decode, de - decode_execute)
         self.pc = 0 # holds the next program counter value
 
-        self.fd_instrn = param.dummy_instrn
+        self.fd_instrn = self.param.dummy_instrn
+        self.fd_pc = 0 # pc of fd_instrn (-1 if squashed by a taken branch)
+        self.de_pc = 0 # pc of de_instrn
 
-        self.de_instrn = param.dummy_instrn # For Debug Only
+        self.de_instrn = self.param.dummy_instrn # For Debug Only
 
-        self.de_opcode = param.dummy_instrn['opcode']
-        self.de_aluop = param.dummy_instrn['aluop']
-        self.de_d1 = param.dummy_instrn['d1'] # target register addr for alu/alui/ld
-        self.de_imm = param.dummy_instrn['imm'] # imm value for alui
-        self.de_xb_nma = param.dummy_instrn['xb_nma'] # nma value for xbar execution
+        self.de_opcode = self.param.dummy_instrn['opcode']
+        self.de_aluop = self.param.dummy_instrn['aluop']
+        self.de_d1 = self.param.dummy_instrn['d1'] # target register addr for alu/alui/ld
+        self.de_imm = self.param.dummy_instrn['imm'] # imm value for alui
+        self.de_xb_nma = self.param.dummy_instrn['xb_nma'] # nma value for xbar execution
 
         self.de_r1 = 0 # operand addr read from r1 address
         self.de_r2 = 0 # operand addr read from r2 address
@@ -165,7 +168,7 @@ class ima (object):
         ########################################################
         ## Define book-keeping variables for pipeline execution
         ########################################################
-        self.num_stage = len (param.stage_list)
+        self.num_stage = len (self.param.stage_list)
 
         # Tells when EDRAM access for ld instruction is done
         self.ldAccess_done = 0
@@ -185,16 +188,31 @@ class ima (object):
         # Define a counter to compute leak_energy
         self.cycle_count = 0 # (power-gated imas - before they start and after they halt)
 
+        # Last cycle simulated (or skipped) - lets an ima sleep and catch up later (active-set mode)
+        self.last_cycle = -1
+
+        # mvm computed by inner_product_fast (same outputs & access counts)
+        self.mvm_fast = 0
+
+        # Sampled simulation state (see ima_sample) - None for detailed simulation
+        self.sample = None
+
+        # Loop fast-forward state (see ima_loop) - None if loop iterations aren't fast-forwarded
+        self.loop = None
+
+        # Transaction-level timing state (see ima_tlm) - None for the cycle-by-cycle pipeline
+        self.tlm = None
+
     # Function to read the content of a matrix (from physical xbars to logical xbar)
     def get_matrix (self, mat_id, key):
-        matrix = np.zeros((cfg.xbar_size, cfg.xbar_size))
-        num_xb = phy2log_ratio if (key in ['f', 'b']) else 2*phy2log_ratio
-        for k in range (cfg.xbar_size):
-            for l in range (cfg.xbar_size):
+        matrix = np.zeros((self.cfg.xbar_size, self.cfg.xbar_size))
+        num_xb = self.cfg.phy2log_ratio if (key in ['f', 'b']) else 2*self.cfg.phy2log_ratio
+        for k in range (self.cfg.xbar_size):
+            for l in range (self.cfg.xbar_size):
                 # read wt slices from delta xbar to compose a new weight
                 wt_new = 0.0
                 for m in range (num_xb):
-                    wt_new += self.matrix_list[mat_id][key][m].read(k,l) * (2 **(2*m)) # left shift by 2m, and subtraction by cfg.frac_bits to
+                    wt_new += self.matrix_list[mat_id][key][m].read(k,l) * (2 **(2*m)) # left shift by 2m, and subtraction by self.cfg.frac_bits to
                 matrix[k][l] = wt_new
         return matrix
 
@@ -205,13 +223,16 @@ class ima (object):
     # Increment stage cycles but update pipeline registers at end only when update_ready flag is set
 
     # "Fetch" stage (common to all instructions)
-    def fetch (self, update_ready, fid):
+    def fetch (self, update_ready, fid, now = 0):
         sId = 0 # sId - stageId
 
         # Define what to do in fetch
         def do_fetch (self):
+            if (self.loop != None):
+                self.loop.event (self, sId)
             # commmon to all instructions
             self.fd_instrn = self.instrnMem.read (self.pc) # update pipeline register (fetch/decode)
+            self.fd_pc = self.pc
 
             # A blan instruction signifies program end
             if (self.fd_instrn != ''):
@@ -221,6 +242,10 @@ class ima (object):
                 self.pc = self.pc + 1 # update pipeline register before fetch stage
                 # self.stage_empty[sId] = 1
 
+        # Functional modes - only do the fetch (see do_fetch method)
+        if (now):
+            do_fetch (self)
+            return
 
         # Describe the functionality on a cycle basis
         # Start a fetch stage - if fetch stage is empty and succedding stage is done (update_ready)
@@ -256,22 +281,25 @@ class ima (object):
 
 
     # "Decode" stage - Reads operands (if needed) and puts into the specific data structures
-    def decode (self, update_ready, fid):
+    def decode (self, update_ready, fid, now_op = ''):
         sId = 1
 
         # Define what to do in decode (done for conciseness)
         def do_decode (self, dec_op):
+            if (self.loop != None):
+                self.loop.event (self, sId)
             # common to all instructions
             self.de_opcode = dec_op
             self.stage_empty[sId+1] = 0
             self.stage_done[sId+1] = 0
 
             self.de_instrn = self.fd_instrn
+            self.de_pc = self.fd_pc
 
             # instruction specific (for eg: ld_dec - load's decode stage)
             if (dec_op == 'ld'):
-                assert (self.fd_instrn['r1'] >= datamem_off), 'load address for tile memory comes from data memory'
-                self.de_r1 = bin2int(self.dataMem.read(self.fd_instrn['r1']), cfg.num_bits) # absolute mem addr
+                assert (self.fd_instrn['r1'] >= self.cfg.datamem_off), 'load address for tile memory comes from data memory'
+                self.de_r1 = bin2int(self.dataMem.read(self.fd_instrn['r1']), self.cfg.num_bits) # absolute mem addr
                 self.de_d1 = self.fd_instrn['d1']
                 self.de_r2 = self.fd_instrn['imm'] # used for incrementing/decrementing counter for edram entries
                 self.de_vec = self.fd_instrn['vec']
@@ -284,8 +312,8 @@ class ima (object):
                 # source value will be read in execute stage
 
             elif (dec_op == 'st'):
-                assert (self.fd_instrn['d1'] >= datamem_off), 'store address for tile memory comes from data memory'
-                self.de_d1 = bin2int(self.dataMem.read(self.fd_instrn['d1']), cfg.num_bits) #absolute mem addr
+                assert (self.fd_instrn['d1'] >= self.cfg.datamem_off), 'store address for tile memory comes from data memory'
+                self.de_d1 = bin2int(self.dataMem.read(self.fd_instrn['d1']), self.cfg.num_bits) #absolute mem addr
                 self.de_r1 = self.fd_instrn['r1'] # reg addr
                 self.de_vec = self.fd_instrn['vec']
                 # source value will be read in execute stage
@@ -312,13 +340,13 @@ class ima (object):
                 self.de_d1 = self.fd_instrn['d1'] # addr for rf
                 self.de_r1 = self.fd_instrn['r1'] #addr for rf
                 self.de_val1 = self.fd_instrn['imm'] #absolute value (shift)
-                assert (len(self.de_val1) == cfg.num_bits), 'imm values must be datawidth bit strings'
+                assert (len(self.de_val1) == self.cfg.num_bits), 'imm values must be datawidth bit strings'
                 self.de_vec = self.fd_instrn['vec']
                 # source value will be read in execute stage
 
             elif (dec_op == 'mvm'):
                 xb_nma = self.fd_instrn['xb_nma']
-                assert (len(xb_nma) == cfg.num_matrix), 'unsupported xbar configuration'
+                assert (len(xb_nma) == self.cfg.num_matrix), 'unsupported xbar configuration'
                 self.de_xb_nma = xb_nma
                 # adding a value for stride at the end of mvm processing (for input sharing across strides)
                 self.de_val1 = self.fd_instrn['r1']
@@ -326,26 +354,30 @@ class ima (object):
 
             elif (dec_op == 'crs'):
                 xb_nma = self.fd_instrn['xb_nma']
-                assert (len(xb_nma) == cfg.num_matrix), 'unsupported xbar configuration'
+                assert (len(xb_nma) == self.cfg.num_matrix), 'unsupported xbar configuration'
                 self.de_xb_nma = xb_nma
 
             elif (dec_op == 'beq'):
                 self.de_aluop = 'eq_chk' # equality check with integer ALU
-                assert (self.fd_instrn['r1'] >= datamem_off), 'operand1 for beq comes from data memory'
-                assert (self.fd_instrn['r2'] >= datamem_off), 'operand2 for beq comes from data memory'
+                assert (self.fd_instrn['r1'] >= self.cfg.datamem_off), 'operand1 for beq comes from data memory'
+                assert (self.fd_instrn['r2'] >= self.cfg.datamem_off), 'operand2 for beq comes from data memory'
                 self.de_val1 = self.dataMem.read(self.fd_instrn['r1'])
                 self.de_val2 = self.dataMem.read(self.fd_instrn['r2'])
 
             elif (dec_op == 'alu_int'):
                 self.de_aluop = self.fd_instrn['aluop']
                 self.de_d1 = self.fd_instrn['d1'] # addr for rf
-                assert (self.fd_instrn['r1'] >= datamem_off), 'operand1 for alu_int comes from data memory'
-                assert (self.fd_instrn['r2'] >= datamem_off), 'operand2 for alu_int comes from data memory'
+                assert (self.fd_instrn['r1'] >= self.cfg.datamem_off), 'operand1 for alu_int comes from data memory'
+                assert (self.fd_instrn['r2'] >= self.cfg.datamem_off), 'operand2 for alu_int comes from data memory'
                 self.de_val1 = self.dataMem.read(self.fd_instrn['r1'])
                 self.de_val2 = self.dataMem.read(self.fd_instrn['r2'])
 
             # do nothing for halt/jmp in decode (just propagate to ex when applicable)
 
+        # Functional modes - only do the decode (see do_decode method)
+        if (now_op != ''):
+            do_decode (self, now_op)
+            return
 
         # State machine runs only if the stage is non-empty
         # Describe the functionality on a cycle basis
@@ -355,7 +387,7 @@ class ima (object):
             if (self.stage_cycle[sId] == 0):
                 # Check for assertion pass
                 dec_op = self.fd_instrn['opcode']
-                assert (dec_op in param.op_list), 'unsupported opcode'
+                assert (dec_op in self.param.op_list), 'unsupported opcode'
 
                 self.stage_latency[sId] = self.dataMem.getLatency()
 
@@ -381,78 +413,196 @@ class ima (object):
                 self.stage_cycle[sId] = self.stage_cycle[sId] + 1
 
 
-    # Execute stage - compute and store back to registers
-    def execute (self, update_ready, fid):
-        sId = 2
+    # Inner-product on the specified mvmu (mvm) with numpy - same xb_outMem values & access counts as inner_product:
+    # 1. per input bit slice, every physical xbar computes the same np.dot (values read as in xbar.propagate_dummy)
+    # 2. shift and add across xbars in float, converted to fixed point as float2fixed does (round half away from 0)
+    # 3. shift and add into xb_outMem on integers - fixed point (2s complement) adds of alu.propagate are modulo
+    #    2**num_bits (the bit string shift drops the MSBs)
+    def inner_product_fast (self, mat_id, key):
+        num_xb = self.cfg.data_width / self.cfg.xbar_bits
+        num_step = self.cfg.xbdata_width / self.cfg.dac_res
+        num_access = num_step * self.cfg.xbar_size * num_xb
+        modulo = 2**self.cfg.num_bits
+        xb_inMem = self.xb_inMem_list[mat_id][key]
+        xb_outMem = self.xb_outMem_list[mat_id][key]
+
+        out_int = np.zeros (self.cfg.xbar_size, dtype = np.int64)
+        for k in xrange (num_step):
+            # bits read in k-th step (xb_inMem.read rotates the entries by dac_res bits) as fixed point values
+            inp_float = np.asarray ([float (int (value[len(value)-(k+1)*self.cfg.dac_res:len(value)-k*self.cfg.dac_res] \
+                    or '0', 2)) / (2**self.cfg.frac_bits) for value in xb_inMem.memfile])
+            out_sna = 0.0
+            for m in range (num_xb):
+                out_xbar = np.dot (inp_float, self.matrix_list[mat_id][key][m].xbar_value)
+                if (self.cfg.xbar_record):
+                    self.matrix_list[mat_id][key][m].record (out_xbar)
+                out_sna = out_sna + out_xbar * (2**(m*self.cfg.xbar_bits))
+            temp = out_sna * (2**self.cfg.frac_bits)
+            temp_floor = np.floor (temp)
+            temp_frac = temp - temp_floor
+            temp = temp_floor + ((temp_frac > 0.5) | ((temp_frac == 0.5) & (temp > 0)))
+            out_int = (out_int + (np.mod (temp, modulo).astype (np.int64) << (k*self.cfg.dac_res))) % modulo
+        xb_outMem.reset ()
+        xb_outMem.memfile = [int2bin (int (val), self.cfg.num_bits) for val in out_int]
+
+        # access counts of inner_product
+        xb_inMem.num_access_read += num_step
+        for m in range (num_xb):
+            self.matrix_list[mat_id][key][m].num_access += num_step
+            self.snh_list[mat_id*num_xb+m].num_access += num_step
+        self.mux1_list[mat_id].num_access += num_access
+        self.mux2_list[mat_id % self.cfg.num_adc].num_access += num_access
+        self.alu_list[0].num_access_sna += num_access + num_step * self.cfg.xbar_size
+        xb_outMem.num_access += 2 * num_step * self.cfg.xbar_size
+
+        # stride the inputs if applicable
+        xb_inMem.stride (self.de_val1, self.de_val2)
+
+    # Latency of the execute stage for the decoded instruction (ld/st - till the edram request)
+    def getExLatency (self, ex_op):
+        # Computes the latency for mvm instruction based on DPE configuration
+        def xbComputeLatency (self, mask):
+            #Parse out the mask to find if f/b/d xbars operations will be computed
+            fb_found = 0
+            d_found = 0
+            for temp in mask:
+                if ((temp[0] == '1') or (temp[1] == '1')):
+                    fb_found += 1
+                    #break
+                if (temp[2] == '1'):
+                    d_found += 1
+                    #break
 
-        # define some common functions use dto address xbar memory spaces
-        # xbar memory spaces are addressed as num_mvmu, f,b/d, i/o order
-        # find [num_matrix, xbar_type, mem_addr, xbar_addr]
-        #def getXbarAddr (data_addr):
-        #    # find matrix id
-        #    num_matrix = data_addr / (6*cfg.xbar_size)
-        #    # find xbar_type (f, b, d)
-        #    matrix_addr = data_addr % (6*cfg.xbar_size) # address within the matrix
-        #    if (matrix_addr < 2*cfg.xbar_size):
-        #        xbar_type = 'f'
-        #    elif (matrix_addr >= 4*cfg.xbar_size):
-        #        xbar_type = 'd'
-        #    else:
-        #        xbar_type = 'b'
-        #    # find in/out memory
-        #    mem_addr = matrix_addr % (2*cfg.xbar_size)
-        #    xbar_addr = matrix_addr % cfg.xbar_size
-        #    return [num_matrix, xbar_type, mem_addr, xbar_addr]
-
-        def getXbarAddr (data_addr):
-            # find i or o
-            if (data_addr < cfg.num_matrix*3*cfg.xbar_size):
-                mem_addr = 0
-            else:
-                mem_addr = 128
-
-            # find xbar_addr
-            xbar_addr = data_addr % cfg.xbar_size
-
-            # find matrix_addr
-            num_matrix = (data_addr / (3*cfg.xbar_size)) % cfg.num_matrix
-
-            # find xbar_type
-            temp_val = (data_addr % (cfg.num_matrix*3*cfg.xbar_size))
-            temp_val1 = temp_val % (3*cfg.xbar_size)
-            if (temp_val1 < cfg.xbar_size):
-                xbar_type = 'f'
-            elif (temp_val1 < 2*cfg.xbar_size):
-                xbar_type = 'b'
-            elif (temp_val1 < 3*cfg.xbar_size):
-                xbar_type = 'd'
-            else:
-                assert (1==0), "xbar memory addressing failed"
+            ## MVM inner product goes through a 3 stage pipeline (each stage consumes 128 cycles - xbar aces latency)
+            # Cycle1 - xbar_inMem + DAC + XBar
+            # Cycle2 - SnH + ADC
+            # Cycle3 - SnA + xbar_outMem
+            # The above pipeline is valid for one ADC per physical xbar only !! (Update for other cases, if required)
+            num_stage = 3
+            lat_temp = self.matrix_list[0]['f'][0].getIpLatency() # due to xbar access
+            #latency_ip = lat_temp * ((cfg.xbdata_width / cfg.dac_res) + num_stage - 1) * fb_found
+            latency_ip = lat_temp * ((self.cfg.xbdata_width / self.cfg.dac_res) + num_stage - 1) * float(int(fb_found>0))
+            ## MVM outer product occurs in 4 cycles to take care of all i/o polarities (++, +-, -+, --)
+            num_phase = 4
+            lat_temp = self.matrix_list[0]['f'][0].getOpLatency()
+            #latency_op = lat_temp * num_phase * d_found
+            latency_op = lat_temp * num_phase * float(int(d_found>0))
+            ## output latency should be the max of ip/op operation
+            latency_out = max(latency_ip, latency_op)
+            return latency_out
 
-            return [num_matrix, xbar_type, mem_addr, xbar_addr]
+        if (ex_op in ['ld', 'st']):
+            if (ex_op == 'ld'):
+                return self.mem_interface.getLatency() #mem_interface has infinite latency
+            elif (ex_op == 'st'):
+                return self.dataMem.getLatency() #mem_interface has infinite latency
+
+        elif (ex_op == 'cp'):
+            # cp instructions reads from datamemory/xbinmem & writes to xb_inmem/datamem
+            unit_lat = self.dataMem.getLatency()
+            #return self.de_vec * unit_lat
+            return unit_lat # cp can just assign mux selectors for each xbar (which inmem feeds the xbar)
+
+        elif (ex_op == 'set'):
+            # set writes to data memory
+            unit_lat = self.dataMem.getLatency()
+            return self.de_vec * unit_lat
+
+        elif (ex_op == 'alu' or ex_op == 'alui'):
+            # ALU instructions read from memory, access ALU and write to memory
+            unit_lat = self.alu_list[0].getLatency ()
+            #unit_lat = self.dataMem.getLatency() + \
+            #            self.alu_list[0].getLatency() + self.dataMem.getLatency()
+            return int (math.ceil(self.de_vec / self.cfg.num_ALU)) * unit_lat
+
+        elif (ex_op == 'mvm'):
+            mask_temp = self.de_xb_nma
+            return xbComputeLatency (self, mask_temp) # mask tells which of ip/op or both is occurring
+
+        # Needs update - use xbar serial read latency
+        elif (ex_op == 'crs'):
+            return max(self.matrix_list[0]['f'][0].getWrLatency(), self.matrix_list[0]['f'][0].getRdLatency())
+
+        elif (ex_op in ['beq', 'alu_int']):
+            return self.alu_int.getLatency ()
+
+        else: # halt/jmp/nop instruction
+            return 1
+
+    # define some common functions use dto address xbar memory spaces
+    # xbar memory spaces are addressed as num_mvmu, f,b/d, i/o order
+    # find [num_matrix, xbar_type, mem_addr, xbar_addr]
+    #def getXbarAddr (data_addr):
+    #    # find matrix id
+    #    num_matrix = data_addr / (6*cfg.xbar_size)
+    #    # find xbar_type (f, b, d)
+    #    matrix_addr = data_addr % (6*cfg.xbar_size) # address within the matrix
+    #    if (matrix_addr < 2*cfg.xbar_size):
+    #        xbar_type = 'f'
+    #    elif (matrix_addr >= 4*cfg.xbar_size):
+    #        xbar_type = 'd'
+    #    else:
+    #        xbar_type = 'b'
+    #    # find in/out memory
+    #    mem_addr = matrix_addr % (2*cfg.xbar_size)
+    #    xbar_addr = matrix_addr % cfg.xbar_size
+    #    return [num_matrix, xbar_type, mem_addr, xbar_addr]
+
+    def getXbarAddr (self, data_addr):
+        # find i or o
+        if (data_addr < self.cfg.num_matrix*3*self.cfg.xbar_size):
+            mem_addr = 0
+        else:
+            mem_addr = 128
+
+        # find xbar_addr
+        xbar_addr = data_addr % self.cfg.xbar_size
+
+        # find matrix_addr
+        num_matrix = (data_addr / (3*self.cfg.xbar_size)) % self.cfg.num_matrix
+
+        # find xbar_type
+        temp_val = (data_addr % (self.cfg.num_matrix*3*self.cfg.xbar_size))
+        temp_val1 = temp_val % (3*self.cfg.xbar_size)
+        if (temp_val1 < self.cfg.xbar_size):
+            xbar_type = 'f'
+        elif (temp_val1 < 2*self.cfg.xbar_size):
+            xbar_type = 'b'
+        elif (temp_val1 < 3*self.cfg.xbar_size):
+            xbar_type = 'd'
+        else:
+            assert (1==0), "xbar memory addressing failed"
+
+        return [num_matrix, xbar_type, mem_addr, xbar_addr]
+
+    # write to the xbar memory (in/out) space depending on the address
+    def writeToXbarMem (self, data_addr, data):
+        [matrix_id, xbar_type, mem_addr, xbar_addr] = self.getXbarAddr (data_addr)
+        if (mem_addr < self.cfg.xbar_size):
+            # this is the xbarInMem
+            self.xb_inMem_list[matrix_id][xbar_type].write (xbar_addr, data)
+        else:
+            # this is the xbarOutMem
+            self.xb_outMem_list[matrix_id][xbar_type].write_n (xbar_addr,data)
+
+    # read from xbar memory (in/out) depending on the address
+    def readFromXbarMem (self, data_addr):
+        [matrix_id, xbar_type, mem_addr, xbar_addr] = self.getXbarAddr (data_addr)
+        if (mem_addr < self.cfg.xbar_size):
+            # this is the xbarInMem
+            return self.xb_inMem_list[matrix_id][xbar_type].read_n (xbar_addr)
+        else:
+            # this is the xbarOutMem
+            return self.xb_outMem_list[matrix_id][xbar_type].read (xbar_addr)
 
-        # write to the xbar memory (in/out) space depending on the address
-        def writeToXbarMem (self, data_addr, data):
-            [matrix_id, xbar_type, mem_addr, xbar_addr] = getXbarAddr (data_addr)
-            if (mem_addr < cfg.xbar_size):
-                # this is the xbarInMem
-                self.xb_inMem_list[matrix_id][xbar_type].write (xbar_addr, data)
-            else:
-                # this is the xbarOutMem
-                self.xb_outMem_list[matrix_id][xbar_type].write_n (xbar_addr,data)
-
-        # read from xbar memory (in/out) depending on the address
-        def readFromXbarMem (self, data_addr):
-            [matrix_id, xbar_type, mem_addr, xbar_addr] = getXbarAddr (data_addr)
-            if (mem_addr < cfg.xbar_size):
-                # this is the xbarInMem
-                return self.xb_inMem_list[matrix_id][xbar_type].read_n (xbar_addr)
-            else:
-                # this is the xbarOutMem
-                return self.xb_outMem_list[matrix_id][xbar_type].read (xbar_addr)
+    # Execute stage - compute and store back to registers
+    def execute (self, update_ready, fid, now_op = ''):
+        sId = 2
 
         # Define what to do in execute (done for conciseness)
         def do_execute (self, ex_op, fid):
+            if (self.loop != None):
+                self.loop.event (self, 2)
 
             if (ex_op == 'ld'):
                 self.ldAccess_done = 0
@@ -461,13 +611,13 @@ class ima (object):
                 data_addr = self.de_d1 + self.ex_vec_count * self.de_r2
                 # check if data is a list
                 if (type(data) != list):
-                    data = ['0'*cfg.data_width]*self.de_r2
+                    data = ['0'*self.cfg.data_width]*self.de_r2
                 for i in range (self.de_r2):
                     dst_addr = data_addr + i
-                    if (dst_addr >= datamem_off):
+                    if (dst_addr >= self.cfg.datamem_off):
                         self.dataMem.write (dst_addr, data[i])
                     else:
-                        writeToXbarMem (self, dst_addr, data[i])
+                        self.writeToXbarMem (dst_addr, data[i])
 
             elif (ex_op == 'st'): #nothing to be done by ima for st here
                 return 1
@@ -476,42 +626,42 @@ class ima (object):
                 for i in range (self.de_vec):
                     # write to dataMem - check if addr is a valid datamem address
                     dst_addr = self.de_d1 + i
-                    if (dst_addr >= datamem_off):
+                    if (dst_addr >= self.cfg.datamem_off):
                         self.dataMem.write (dst_addr, self.de_val1)
                     else:
-                        writeToXbarMem (self, dst_addr, self.de_val1)
+                        self.writeToXbarMem (dst_addr, self.de_val1)
 
             elif (ex_op == 'cp'):
                 for i in range (self.de_vec):
                     src_addr = self.de_r1 + i
                     # based on address read from dataMem or xb_inMem
-                    if (src_addr >= datamem_off):
+                    if (src_addr >= self.cfg.datamem_off):
                         ex_val1 = self.dataMem.read (src_addr)
                     else:
-                        ex_val1 = readFromXbarMem (self, src_addr)
+                        ex_val1 = self.readFromXbarMem (src_addr)
 
                     dst_addr = self.de_d1 + i
                     # based on the address write to dataMem or xb_inMem
-                    if (dst_addr >= datamem_off):
+                    if (dst_addr >= self.cfg.datamem_off):
                         self.dataMem.write (dst_addr, ex_val1)
                     else:
-                        writeToXbarMem (self, dst_addr, ex_val1)
+                        self.writeToXbarMem (dst_addr, ex_val1)
 
             elif (ex_op == 'alu'):
                 for i in range (self.de_vec):
                     # read val 1 either from data memory or xbar_outmem
                     src_addr1 = self.de_r1 + i
-                    if (src_addr1 >= datamem_off):
+                    if (src_addr1 >= self.cfg.datamem_off):
                         ex_val1 = self.dataMem.read (src_addr1)
                     else:
-                        ex_val1 = readFromXbarMem (self, src_addr1)
+                        ex_val1 = self.readFromXbarMem (src_addr1)
 
                     # read val 2 either from data memory or xbar_outmem
                     src_addr2 = self.de_r2 + i
-                    if (src_addr2 >= datamem_off):
+                    if (src_addr2 >= self.cfg.datamem_off):
                         ex_val2 = self.dataMem.read (src_addr2)
                     else:
-                        ex_val2 = readFromXbarMem (self, src_addr2)
+                        ex_val2 = self.readFromXbarMem (src_addr2)
 
                     # compute in ALU
                     [out, ovf] = self.alu_list[0].propagate (ex_val1, ex_val2, self.de_aluop, self.de_val1) #self.de_val1 is the 3rd operand for lsh
@@ -521,19 +671,19 @@ class ima (object):
 
                     # write to dataMem - check if addr is a valid datamem address
                     dst_addr = self.de_d1 + i
-                    if (dst_addr >= datamem_off):
+                    if (dst_addr >= self.cfg.datamem_off):
                         self.dataMem.write (dst_addr, out)
                     else:
-                        writeToXbarMem (self, dst_addr, ex_val1)
+                        self.writeToXbarMem (dst_addr, ex_val1)
 
             elif (ex_op == 'alui'):
                 for i in range (self.de_vec):
                     # read val 2 either from data memory or xbar_outmem
                     src_addr2 = self.de_r1 + i
-                    if (src_addr2 >= datamem_off):
+                    if (src_addr2 >= self.cfg.datamem_off):
                         ex_val2 = self.dataMem.read (src_addr2)
                     else:
-                        ex_val2 = readFromXbarMem (self, src_addr2)
+                        ex_val2 = self.readFromXbarMem (src_addr2)
 
                     # compute in ALU
                     [out, ovf] = self.alu_list[0].propagate (self.de_val1, ex_val2, self.de_aluop)
@@ -543,10 +693,10 @@ class ima (object):
 
                     # write to dataMem - check if addr is a valid datamem address
                     dst_addr = self.de_d1 + i
-                    if (dst_addr >= datamem_off):
+                    if (dst_addr >= self.cfg.datamem_off):
                         self.dataMem.write (dst_addr, out)
                     else:
-                        writeToXbarMem (self, dst_addr, ex_val1)
+                        self.writeToXbarMem (dst_addr, ex_val1)
 
             elif (ex_op == 'mvm'):
                 ## Define function to perform inner-product on specified mvmu
@@ -557,10 +707,10 @@ class ima (object):
                     self.xb_outMem_list[mat_id][key].reset ()
 
                     ## Loop to cover all bits of inputs
-                    for k in xrange (cfg.xbdata_width / cfg.dac_res):
+                    for k in xrange (self.cfg.xbdata_width / self.cfg.dac_res):
                     #for k in xrange (1):
                         # read the values from the xbar's input register
-                        out_xb_inMem = self.xb_inMem_list[mat_id][key].read (cfg.dac_res)
+                        out_xb_inMem = self.xb_inMem_list[mat_id][key].read (self.cfg.dac_res)
 
                         #*************************************** HACK *********************************************
                         ###### CAUTION: Not replicated exact "functional" circuit behaviour for analog parts
@@ -571,7 +721,7 @@ class ima (object):
                         out_dac = self.dacArray_list[mat_id][key].propagate_dummy (out_xb_inMem) #pass through
 
                         # Do for (data_width/xbar_bits) xbars
-                        num_xb = cfg.data_width / cfg.xbar_bits
+                        num_xb = self.cfg.data_width / self.cfg.xbar_bits
                         out_xbar = [[] for x in range(num_xb)]
                         out_snh = [[] for x in range(num_xb)]
                         for m in range (num_xb):
@@ -581,14 +731,14 @@ class ima (object):
                             out_snh[m] = self.snh_list[mat_id*num_xb+m].propagate_dummy (out_xbar[m])
 
                         # each of the num_xb produce shifted bits of output (weight bits have been distributed)
-                        for j in xrange (cfg.xbar_size): # this 'for' across xbar outs to adc happens via mux
+                        for j in xrange (self.cfg.xbar_size): # this 'for' across xbar outs to adc happens via mux
                             #out_sna = '0'*cfg.data_width # a zero for first sna
                             out_sna = 0.0 # a zero for first sna
                             for m in range (num_xb):
                                 # convert from analog to digital
-                                adc_id = (mat_id*num_xb + m) % cfg.num_adc
+                                adc_id = (mat_id*num_xb + m) % self.cfg.num_adc
                                 out_mux1 = self.mux1_list[mat_id].propagate_dummy (out_snh[m][j]) # i is the ith xbar
-                                out_mux2 = self.mux2_list[mat_id % cfg.num_adc].propagate_dummy (out_mux1)
+                                out_mux2 = self.mux2_list[mat_id % self.cfg.num_adc].propagate_dummy (out_mux1)
                                 out_adc = self.adc_list[adc_id].propagate_dummy (out_mux2)
 
                                 # shift and add outputs from difefrent wt_bits
@@ -596,17 +746,17 @@ class ima (object):
                                 #[out_sna, ovf] = self.alu_list[0].propagate (out_sna, out_adc, alu_op, \
                                 #        m * cfg.xbar_bits)
                                 [out_sna, ovf] = self.alu_list[0].propagate_float (out_sna, out_adc, alu_op, \
-                                        m*cfg.xbar_bits)
+                                        m*self.cfg.xbar_bits)
 
                             # convert the inter-xbar sna output to fixed hereon
-                            out_sna = float2fixed(out_sna, cfg.int_bits, cfg.frac_bits)
+                            out_sna = float2fixed(out_sna, self.cfg.int_bits, self.cfg.frac_bits)
                             # read from xbar's output register
                             out_xb_outMem = self.xb_outMem_list[mat_id][key].read (j)
                             # shift and add - make a dedicated sna unit -- PENDING
                             alu_op = 'sna'
                             # modify (len(out_adc) to adc_res) when ADC functionality is implemented
-                            [out_sna, ovf] = self.alu_list[0].propagate (out_xb_outMem, out_sna, alu_op, k*cfg.dac_res)
-                            if (cfg.debug and ovf):
+                            [out_sna, ovf] = self.alu_list[0].propagate (out_xb_outMem, out_sna, alu_op, k*self.cfg.dac_res)
+                            if (self.cfg.debug and ovf):
                                 fid.write ('IMA: ' + str(self.ima_id) + ' ALU Overflow Exception ' +\
                                         self.de_aluop + ' allowed to run')
                             # store back to xbar's output register & restart it
@@ -623,30 +773,33 @@ class ima (object):
                     out_xb_outMem = self.xb_outMem_list[mat_id][key].read_p() # read entire xb_outMem
 
                     # Loop to cover all bits of inputs - bit-streamed inputs across rows
-                    for j in xrange (cfg.xbdata_width/cfg.dac_res):
+                    for j in xrange (self.cfg.xbdata_width/self.cfg.dac_res):
 
                         # read the fw-activations to provide inputs across the rows
-                        out_xb_inMem = self.xb_inMem_list[mat_id][key].read (cfg.dac_res)
+                        out_xb_inMem = self.xb_inMem_list[mat_id][key].read (self.cfg.dac_res)
 
                         # left shift the bw-error values for subsequent bit-streamed computation (jth loop) to make a list of
                         # 32-bit values
-                        out_xb_outMem_temp = [((cfg.num_bits-j)*'0' + val + j*'0') for val in out_xb_outMem]
+                        out_xb_outMem_temp = [((self.cfg.num_bits-j)*'0' + val + j*'0') for val in out_xb_outMem]
 
                         # do outer product on all physical xbars (for a logical xbar)
                         # Note: 2X delta xbars than fw/bw xbars
-                        num_xb = (2*cfg.data_width) / cfg.xbar_bits
+                        num_xb = (2*self.cfg.data_width) / self.cfg.xbar_bits
                         for m in xrange (num_xb):
                             out_dac1 = self.dacArray_list[mat_id]['d_r'].propagate_dummy (out_xb_inMem)
                             if (m == 0):
-                                temp = [val[-((m+1)*cfg.xbar_bits):] for val in out_xb_outMem_temp]
+                                temp = [val[-((m+1)*self.cfg.xbar_bits):] for val in out_xb_outMem_temp]
                             else:
-                                temp = [val[-((m+1)*cfg.xbar_bits):-(m*cfg.xbar_bits)] for val in out_xb_outMem_temp]
+                                temp = [val[-((m+1)*self.cfg.xbar_bits):-(m*self.cfg.xbar_bits)] for val in out_xb_outMem_temp]
                             out_dac2 = self.dacArray_list[mat_id]['d_c'].propagate_dummy (temp)
 
-                            self.matrix_list[mat_id][key][m].propagate_op_dummy (out_dac1, out_dac2, cfg.lr)
+                            self.matrix_list[mat_id][key][m].propagate_op_dummy (out_dac1, out_dac2, self.cfg.lr)
+
+                if (self.mvm_fast):
+                    inner_product = self.inner_product_fast
 
                 ## Traverse through the matrices in a core
-                for i in xrange (cfg.num_matrix):
+                for i in xrange (self.cfg.num_matrix):
                     # traverse through f/b/d mvmu(s) for the matrix and execute if applicable
                     mask_temp = self.de_xb_nma[i]
                     if (mask_temp[0] == '1'):
@@ -662,89 +815,59 @@ class ima (object):
 
             elif (ex_op == 'crs'):
                 # read weights from delta-xbar, synchronize, write to f/b xbars
-                num_xbD = (2*cfg.data_width) / cfg.xbar_bits
-                num_xbF = (cfg.data_width) / cfg.xbar_bits
-                for mat_id in range (cfg.num_matrix):
+                num_xbD = (2*self.cfg.data_width) / self.cfg.xbar_bits
+                num_xbF = (self.cfg.data_width) / self.cfg.xbar_bits
+                for mat_id in range (self.cfg.num_matrix):
                     mask_temp = self.de_xb_nma[mat_id]
                     if (mask_temp == '1'):
-                        for k in range (cfg.xbar_size):
-                            for l in range (cfg.xbar_size):
+                        for k in range (self.cfg.xbar_size):
+                            for l in range (self.cfg.xbar_size):
                                 # read wt slices from delta xbar to compose a new weight
                                 wt_new_float = 0.0
                                 for m in range (num_xbD):
-                                    wt_new_float += self.matrix_list[mat_id]['d'][m].read(k,l) * (2 **(2*m)) # left shift by 2m, and subtraction by cfg.frac_bits to
+                                    wt_new_float += self.matrix_list[mat_id]['d'][m].read(k,l) * (2 **(2*m)) # left shift by 2m, and subtraction by self.cfg.frac_bits to
                                 # write wt slices to f and b xbar
                                 # captures precision loss, as values read from 16 xbars (32-bits) are converted to 16-bits
-                                wt_new_fixed = float2fixed (wt_new_float, cfg.int_bits, cfg.frac_bits)
+                                wt_new_fixed = float2fixed (wt_new_float, self.cfg.int_bits, self.cfg.frac_bits)
                                 for m in range (num_xbF):
                                     if (m==0):
-                                        val = wt_new_fixed[-(m+1)*cfg.xbar_bits:]
+                                        val = wt_new_fixed[-(m+1)*self.cfg.xbar_bits:]
                                     else:
-                                        val = wt_new_fixed[-(m+1)*cfg.xbar_bits:-(m+1)*cfg.xbar_bits+2]
+                                        val = wt_new_fixed[-(m+1)*self.cfg.xbar_bits:-(m+1)*self.cfg.xbar_bits+2]
                                     # augment sign extension (used in MSB xbar only)
                                     if (m == (num_xbF-1)):
-                                        val = (cfg.num_bits - cfg.xbar_bits)*val[0] + val[0:]
-                                    val_float = fixed2float(val, cfg.int_bits, cfg.frac_bits) # xbar_value in xbar stores float values
+                                        val = (self.cfg.num_bits - self.cfg.xbar_bits)*val[0] + val[0:]
+                                    val_float = fixed2float(val, self.cfg.int_bits, self.cfg.frac_bits) # xbar_value in xbar stores float values
                                     self.matrix_list[mat_id]['f'][m].write(k, l, val_float)
                                     self.matrix_list[mat_id]['b'][m].write(k, l, val_float)
 
             elif (ex_op == 'jmp'):
                 self.fd_instrn['opcode'] = 'nop'
+                self.fd_pc = -1
                 self.pc = self.de_instrn['imm']
 
             elif (ex_op == 'beq'):
                 [out, ovf] = self.alu_int.propagate (self.de_val1, self.de_val2, self.de_aluop) #self.de_val1 is the 3rd operand for lsh
-                out_int = bin2int(out, cfg.num_bits)
+                out_int = bin2int(out, self.cfg.num_bits)
                 if (out_int == 1):
                     # should add a mux unit (for realistic hw here to update pc & pipe registers)
                     self.fd_instrn['opcode'] = 'nop'
+                    self.fd_pc = -1
                     self.pc = self.de_instrn['imm']
 
             elif (ex_op == 'alu_int'): # produces values used by load/st (mem addr read from dataMem), beq (operand reads)
                 [out, ovf] = self.alu_int.propagate (self.de_val1, self.de_val2, self.de_aluop) #self.de_val1 is the 3rd operand for lsh
                 # write to dataMem - check if addr is a valid datamem address
-                assert (self.de_d1 >= datamem_off), 'ALU instrn: datamemory write addrress is invalid'
+                assert (self.de_d1 >= self.cfg.datamem_off), 'ALU instrn: datamemory write addrress is invalid'
                 self.dataMem.write (self.de_d1, out)
 
             elif (ex_op == 'hlt'): # for halt instruction
                 self.halt = 1
             # do nothing for nop instruction
 
-
-        # Computes the latency for mvm instruction based on DPE configuration
-        def xbComputeLatency (self, mask):
-            #Parse out the mask to find if f/b/d xbars operations will be computed
-            fb_found = 0
-            d_found = 0
-            for temp in mask:
-                if ((temp[0] == '1') or (temp[1] == '1')):
-                    fb_found += 1
-                    #break
-                if (temp[2] == '1'):
-                    d_found += 1
-                    #break
-
-            ## MVM inner product goes through a 3 stage pipeline (each stage consumes 128 cycles - xbar aces latency)
-            # Cycle1 - xbar_inMem + DAC + XBar
-            # Cycle2 - SnH + ADC
-            # Cycle3 - SnA + xbar_outMem
-            # The above pipeline is valid for one ADC per physical xbar only !! (Update for other cases, if required)
-            num_stage = 3
-            lat_temp = self.matrix_list[0]['f'][0].getIpLatency() # due to xbar access
-            #latency_ip = lat_temp * ((cfg.xbdata_width / cfg.dac_res) + num_stage - 1) * fb_found
-            latency_ip = lat_temp * ((cfg.xbdata_width / cfg.dac_res) + num_stage - 1) * float(int(fb_found>0))
-            ## MVM outer product occurs in 4 cycles to take care of all i/o polarities (++, +-, -+, --)
-            num_phase = 4
-            lat_temp = self.matrix_list[0]['f'][0].getOpLatency()
-            #latency_op = lat_temp * num_phase * d_found
-            latency_op = lat_temp * num_phase * float(int(d_found>0))
-            ## output latency should be the max of ip/op operation
-            latency_out = max(latency_ip, latency_op)
-            print ("Mask", mask)
-            print ("Latency IP", latency_ip)
-            print ("Latency OP", latency_op)
-            return latency_out
-
+        # Functional modes - only do the execute (see do_execute method)
+        if (now_op != ''):
+            return do_execute (self, now_op, fid)
 
         # State machine runs only if the stage is non-empty
         # Describe the functionality on a cycle basis
@@ -753,61 +876,25 @@ class ima (object):
             if (self.stage_cycle[sId] == 0):
                 # Check for assertion pass
                 ex_op = self.de_opcode
-                assert (ex_op in param.op_list), 'unsupported opcode'
+                assert (ex_op in self.param.op_list), 'unsupported opcode'
 
                 # assign execution unit based stage latency
-                if (ex_op in ['ld', 'st']):
-                    if (ex_op == 'ld'):
-                        self.stage_latency[sId] = self.mem_interface.getLatency() #mem_interface has infinite latency
-                        self.mem_interface.rdRequest (self.de_r1 + self.ex_vec_count * self.de_r2, self.de_r2)
-                    elif (ex_op == 'st'):
-                        self.stage_latency[sId] = self.dataMem.getLatency() #mem_interface has infinite latency
-
-                elif (ex_op == 'cp'):
-                    # cp instructions reads from datamemory/xbinmem & writes to xb_inmem/datamem
-                    unit_lat = self.dataMem.getLatency()
-                    #self.stage_latency[sId] = self.de_vec * unit_lat
-                    self.stage_latency[sId] = unit_lat # cp can just assign mux selectors for each xbar (which inmem feeds the xbar)
-
-                elif (ex_op == 'set'):
-                    # set writes to data memory
-                    unit_lat = self.dataMem.getLatency()
-                    self.stage_latency[sId] = self.de_vec * unit_lat
-
-                elif (ex_op == 'alu' or ex_op == 'alui'):
-                    # ALU instructions read from memory, access ALU and write to memory
-                    unit_lat = self.alu_list[0].getLatency ()
-                    #unit_lat = self.dataMem.getLatency() + \
-                    #            self.alu_list[0].getLatency() + self.dataMem.getLatency()
-                    self.stage_latency[sId] = int (math.ceil(self.de_vec / cfg.num_ALU)) * unit_lat
-
-                elif (ex_op == 'mvm'):
-                    mask_temp = self.de_xb_nma
-                    self.stage_latency[sId] = xbComputeLatency (self, mask_temp) # mask tells which of ip/op or both is occurring
-
-                # Needs update - use xbar serial read latency
-                elif (ex_op == 'crs'):
-                    temp_lat = max(self.matrix_list[0]['f'][0].getWrLatency(), self.matrix_list[0]['f'][0].getRdLatency())
-                    self.stage_latency[sId] = temp_lat
-
-                elif (ex_op in ['beq', 'alu_int']):
-                    self.stage_latency[sId] = self.alu_int.getLatency ()
-
-                else: # halt/jmp/nop instruction
-                    self.stage_latency[sId] = 1
+                self.stage_latency[sId] = self.getExLatency (ex_op)
+                if (ex_op == 'ld'):
+                    self.mem_interface.rdRequest (self.de_r1 + self.ex_vec_count * self.de_r2, self.de_r2)
 
                 # Check if first = last cycle - NA for LD/ST
                 # (EDRAM + Controller always latency >= 2) - Follow this else deisgn breaks
                 if (ex_op == 'st' and self.stage_latency[sId] == 0):
                     # read the data from dataMem or xb_outMem depending on address
-                    st_data_addr =  self.de_r1 + self.ex_vec_count * (cfg.edram_buswidth/cfg.data_width) # address of data in register
-                    ex_val1 = ['' for num in range (cfg.edram_buswidth/cfg.data_width)] # modified
-                    if (st_data_addr >= cfg.num_xbar * cfg.xbar_size):
+                    st_data_addr =  self.de_r1 + self.ex_vec_count * (self.cfg.edram_buswidth/self.cfg.data_width) # address of data in register
+                    ex_val1 = ['' for num in range (self.cfg.edram_buswidth/self.cfg.data_width)] # modified
+                    if (st_data_addr >= self.cfg.num_xbar * self.cfg.xbar_size):
                         for num in range (self.de_r2): # modified
                             ex_val1[num] = self.dataMem.read (st_data_addr+num) # modified
                     else:
-                        xb_id = st_data_addr / cfg.xbar_size
-                        addr = st_data_addr % cfg.xbar_size
+                        xb_id = st_data_addr / self.cfg.xbar_size
+                        addr = st_data_addr % self.cfg.xbar_size
                         for num in range (self.de_r2): # modified
                             ex_val1[num] = self.xb_outMem_list[xb_id].read (addr+num) # modified
                     # combine counter and data
@@ -822,25 +909,15 @@ class ima (object):
                     self.stage_done[sId] = 1
                     self.stage_cycle[sId] = 0
                     self.stage_empty[sId] = 1
+                    if (self.sample != None):
+                        self.sample.exec_done (self)
 
                 else: # NA for LD/ST
                     self.stage_cycle[sId] = self.stage_cycle[sId] + 1
 
             # Check whether datamem access for st has finished
             elif (self.de_opcode == 'st' and self.stage_cycle[sId] == self.stage_latency[sId]):
-                # read the data from dataMem or xb_outMem depending on address
-                st_data_addr =  self.de_r1 + self.ex_vec_count * (cfg.edram_buswidth/cfg.data_width) # address of data in register
-                ex_val1 = ['' for num in range (cfg.edram_buswidth/cfg.data_width)] # modified
-                if (st_data_addr >= datamem_off):
-                    for num in range (cfg.edram_buswidth / cfg.data_width): # modified
-                        ex_val1[num] = self.dataMem.read (st_data_addr+num) # modified
-                else:
-                    for num in range (cfg.edram_buswidth / cfg.data_width): # modified
-                        ex_val1[num] = readFromXbarMem (self, st_data_addr+num)
-                # combine counter and data
-                ramstore = [str(self.de_val1), ex_val1[:]] # modified - 1st item in list: counter value, 2nd item: list of values to be written to edram
-                self.mem_interface.wrRequest (self.de_d1 + \
-                        self.ex_vec_count * self.de_r2, ramstore, self.de_r2)
+                self.st_request ()
                 # to make sure st looks for memwait after datamem read
                 self.stage_cycle[sId] = self.stage_cycle[sId] + 1
 
@@ -855,6 +932,8 @@ class ima (object):
                 self.stage_cycle[sId] = 0
                 self.stage_empty[sId] = 1
                 self.ex_vec_count = 0
+                if (self.sample != None):
+                    self.sample.exec_done (self)
 
             # For LD and ST when all units until last vector
             elif ((self.de_opcode == 'ld' and self.stage_cycle[sId] >= self.stage_latency[sId]-1) or \
@@ -874,13 +953,41 @@ class ima (object):
                     self.stage_cycle[sId] = self.stage_cycle[sId] + 1
 
 
+    # A stage's work at once, without the pipeline timing - used by the sampled, loop fast-forward, transaction-level
+    # and functional modes
+    def do_fetch (self):
+        self.fetch (1, '', 1)
+
+    def do_decode (self, dec_op):
+        self.decode (1, '', dec_op)
+
+    def do_execute (self, ex_op, fid):
+        return self.execute (1, fid, ex_op)
+
+    # Read the data to store (current vector of st) from dataMem or xb_outMem & send the request to edram controller
+    def st_request (self):
+        # read the data from dataMem or xb_outMem depending on address
+        st_data_addr =  self.de_r1 + self.ex_vec_count * (self.cfg.edram_buswidth/self.cfg.data_width) # address of data in register
+        ex_val1 = ['' for num in range (self.cfg.edram_buswidth/self.cfg.data_width)] # modified
+        if (st_data_addr >= self.cfg.datamem_off):
+            for num in range (self.cfg.edram_buswidth / self.cfg.data_width): # modified
+                ex_val1[num] = self.dataMem.read (st_data_addr+num) # modified
+        else:
+            for num in range (self.cfg.edram_buswidth / self.cfg.data_width): # modified
+                ex_val1[num] = self.readFromXbarMem (st_data_addr+num)
+        # combine counter and data
+        ramstore = [str(self.de_val1), ex_val1[:]] # modified - 1st item in list: counter value, 2nd item: list of values to be written to edram
+        self.mem_interface.wrRequest (self.de_d1 + \
+                self.ex_vec_count * self.de_r2, ramstore, self.de_r2)
+
+
     #####################################################
     ## Define how pipeline executes
     #####################################################
     def pipe_init (self, instrn_filepath, fid = ''):
         self.debug = 0
         # tracefile stores the debug trace in debug mode
-        if (cfg.debug and (fid != '')):
+        if (self.cfg.debug and (fid != '')):
             self.debug = 1
             fid.write ('Cycle information is printed is at the end of the clock cycle\n')
             fid.write ('Assumption: A clock cycle ends at the positive edge\n')
@@ -901,10 +1008,25 @@ class ima (object):
 
         self.ldAccess_done = 0
         self.cycle_count = 0
+        self.last_cycle = -1
 
     # Mimics one cycle of ima pipeline execution
     def pipe_run (self, cycle, fid = ''): # fid is tracefile's id
         self.cycle_count += 1
+        self.last_cycle = cycle
+        # Transaction-level timing - instructions execute atomically (see ima_tlm)
+        if (self.tlm != None):
+            self.tlm.run (self, cycle, fid)
+            return
+        # Sampled simulation - loop iterations executed functionally (see ima_sample)
+        if (self.sample != None and self.sample.functional):
+            if (self.sample.func_run (self, cycle, fid)):
+                return
+        # Loop fast-forward - sleeping through fast-forwarded iterations (see ima_loop)
+        if (self.loop != None and self.loop.active):
+            if (self.loop.run (self, cycle, fid)):
+                return
+
         # Run the pipeline for once cycle
         # Define a stage function
         stage_function = {0 : self.fetch,
@@ -922,6 +1044,10 @@ class ima (object):
             # run the stage based on its update_ready argument
             stage_function[i] (update_ready, fid)
 
+        # Sampled simulation - switch to functional execution after a loop iteration
+        if (self.sample != None):
+            self.sample.cycle_end (self)
+
         # If specified, print thetrace (pipeline stage information)
         if (self.debug):
             fid.write('Cycle ' + str(cycle) + '\n')
@@ -948,3 +1074,84 @@ class ima (object):
             if (self.halt == 1):
                 fid.write ('IMA halted at ' + str(cycle) + ' cycles')
 
+        # Loop fast-forward - fast-forward the next loop iteration if it is steady
+        if (self.loop != None):
+            self.loop.cycle_end (self, cycle, fid)
+
+
+    #####################################################
+    ## Define event-driven (fast-forward) support
+    #####################################################
+    # A stage is idle in a cycle if the cycle only increments its stage_cycle (count-down of stage latency)
+    # Returns the number of idle cycles of a (non-empty) stage before it needs a real cycle
+    def stage_idle_cycles (self, sId, update_ready):
+        # First cycle and last cycle (when succeeding stage is done) update pipeline registers
+        if (self.stage_cycle[sId] == 0 or \
+                (self.stage_cycle[sId] >= self.stage_latency[sId]-1 and update_ready and (not self.halt))):
+            return 0
+        # Count-down till last cycle
+        if (self.stage_cycle[sId] < self.stage_latency[sId]-1):
+            return int (math.ceil (self.stage_latency[sId]-1 - self.stage_cycle[sId]))
+        # Waiting for succeeding stage - woken up by an event in succeeding stage
+        return float('inf')
+
+    # Returns the next cycle (after cycle) in which the ima pipeline does more than count-down
+    def pipe_next_event (self, cycle):
+        if (self.tlm != None):
+            return self.tlm.next_event (self, cycle)
+        if (self.sample != None and self.sample.functional):
+            return self.sample.next_event (self, cycle)
+        if (self.loop != None and self.loop.active):
+            return max (cycle + 1, self.loop.wake_cycle)
+        idle_cycles = float('inf')
+
+        # Execute stage - LD/ST wait for edram controller (mem_interface.wait), update_ready is always 1
+        sId = 2
+        if (self.stage_empty[sId] != 1):
+            ex_op = self.de_opcode
+            if (self.stage_cycle[sId] == 0):
+                return cycle + 1
+            elif (ex_op == 'st'):
+                if (self.stage_cycle[sId] == self.stage_latency[sId] or self.mem_interface.wait == 0):
+                    return cycle + 1
+                if (self.stage_cycle[sId] < self.stage_latency[sId]):
+                    idle_cycles = self.stage_latency[sId] - self.stage_cycle[sId]
+            elif (ex_op == 'ld'):
+                if (self.stage_cycle[sId] >= self.stage_latency[sId]-1 or \
+                        (self.mem_interface.wait == 0 and self.ldAccess_done == 0)):
+                    return cycle + 1
+                idle_cycles = self.stage_latency[sId]-1 - self.stage_cycle[sId]
+            else:
+                idle_cycles = self.stage_idle_cycles (sId, 1)
+
+        # Decode and fetch stages - update_ready comes from the succeeding stage
+        for sId in [1, 0]:
+            if (self.stage_empty[sId] != 1):
+                idle_cycles = min (idle_cycles, self.stage_idle_cycles (sId, self.stage_done[sId+1]))
+
+        return cycle + 1 + idle_cycles
+
+    # Mimics num_cycles idle cycles of ima pipeline execution (see pipe_next_event)
+    def pipe_skip (self, num_cycles):
+        self.cycle_count += num_cycles
+        self.last_cycle += num_cycles
+        # fast-forwarded loop iteration - pipeline is set to its state at wake-up (see ima_loop)
+        if (self.loop != None and self.loop.active):
+            return
+        # transaction-level timing - no pipeline state
+        if (self.tlm != None):
+            return
+        for sId in range (self.num_stage):
+            if (self.stage_empty[sId] != 1):
+                self.stage_cycle[sId] = self.stage_cycle[sId] + num_cycles
+
+    # Empties the pipeline - fetch restarts at pc (if fetch is set)
+    # Used by sampled simulation to switch between detailed and functional execution at instruction boundaries
+    def pipe_reset (self, pc, fetch):
+        self.pc = pc
+        self.stage_empty = [1] * self.num_stage
+        self.stage_empty[0] = int (not fetch)
+        self.stage_cycle = [0] * self.num_stage
+        self.stage_done = [1] * self.num_stage
+        self.ex_vec_count = 0
+        self.ldAccess_done = 0
@@ -0,0 +1,204 @@
+# Loop fast-forward (exact) of steady-state core loop iterations
+# An iteration is the run of instructions between two taken backward branches (jmp/beq) - it ends in the cycle the
+# branch executes. Instruction latencies are fixed by the instructions (except ld/st - edram controller), so the
+# pipeline timing at the start of an iteration (pcs in flight, stage flags, cycles & latencies) and the outcomes of its
+# beqs decide its timing. Per ima:
+# 1. an iteration without ld/st/hlt that starts and ends with the same pipeline timing is steady - its pipeline events
+#    (do_fetch/do_decode/do_execute in order), cycles and access count deltas are kept per (start timing, beq outcomes)
+# 2. after an iteration ending with the timing of a steady iteration, the next iteration is executed at once by
+#    replaying the events (same values, mvm with inner_product_fast). The ima then sleeps for the iteration's cycles,
+#    its pipeline timing is set to the steady one and its access counts are advanced by the deltas
+# 3. a beq resolving differently from the kept iterations (e.g. loop exit) stops the replay before it - the pipeline
+#    timing & access counts of its cycle are restored and the ima is simulated cycle by cycle from that cycle on
+# Outputs, cycles and access counts are the same as in the cycle-by-cycle simulation (debug traces aren't written for
+# fast-forwarded cycles)
+
+import numpy as np
+
+import ima_sample
+from data_convert import *
+
+### Pipeline timing of an ima - equal timings (and beq outcomes) give equal timing of the following cycles
+def get_timing (temp_ima):
+    fd_opcode = temp_ima.fd_instrn['opcode'] if (type(temp_ima.fd_instrn) == dict) else ''
+    return (temp_ima.pc, temp_ima.fd_pc, temp_ima.de_pc, fd_opcode, temp_ima.de_opcode, tuple (temp_ima.stage_empty), \
+            tuple (temp_ima.stage_done), tuple (temp_ima.stage_cycle), tuple (temp_ima.stage_latency), \
+            temp_ima.ex_vec_count, temp_ima.ldAccess_done, temp_ima.halt)
+
+# Set the stage state (rest of the timing is set by the pipeline events)
+def set_timing (temp_ima, timing):
+    temp_ima.stage_empty = list (timing[5])
+    temp_ima.stage_done = list (timing[6])
+    temp_ima.stage_cycle = list (timing[7])
+    temp_ima.stage_latency = list (timing[8])
+    temp_ima.ex_vec_count = timing[9]
+    temp_ima.ldAccess_done = timing[10]
+
+# Outcome of the beq in execute (alu_int eq_chk on the decoded operands)
+def beq_taken (temp_ima):
+    return int (bin2int (temp_ima.de_val1, temp_ima.cfg.num_bits) == bin2int (temp_ima.de_val2, temp_ima.cfg.num_bits))
+
+class ima_loop (object):
+
+    def __init__ (self):
+        self.counter_list = []
+
+        # iteration being recorded - start cycle, timing (None - not recorded) & counts, pipeline events (stage ids),
+        # beqs - [event index, outcome, cycle (from start), timing & count delta at the cycle start]
+        self.start_cycle = 0
+        self.start_timing = None
+        self.start_count = None
+        self.event_list = []
+        self.branch_list = []
+        self.external = 0 # ld/st/hlt in the iteration
+        self.backward = 0 # taken backward branch executed in this cycle
+
+        # steady iterations - timing -> list of [event_list, branch_list, cycles, count delta]
+        self.steady_dict = {}
+
+        # fast-forward - sleep till wake_cycle, then replay the next iteration (or resume cycle by cycle)
+        self.active = 0
+        self.resume = 0
+        self.wake_cycle = 0
+        self.timing = None
+        self.replaying = 0
+        self.num_iter = 0
+        self.num_cycle = 0
+
+    def get_count (self, temp_ima):
+        if (not self.counter_list):
+            self.counter_list = ima_sample.get_counter_list (temp_ima)
+        return np.array ([getattr (obj, name) for [obj, name] in self.counter_list], dtype = np.int64)
+
+    def set_count (self, count):
+        for i in range (len(self.counter_list)):
+            [obj, name] = self.counter_list[i]
+            setattr (obj, name, int (count[i]))
+
+    ### Cycle-by-cycle simulation - a pipeline event (stage sId updates pipeline registers, see ima.do_fetch etc.)
+    def event (self, temp_ima, sId):
+        if (self.replaying):
+            return
+        taken = -1
+        if (sId == 2 and temp_ima.de_opcode in ['jmp', 'beq']):
+            taken = 1 if (temp_ima.de_opcode == 'jmp') else beq_taken (temp_ima)
+            if (taken and temp_ima.de_instrn['imm'] <= temp_ima.de_pc):
+                self.backward = 1
+        if (self.start_timing == None or self.external):
+            return
+        if (sId == 2 and temp_ima.de_opcode in ['ld', 'st', 'hlt']):
+            self.external = 1
+            return
+        if (sId == 2 and temp_ima.de_opcode == 'beq'):
+            timing = get_timing (temp_ima)
+            self.branch_list.append ([len(self.event_list), taken, temp_ima.last_cycle - self.start_cycle, timing, \
+                    self.get_count (temp_ima) - self.start_count])
+        self.event_list.append (sId)
+
+    ### Cycle-by-cycle simulation - end of a cycle of the pipeline
+    def cycle_end (self, temp_ima, cycle, fid):
+        if (not self.backward):
+            return
+        self.backward = 0
+
+        # iteration ends - keep it if steady, fast-forward the next one if a steady iteration starts with this timing
+        timing = get_timing (temp_ima)
+        count = self.get_count (temp_ima)
+        if (self.start_timing == timing and not self.external):
+            outcome_list = [branch[1] for branch in self.branch_list]
+            steady_list = self.steady_dict.setdefault (timing, [])
+            if (not [steady for steady in steady_list if ([branch[1] for branch in steady[1]] == outcome_list)]):
+                steady_list.append ([self.event_list, self.branch_list, cycle - self.start_cycle, \
+                        count - self.start_count])
+        self.start_cycle = cycle
+        self.start_timing = timing
+        self.start_count = count
+        self.event_list = []
+        self.branch_list = []
+        self.external = 0
+        if (timing in self.steady_dict):
+            self.forward (temp_ima, cycle, fid, timing)
+
+    # Execute the iteration following cycle (pipeline timing - timing) at once & sleep for its cycles
+    def forward (self, temp_ima, cycle, fid, timing):
+        steady_list = self.steady_dict[timing]
+        start_count = self.get_count (temp_ima)
+        [event_list, branch_list, num_cycle, count] = steady_list[0]
+        outcome_list = []
+        self.replaying = 1
+        mvm_fast = temp_ima.mvm_fast
+        temp_ima.mvm_fast = 1
+        self.active = 1
+        i = 0
+        j = 0
+        while (i < len(event_list)):
+            sId = event_list[i]
+            if (sId == 0):
+                temp_ima.do_fetch ()
+            elif (sId == 1):
+                temp_ima.do_decode (temp_ima.fd_instrn['opcode'])
+            else:
+                if (j < len(branch_list) and branch_list[j][0] == i):
+                    outcome_list.append (beq_taken (temp_ima))
+                    # same start & beq outcomes so far give the same events - go on with an iteration taking this beq
+                    if (outcome_list[j] != branch_list[j][1]):
+                        temp_list = [steady for steady in steady_list if (len(steady[1]) > j and \
+                                [branch[1] for branch in steady[1][:j+1]] == outcome_list)]
+                        if (not temp_list):
+                            # simulate cycle by cycle from the cycle of the beq (not recorded as an iteration)
+                            [offset, branch_timing, branch_count] = branch_list[j][2:]
+                            set_timing (temp_ima, branch_timing)
+                            self.set_count (start_count + branch_count)
+                            self.wake_cycle = cycle + offset
+                            self.resume = 1
+                            self.start_timing = None
+                            break
+                        [event_list, branch_list, num_cycle, count] = temp_list[0]
+                    j += 1
+                temp_ima.do_execute (temp_ima.de_opcode, fid)
+            i += 1
+        if (not self.resume):
+            set_timing (temp_ima, timing)
+            self.set_count (start_count + count)
+            self.wake_cycle = cycle + num_cycle
+            self.timing = timing
+            self.num_iter += 1
+            self.num_cycle += num_cycle
+        temp_ima.mvm_fast = mvm_fast
+        self.replaying = 0
+
+    ### Fast-forward - returns 0 if the pipeline runs in this cycle (see ima.pipe_run)
+    def run (self, temp_ima, cycle, fid):
+        if (cycle < self.wake_cycle):
+            return 1
+        if (self.resume):
+            self.active = 0
+            self.resume = 0
+            return 0
+        # the fast-forwarded iteration ends in this cycle (with the steady timing)
+        self.forward (temp_ima, cycle, fid, self.timing)
+        return 1
+
+### Loop fast-forward of all imas of a (new) node
+def loop_init (node_dut):
+    for temp_tile in node_dut.tile_list:
+        if (temp_tile == None): # not in this process (parallel modes)
+            continue
+        for temp_ima in temp_tile.ima_list:
+            temp_ima.loop = ima_loop ()
+
+### Fast-forwarded iterations & cycles (summed over imas)
+def loop_stats (node_dut):
+    if (node_dut.tile_result_list != None): # parallel modes - summed over its imas by each tile's worker
+        return [sum ([result['loop'][k] for result in node_dut.tile_result_list]) for k in range (2)]
+    return tile_loop_stats (node_dut.tile_list)
+
+# Fast-forwarded iterations & cycles of the imas of the tiles in tile_list
+def tile_loop_stats (tile_list):
+    num_iter = 0
+    num_cycle = 0
+    for temp_tile in tile_list:
+        for temp_ima in temp_tile.ima_list:
+            num_iter += temp_ima.loop.num_iter
+            num_cycle += temp_ima.loop.num_cycle
+    return [num_iter, num_cycle]
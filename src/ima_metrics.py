@@ -3,12 +3,12 @@
 import sys
 
 # import dependency files
-import config as cfg
-import constants as param
+import dpe_config
 
 # Compute metrics of the ima based on paramaters in config file and dicts in constants file
 # Area is computed as the summation of all component area (doesn't consider physical layout)
-def compute_area (): #in mm2
+def compute_area (config = None): #in mm2
+    [cfg, param] = dpe_config.get_values (config)
     area = 0.0
     area += (cfg.num_matrix*3) * param.xbar_inMem_area # xbar_inMem one each for f/b/d xbars
     area += (cfg.num_matrix*11) * cfg.xbar_size * param.dac_area # 1 dac for input of f/b/d xbars, each phy xbar in d-xbar will have a dac_array, hence 8
@@ -32,7 +32,8 @@ def compute_area (): #in mm2
     return area
 
 # Leakage power is computed as sum of leakage powers of all components
-def compute_pow_leak ():
+def compute_pow_leak (config = None):
+    [cfg, param] = dpe_config.get_values (config)
     leak_pow = 0.0
     leak_pow += (cfg.num_matrix*3) * param.xbar_inMem_pow_leak # xbar_inMem
     leak_pow += (cfg.num_matrix*11) * cfg.xbar_size * param.dac_pow_leak # dac
@@ -49,7 +50,8 @@ def compute_pow_leak ():
     return leak_pow
 
 # Peak dynamic power (assumes all components are being accessed in each cycle)
-def compute_pow_dyn ():
+def compute_pow_dyn (config = None):
+    [cfg, param] = dpe_config.get_values (config)
     dyn_pow = 0.0
     dyn_pow += (cfg.num_matrix*3) * (param.xbar_inMem_pow_dyn_write + param.xbar_inMem_pow_dyn_read/cfg.xbar_size) # xbar_inMem - num_xbar * dac_res bits will be
                     #   read from xb_inMem in an interval that equals xbar_access time
@@ -68,8 +70,8 @@ def compute_pow_dyn ():
     return dyn_pow
 
 # Peak power of ima - leak pow + peak_dyn power
-def compute_pow_peak ():
-    peak_pow = compute_pow_leak() + compute_pow_dyn()
+def compute_pow_peak (config = None):
+    peak_pow = compute_pow_leak (config) + compute_pow_dyn (config)
     #print ('6 IMA peak (leak+dyn) power: ' + str (6 * peak_pow) + ' mW')
 
     ## Compare with ISSAC for iso-xbars (computational effciiency - ops/mm2)
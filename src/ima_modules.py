@@ -6,24 +6,26 @@
 import sys
 
 import numpy as np
-import constants as param
-import config as cfg
+import dpe_config
 import math
 from data_convert import *
 
 
 class xbar (object):
-    def __init__ (self, xbar_size, xbar_value = 'nil'):
+    def __init__ (self, xbar_size, xbar_value = 'nil', config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_accesses for different operations
         self.num_access = 0 # parallel reads (inner-product)
         self.num_access_rd = 0 # serial reads
         self.num_access_wr = 0 # serial writes
 
         # define latency for various xbar operations
-        self.latency_ip = param.xbar_ip_lat
-        self.latency_op = param.xbar_op_lat
-        self.latency_rd = param.xbar_rd_lat
-        self.latency_wr = param.xbar_wr_lat
+        self.latency_ip = self.param.xbar_ip_lat
+        self.latency_op = self.param.xbar_op_lat
+        self.latency_rd = self.param.xbar_rd_lat
+        self.latency_wr = self.param.xbar_wr_lat
 
         # xbar_value is the weights meant for one crossbar
         self.xbar_size = xbar_size
@@ -44,7 +46,7 @@ class xbar (object):
     def program (self, xbar_value = ''):
         # programs the crossbar with given matrix values
         val_size = np.shape (xbar_value)
-        size_max = cfg.xbar_size
+        size_max = self.cfg.xbar_size
         assert (val_size[0] <= size_max and val_size[1] <= size_max), \
                     'Xbar values format should be a numpy array of the xbar dimensions'
         #self.xbar_value[0:val_size[0], 0:val_size[1]] = xbar_value.copy ()
@@ -52,16 +54,16 @@ class xbar (object):
 
     # writes to a location on xbar
     def write (self, k, l, value):
-        assert (k < cfg.xbar_size), 'row entry exceeds xbar size'
-        assert (l < cfg.xbar_size), 'col entry exceeds xbar size'
+        assert (k < self.cfg.xbar_size), 'row entry exceeds xbar size'
+        assert (l < self.cfg.xbar_size), 'col entry exceeds xbar size'
         assert (type(value) == float), 'value written to xbar should be float'
         self.num_access_wr += 1
         self.xbar_value[k][l] = value
 
     # reads a location on xbar
     def read (self, k, l):
-        assert (k < cfg.xbar_size), 'row entry exceeds xbar size'
-        assert (l < cfg.xbar_size), 'col entry exceeds xbar size'
+        assert (k < self.cfg.xbar_size), 'row entry exceeds xbar size'
+        assert (l < self.cfg.xbar_size), 'col entry exceeds xbar size'
         self.num_access_rd += 1
         return self.xbar_value[k][l]
 
@@ -93,19 +95,19 @@ class xbar (object):
         inp_float = [0.0] * self.xbar_size
         for i in range(len(inp)):
             # extend data to num_bits for computation (sign extended)
-            temp_inp = (cfg.num_bits - cfg.dac_res) * '0' + inp[i]
-            inp_float[i] = fixed2float(temp_inp, cfg.int_bits, cfg.frac_bits)
+            temp_inp = (self.cfg.num_bits - self.cfg.dac_res) * '0' + inp[i]
+            inp_float[i] = fixed2float(temp_inp, self.cfg.int_bits, self.cfg.frac_bits)
         inp_float = np.asarray (inp_float)
         out_float = np.dot(inp_float, self.xbar_value)
 
         # record xbar_i if applicable
-        if (cfg.xbar_record):
+        if (self.cfg.xbar_record):
             self.record(out_float)
 
         # convert float back to fixed point binary
         out_fixed  = [''] * self.xbar_size
         for i in range(len(out_fixed)):
-            out_fixed[i] = float2fixed(out_float[i], cfg.int_bits, cfg.frac_bits)
+            out_fixed[i] = float2fixed(out_float[i], self.cfg.int_bits, self.cfg.frac_bits)
 
         #return out_fixed
         return out_float
@@ -114,7 +116,9 @@ class xbar (object):
 # xbar_op class supports both mvm (inner-product) and vvo (outer-product) operations
 class xbar_op (xbar):
     # add function for outer_product computation
-    def propagate_op_dummy (self, inp1 = 'nil', inp2 = 'nil', lr=1, in1_bit=cfg.dac_res, in2_bit=cfg.xbar_bits):
+    def propagate_op_dummy (self, inp1 = 'nil', inp2 = 'nil', lr=1, in1_bit=None, in2_bit=None):
+        in1_bit = self.cfg.dac_res if (in1_bit == None) else in1_bit
+        in2_bit = self.cfg.xbar_bits if (in2_bit == None) else in2_bit
         # inner-product and outer_product functions should have different energies (and other metrics) - NEEDS UPDATE
         self.num_access += 1
         # check both data inputs
@@ -129,10 +133,10 @@ class xbar_op (xbar):
         inp2_float = [0.0] * self.xbar_size
         for i in range(self.xbar_size):
             # extend data to num_bits for computation (sign extended)
-            temp_inp1 = (cfg.num_bits - in1_bit) * '0' + inp1[i]
-            temp_inp2 = (cfg.num_bits - in2_bit) * '0' + inp2[i]
-            inp1_float[i] = fixed2float(temp_inp1, cfg.int_bits, cfg.frac_bits)
-            inp2_float[i] = fixed2float(temp_inp2, cfg.int_bits, cfg.frac_bits)
+            temp_inp1 = (self.cfg.num_bits - in1_bit) * '0' + inp1[i]
+            temp_inp2 = (self.cfg.num_bits - in2_bit) * '0' + inp2[i]
+            inp1_float[i] = fixed2float(temp_inp1, self.cfg.int_bits, self.cfg.frac_bits)
+            inp2_float[i] = fixed2float(temp_inp2, self.cfg.int_bits, self.cfg.frac_bits)
         inp1_float = np.asarray (inp1_float)
         inp2_float = np.asarray (inp2_float)
 
@@ -144,12 +148,15 @@ class xbar_op (xbar):
 
 
 class dac (object):
-    def __init__ (self, dac_res):
+    def __init__ (self, dac_res, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
 
         # define latency
-        self.latency = param.dac_lat
+        self.latency = self.param.dac_lat
 
         self.dac_res = dac_res
 
@@ -159,14 +166,14 @@ class dac (object):
     def bin2real (self, inp, num_bits):
         # gets a n-bit (n = dac_res) digital value & returns an analog voltage value
         inp_max = '1' * num_bits # string with all 1s
-        analog_max = param.vdd
+        analog_max = self.param.vdd
         frac = int(inp, 2) / float(int(inp_max, 2))
         return analog_max * frac
 
     def propagate (self, inp):
         #self.num_access += 1
         if (inp == ''):
-            inp = '0' * cfg.dac_res
+            inp = '0' * self.cfg.dac_res
         assert ((type(inp) == str) and (len(inp) == self.dac_res)), 'dac input type/size (bits) mismatch (string expected)'
         num_bits = self.dac_res
         return self.bin2real (inp, num_bits)
@@ -174,15 +181,18 @@ class dac (object):
 
 # A dac_array is an arrays of DACs private to a xbar
 class dac_array (object):
-    def __init__ (self, xbar_size, dac_res):
+    def __init__ (self, xbar_size, dac_res, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define latency
-        self.latency = param.dac_lat
+        self.latency = self.param.dac_lat
 
         # generate multiple dacs (one per xbar input)
         self.dac_list = []
         self.xbar_size = xbar_size
         for i in xrange(xbar_size):
-            temp_dac = dac (dac_res)
+            temp_dac = dac (dac_res, config = config)
             self.dac_list.append(temp_dac)
 
     def getLatency (self):
@@ -213,12 +223,15 @@ class dac_array (object):
 
 # Probably - also doing the sampling part of (sample and hold) inside
 class adc (object):
-    def __init__ (self, adc_res):
+    def __init__ (self, adc_res, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
 
         # define latency
-        self.latency = param.adc_lat
+        self.latency = self.param.adc_lat
 
         self.adc_res = adc_res
 
@@ -227,8 +240,8 @@ class adc (object):
 
     def real2bin (self, inp, num_bits):
         num_levels = 2**num_bits
-        step = float((param.xbar_out_max - param.xbar_out_min)) / num_levels
-        int_value = int(np.ceil((inp - param.xbar_out_min) / float(step)))
+        step = float((self.param.xbar_out_max - self.param.xbar_out_min)) / num_levels
+        int_value = int(np.ceil((inp - self.param.xbar_out_min) / float(step)))
         bin_value = bin(int_value - 1)[2:]
         return ('0'*(num_bits - len(bin_value)) + bin_value)
 
@@ -245,12 +258,15 @@ class adc (object):
 
 # Doesn't replicate the exact (sample and hold) functionality (just does hold)
 class sampleNhold (object):
-    def __init__ (self, xbar_size):
+    def __init__ (self, xbar_size, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
 
         # define latency
-        self.latency = param.snh_lat
+        self.latency = self.param.snh_lat
 
         self.hold_latch = np.zeros(xbar_size)
 
@@ -267,18 +283,21 @@ class sampleNhold (object):
 
     def propagate_dummy (self, inp_list):
         self.num_access += 1
-        assert (len(inp_list) == cfg.xbar_size), 'sample&hold input size mismatch'
+        assert (len(inp_list) == self.cfg.xbar_size), 'sample&hold input size mismatch'
         out_list = inp_list[:]
         return out_list
 
 # Note the mux instantiations will be analog mux
 class mux (object):
-    def __init__ (self, num_in):
+    def __init__ (self, num_in, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
 
         # define latency
-        self.latency = param.mux_lat
+        self.latency = self.param.mux_lat
 
         # num_in is the inputs for the multiplexer
         self.num_in = num_in
@@ -301,7 +320,10 @@ class mux (object):
 #### Needs some change - add function op (for instance, shift bits for shift)
 ## Needs to add ALU overflow check/mitigation
 class alu (object):
-    def __init__ (self):
+    def __init__ (self, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         self.num_access_div = 0
         self.num_access_mul = 0
         self.num_access_act = 0
@@ -309,8 +331,12 @@ class alu (object):
         self.num_access_other = 0
 
         # define latency
-        self.latency = param.alu_lat
+        self.latency = self.param.alu_lat
 
+        self.set_options ()
+
+    # Define the alu operations (closures update access counts of this alu)
+    def set_options (self):
         # Arithmetic operations
         def add (a, b):
             self.num_access_other += 1
@@ -346,25 +372,35 @@ class alu (object):
         self.options = {'add':add, 'sub':sub, 'sna':shift_add, 'mul':multiply,\
                 'sig':sigmoid, 'tanh':tanh, 'relu':relu, 'max': max_val}
 
+    # options (closures) can't be pickled - rebuild them when an alu is unpickled (node state transfer)
+    def __getstate__ (self):
+        state = self.__dict__.copy()
+        del state['options']
+        return state
+
+    def __setstate__ (self, state):
+        self.__dict__.update (state)
+        self.set_options ()
+
     def getLatency (self):
         return self.latency
 
     def propagate (self, a, b, aluop, c = 0): # c can be shift operand for sna operation (add others later)
         assert ((type(aluop) == str) and (aluop in self.options.keys())), 'Invalid alu_op'
-        assert (type(c) == int or (type(c) == str and len(c) == cfg.num_bits)), 'ALU sna: shift = int/ num_bit str'
+        assert (type(c) == int or (type(c) == str and len(c) == self.cfg.num_bits)), 'ALU sna: shift = int/ num_bit str'
         if (type(c) == str):
-            c = bin2int (c, cfg.num_bits)
-        a = fixed2float (a, cfg.int_bits, cfg.frac_bits)
+            c = bin2int (c, self.cfg.num_bits)
+        a = fixed2float (a, self.cfg.int_bits, self.cfg.frac_bits)
         if (b == ''):
             b = 0
         else:
             if (aluop == 'sna'): # shift left in fixed point binary
                 b = b[c:] + '0' * c
-            b = fixed2float (b, cfg.int_bits, cfg.frac_bits)
+            b = fixed2float (b, self.cfg.int_bits, self.cfg.frac_bits)
         out = self.options[aluop] (a, b)
         # overflow needs to be detected while conversion
         ovf = 0
-        out = float2fixed (out, cfg.int_bits, cfg.frac_bits)
+        out = float2fixed (out, self.cfg.int_bits, self.cfg.frac_bits)
         return [out, ovf]
 
     # for functionality define a propagate float for use in inter-xbar shift-and-adds
@@ -373,9 +409,9 @@ class alu (object):
     # unless np.dot is implement using fixed point computation
     def propagate_float (self, a, b, aluop, c=0):
         assert ((type(aluop) == str) and (aluop in self.options.keys())), 'Invalid alu_op'
-        assert (type(c) == int or (type(c) == str and len(c) == cfg.num_bits)), 'ALU sna: shift = int/ num_bit str'
+        assert (type(c) == int or (type(c) == str and len(c) == self.cfg.num_bits)), 'ALU sna: shift = int/ num_bit str'
         if (type(c) == str):
-            c = bin2int (c, cfg.num_bits)
+            c = bin2int (c, self.cfg.num_bits)
         if (b == ''):
             b = 0
         else:
@@ -389,14 +425,21 @@ class alu (object):
 
 # Integer ALU
 class alu_int (object):
-    def __init__ (self):
+    def __init__ (self, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         self.num_access_div = 0
         self.num_access_mul = 0
         self.num_access_other = 0
 
         # define latency
-        self.latency = param.alu_lat
+        self.latency = self.param.alu_lat
 
+        self.set_options ()
+
+    # Define the alu operations (closures update access counts of this alu)
+    def set_options (self):
         # Arithmetic operations
         def add (a, b):
             self.num_access_other += 1
@@ -419,28 +462,41 @@ class alu_int (object):
 
         self.options = {'add':add, 'sub':sub, 'mul':multiply, 'div':divide, 'mod':mod, 'eq_chk':eq_chk}
 
+    # options (closures) can't be pickled - rebuild them when an alu is unpickled (node state transfer)
+    def __getstate__ (self):
+        state = self.__dict__.copy()
+        del state['options']
+        return state
+
+    def __setstate__ (self, state):
+        self.__dict__.update (state)
+        self.set_options ()
+
     def getLatency (self):
         return self.latency
 
     def propagate (self, a, b, aluop):
         assert ((type(aluop) == str) and (aluop in self.options.keys())), 'Invalid alu_op'
-        a = bin2int (a, cfg.num_bits)
-        b = bin2int (b, cfg.num_bits)
+        a = bin2int (a, self.cfg.num_bits)
+        b = bin2int (b, self.cfg.num_bits)
         out = self.options[aluop] (a, b)
         # overflow needs to be detected while conversion
         ovf = 0
-        out = int2bin(out, cfg.num_bits)
+        out = int2bin(out, self.cfg.num_bits)
         return [out, ovf]
 
 
 # Assumes a half-word oriented memory (each entry - 16 bits)
 class memory (object):
-    def __init__ (self, size, addr_offset = 0):
+    def __init__ (self, size, addr_offset = 0, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
 
         # define latency
-        self.latency = param.dataMem_lat
+        self.latency = self.param.dataMem_lat
 
         # memfile will store half-word (16 bits digital data) length strings
         self.size = size
@@ -464,7 +520,7 @@ class memory (object):
         assert (type(addr) == int), 'addr type should be int'
         assert (self.addr_start <= addr <= self.addr_end), 'addr exceeds the memory bounds'
         #print 'length of data ' + str(len(data))
-        assert ((type(data) ==  str) and (len(data) == cfg.data_width)), 'data should be a string with mem_width bits'
+        assert ((type(data) ==  str) and (len(data) == self.cfg.data_width)), 'data should be a string with mem_width bits'
         self.memfile[addr - self.addr_start] = data
 
     def reset (self):
@@ -475,13 +531,16 @@ class memory (object):
 # xbar input memory reads differently than typical memory
 # Each read is a shift and read operation
 class xb_inMem (object):
-    def __init__ (self, xbar_size):
+    def __init__ (self, xbar_size, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access_read = 0
         self.num_access_write = 0
 
         # define latency
-        self.latency = param.xbar_inMem_lat
+        self.latency = self.param.xbar_inMem_lat
 
         # size equals the xbar_size, each entry being to
         self.xbar_size = xbar_size
@@ -509,7 +568,7 @@ class xb_inMem (object):
         self.num_access_write += 1
         assert (type(addr) == int), 'addr type should be int'
         assert (-1 < addr < self.xbar_size), 'addr exceeds the memory bounds'
-        assert ((type(data) ==  str) and (len(data) == cfg.xbdata_width)), 'data should be a string with xbdata_width bits'
+        assert ((type(data) ==  str) and (len(data) == self.cfg.xbdata_width)), 'data should be a string with xbdata_width bits'
         self.memfile[addr] = data
 
     def reset (self):
@@ -533,16 +592,19 @@ class xb_inMem (object):
 
 # xbar output memory
 class xb_outMem (xb_inMem):
-    def __init__ (self, xbar_size):
+    def __init__ (self, xbar_size, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
 
         # define latency
-        self.latency = param.xbar_outMem_lat
+        self.latency = self.param.xbar_outMem_lat
 
         # size equals the xbar_size, each entry being to
         self.xbar_size = xbar_size
-        self.memfile = ['0' * cfg.xbdata_width] * self.xbar_size
+        self.memfile = ['0' * self.cfg.xbdata_width] * self.xbar_size
         self.wr_pointer = 0
 
     def getLatency (self):
@@ -568,12 +630,12 @@ class xb_outMem (xb_inMem):
         self.num_access += 1
         assert (type(addr) == int), 'addr type should be int'
         assert (-1 < addr < self.xbar_size), 'addr exceeds the memory bounds'
-        assert ((type(data) ==  str) and (len(data) == cfg.xbdata_width)), 'data should be a string with xbdata_width bits'
+        assert ((type(data) ==  str) and (len(data) == self.cfg.xbdata_width)), 'data should be a string with xbdata_width bits'
         self.memfile[addr] = data
 
     def write (self, data):
         self.num_access += 1
-        assert ((type(data) ==  str) and (len(data) == cfg.xbdata_width)), 'data should be a string with xbdata_width bits'
+        assert ((type(data) ==  str) and (len(data) == self.cfg.xbdata_width)), 'data should be a string with xbdata_width bits'
         self.memfile[self.wr_pointer] = data
         self.wr_pointer = self.wr_pointer + 1
 
@@ -583,19 +645,22 @@ class xb_outMem (xb_inMem):
 
     def reset (self):
         # self.num_access += 1
-        self.memfile = ['0' * cfg.xbdata_width] * self.xbar_size
+        self.memfile = ['0' * self.cfg.xbdata_width] * self.xbar_size
         self.wr_pointer = 0
 
 
 # Instruction memory stores dict unlike memory (string)
 class instrn_memory (memory):
 
-    def __init__ (self, size, addr_offset = 0):
+    def __init__ (self, size, addr_offset = 0, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
 
         # define latency
-        self.latency = param.instrnMem_lat
+        self.latency = self.param.instrnMem_lat
 
         # memfile will store half-word (16 bits digital data) length strings
         self.size = size
@@ -637,9 +702,12 @@ class instrn_memory (memory):
 
 # Memory interface to interact with an external memory
 class mem_interface (object):
-    def __init__ (self):
+    def __init__ (self, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define latency
-        self.latency = param.memInterface_lat
+        self.latency = self.param.memInterface_lat
 
         # in/out ports
         self.wait = 0  # wait signal from (EDRAM) controller to ima
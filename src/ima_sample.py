@@ -0,0 +1,313 @@
+# Sampled simulation (approximate) of looping core programs
+# Compiled conv layers run ld/mvm/st loops (jmp/beq back to the loop body) for thousands of similar iterations.
+# An iteration is the run of instructions between two taken backward branches (loop = [branch target, branch pc]) and
+# its basic block vector (bbv) counts the executed instructions per pc. Per ima:
+# 1. the first num_warmup iterations of a loop are simulated in detail and not used
+# 2. the next iterations are simulated in detail - the first num_sample of each (loop, bbv) are sampled: cycles and
+#    access counts of all ima modules (num_access*)
+# 3. the next iteration is predicted to be the (loop, bbv) that followed the last iteration's (loop, bbv) before. Once
+#    it has num_sample samples, the iteration is executed functionally - the instructions run in order with the same
+#    semantics (ima.do_decode/do_execute, mvm with inner_product_fast), ld/st go through the edram controller. The
+#    ima then sleeps till the iteration's cycles (sample mean) have elapsed and its access counts are advanced by the
+#    sample mean (not the counts of the functional execution)
+# 4. an iteration whose bbv wasn't sampled is charged by the closest sampled bbv (L1 distance), scaled by its
+#    number of instructions, and the next iteration is simulated in detail again. An iteration leaving the predicted
+#    bbv (e.g. loop exit) ends functional execution before that instruction - the rest is simulated in detail
+# Confidence bounds (95%) of the extrapolated cycles and access counts are written to sampling_stats.txt. They add
+# the systematic error of the switches to detailed simulation (see switch_end) to the statistical error of the samples
+
+import math
+import numpy as np
+
+
+# ima modules with access counters
+module_list = ['matrix_list', 'xb_inMem_list', 'xb_outMem_list', 'dacArray_list', 'adc_list', 'snh_list', \
+        'mux1_list', 'mux2_list', 'alu_list', 'alu_int', 'dataMem', 'instrnMem']
+
+### Returns [module object, attribute] of the access counters (num_access*) of an ima
+def get_counter_list (temp_ima):
+    counter_list = []
+    def walk (obj):
+        if (type(obj) == list):
+            for temp_obj in obj:
+                walk (temp_obj)
+        elif (type(obj) == dict):
+            for key in sorted (obj.keys()):
+                walk (obj[key])
+        else:
+            for name in sorted (obj.__dict__.keys()):
+                if (name.startswith ('num_access')):
+                    counter_list.append ([obj, name])
+            if (hasattr (obj, 'dac_list')):
+                walk (obj.dac_list)
+    for name in module_list:
+        walk (getattr (temp_ima, name))
+    return counter_list
+
+class ima_sample (object):
+
+    def __init__ (self, num_warmup, num_sample):
+        self.num_warmup = num_warmup
+        self.num_sample = num_sample
+        self.counter_list = []
+
+        # functional execution (else detailed), switch to functional at the end of the cycle (start pc)
+        self.functional = 0
+        self.start_pc = -1
+
+        # current iteration - loop (None before the first iteration), bbv (pc -> count), start cycle & counts
+        self.loop = None
+        self.bbv = {}
+        self.start_cycle = 0
+        self.start_count = None
+
+        # (loop, bbv) -> [num_sample, sum & sum of squares of cycles, sum of counts, sum & sum of squares of the
+        # total count]
+        self.warmup_dict = {}
+        self.sample_dict = {}
+        # (loop, bbv) -> (loop, bbv) of the iteration that followed it last (predicts the next iteration)
+        self.next_dict = {}
+        self.last_key = None
+        self.next_bbv = {}
+        # (loop, bbv) -> [sum & sum of squares of the scale] of functional iterations charged by it
+        self.func_dict = {}
+        self.num_detail = 0
+        self.num_func = 0
+        self.count_residue = 0.0
+        # systematic error (cycles, total count) of the switches to detailed simulation
+        self.num_switch = 0
+        self.switch_error = [0.0, 0.0]
+
+        # functional execution - sleep till wake_cycle, ld/st waiting for edram controller, detailed after waking
+        self.wake_cycle = 0
+        self.mem_op = ''
+        self.detail_next = 0
+
+    def get_count (self, temp_ima):
+        if (not self.counter_list):
+            self.counter_list = get_counter_list (temp_ima)
+        return np.array ([getattr (obj, name) for [obj, name] in self.counter_list], dtype = np.int64)
+
+    def set_count (self, count):
+        for i in range (len(self.counter_list)):
+            [obj, name] = self.counter_list[i]
+            setattr (obj, name, int (count[i]))
+
+    def get_key (self):
+        return (self.loop, tuple (sorted (self.bbv.items())))
+
+    # Sampled (loop, bbv) closest to the current iteration - [key, scale]
+    def get_match (self):
+        key = self.get_key ()
+        if (key in self.sample_dict):
+            return [key, 1.0]
+        bbv_size = sum (self.bbv.values())
+        min_dist = float('inf')
+        for temp_key in self.sample_dict:
+            temp_bbv = dict (temp_key[1])
+            dist = sum ([abs (self.bbv.get (pc, 0) - temp_bbv.get (pc, 0)) for pc in set (self.bbv) | set (temp_bbv)])
+            dist += (temp_key[0] != self.loop) * bbv_size # prefer samples of the same loop
+            if (dist < min_dist):
+                [min_dist, match] = [dist, temp_key]
+        return [match, float (bbv_size) / sum (dict (match[1]).values())]
+
+    # Start a new iteration of loop (in cycle) after the current one - returns 1 if it can be executed functionally:
+    # the iteration following the current (loop, bbv) last time is of this loop and sampled (matched - the current
+    # iteration wasn't charged by the closest bbv)
+    def iter_start (self, temp_ima, loop, cycle, matched):
+        key = self.get_key ()
+        if (self.last_key != None):
+            self.next_dict[self.last_key] = key
+        self.last_key = key
+        next_key = self.next_dict.get (key)
+        self.loop = loop
+        self.bbv = {}
+        self.start_cycle = cycle
+        self.start_count = self.get_count (temp_ima)
+        if (matched and next_key != None and next_key[0] == loop and next_key in self.sample_dict and \
+                self.sample_dict[next_key][0] >= self.num_sample):
+            self.next_bbv = dict (next_key[1])
+            return 1
+        return 0
+
+    ### Detailed simulation - an instruction finished execute (see ima.execute)
+    def exec_done (self, temp_ima):
+        pc = temp_ima.de_pc
+        if (pc < 0): # squashed by a branch
+            return
+        self.bbv[pc] = self.bbv.get (pc, 0) + 1
+        if (not (temp_ima.de_opcode in ['jmp', 'beq'] and temp_ima.fd_pc == -1 and temp_ima.pc <= pc)):
+            return
+
+        # taken backward branch - iteration ends
+        cycle = temp_ima.last_cycle
+        if (self.loop != None):
+            self.num_detail += 1
+            count = self.get_count (temp_ima) - self.start_count
+            if (self.warmup_dict.get (self.loop, 0) < self.num_warmup):
+                self.warmup_dict[self.loop] = self.warmup_dict.get (self.loop, 0) + 1
+            else:
+                key = self.get_key ()
+                if (key not in self.sample_dict):
+                    self.sample_dict[key] = [0, 0.0, 0.0, np.zeros (len(count)), 0.0, 0.0]
+                stats = self.sample_dict[key]
+                if (stats[0] < self.num_sample):
+                    latency = cycle - self.start_cycle
+                    total = float (np.sum (count))
+                    self.sample_dict[key] = [stats[0]+1, stats[1]+latency, stats[2]+latency**2, stats[3]+count, \
+                            stats[4]+total, stats[5]+total**2]
+        if (self.iter_start (temp_ima, (temp_ima.pc, pc), cycle, 1)):
+            self.start_pc = temp_ima.pc
+
+    ### Detailed simulation - end of a cycle of the pipeline
+    def cycle_end (self, temp_ima):
+        if (self.start_pc >= 0):
+            temp_ima.pipe_reset (self.start_pc, 0)
+            temp_ima.mvm_fast = 1
+            self.functional = 1
+            self.wake_cycle = 0
+            self.start_pc = -1
+
+    ### Functional execution - returns 0 if the ima switched to detailed simulation (pipeline runs in this cycle)
+    def func_run (self, temp_ima, cycle, fid):
+        if (cycle < self.wake_cycle):
+            return 1
+        if (self.detail_next):
+            self.detail_next = 0
+            self.functional = 0
+            temp_ima.mvm_fast = 0
+            temp_ima.pipe_reset (temp_ima.pc, 1)
+            return 0
+
+        # ld/st (vector) waits for the edram controller
+        if (self.mem_op != ''):
+            if (temp_ima.mem_interface.wait):
+                return 1
+            if (self.mem_op == 'ld'):
+                temp_ima.do_execute ('ld', fid)
+            temp_ima.ex_vec_count += 1
+            if (temp_ima.ex_vec_count < temp_ima.de_vec):
+                self.mem_request (temp_ima)
+                return 1
+            temp_ima.ex_vec_count = 0
+            self.mem_op = ''
+
+        while (1):
+            pc = temp_ima.pc
+            # iteration leaves the predicted bbv (e.g. loop exit) - the rest of the program is simulated in detail
+            if (self.bbv.get (pc, 0) >= self.next_bbv.get (pc, 0)):
+                self.func_end (temp_ima, cycle, None)
+                return 1
+            instrn = temp_ima.instrnMem.read (pc)
+            temp_ima.fd_instrn = instrn
+            temp_ima.fd_pc = pc
+            temp_ima.pc = pc + 1
+            temp_ima.do_decode (instrn['opcode'])
+            self.bbv[pc] = self.bbv.get (pc, 0) + 1
+            if (temp_ima.de_opcode in ['ld', 'st']):
+                self.mem_op = temp_ima.de_opcode
+                self.mem_request (temp_ima)
+                return 1
+            temp_ima.do_execute (temp_ima.de_opcode, fid)
+            # taken backward branch - iteration ends
+            if (temp_ima.de_opcode in ['jmp', 'beq'] and temp_ima.fd_pc == -1 and temp_ima.pc <= pc):
+                self.func_end (temp_ima, cycle, (temp_ima.pc, pc))
+                return 1
+
+    def mem_request (self, temp_ima):
+        if (self.mem_op == 'ld'):
+            temp_ima.mem_interface.rdRequest (temp_ima.de_r1 + temp_ima.ex_vec_count * temp_ima.de_r2, temp_ima.de_r2)
+        else:
+            temp_ima.st_request ()
+
+    # Functional iteration ends in cycle - next loop (None - loop exit)
+    def func_end (self, temp_ima, cycle, loop):
+        [key, scale] = self.get_match ()
+        stats = self.sample_dict[key]
+        self.num_func += 1
+        [sum_scale, sum_scale2] = self.func_dict.get (key, [0.0, 0.0])
+        self.func_dict[key] = [sum_scale + scale, sum_scale2 + scale**2]
+
+        # cycles (not less than the functional execution took - e.g. waiting for data) & access counts
+        end_cycle = max (cycle, self.start_cycle + int (round (scale * stats[1] / stats[0])))
+        count = self.count_residue + scale * stats[3] / stats[0]
+        self.count_residue = count - np.round (count)
+        self.set_count (self.start_count + np.round (count).astype (np.int64))
+
+        # detailed simulation after waking up - loop exit or the next iteration isn't known to be sampled
+        self.wake_cycle = end_cycle + 1
+        own_key = self.get_key ()
+        if (loop == None):
+            self.loop = None
+            self.bbv = {}
+            self.last_key = None
+            self.detail_next = 1
+        elif (not self.iter_start (temp_ima, loop, end_cycle, key == own_key)):
+            self.detail_next = 1
+        if (self.detail_next):
+            self.switch_end (temp_ima, stats, scale if (key != own_key) else None)
+
+    # Systematic error of a switch to detailed simulation (not covered by the sample variance)
+    # 1. the pipeline is refilled - the fetch & decode of the first instruction don't overlap the iteration before
+    # 2. an iteration charged by another (loop, bbv) (scale - None if sampled itself, e.g. a partial iteration at a
+    #    loop exit): its cycles & counts lie between 0 and those of the sampled iteration for scale <= 1 - the charge
+    #    is off by at most max (scale, 1-scale) of the sample mean (the whole charge for scale > 1)
+    def switch_end (self, temp_ima, stats, scale):
+        self.num_switch += 1
+        self.switch_error[0] += temp_ima.instrnMem.getLatency () + temp_ima.dataMem.getLatency ()
+        if (scale != None):
+            self.switch_error[0] += max (scale, abs (1 - scale)) * stats[1] / stats[0]
+            self.switch_error[1] += max (scale, abs (1 - scale)) * stats[4] / stats[0]
+
+    ### Next cycle (after cycle) in which functional execution does more than sleep (see ima.pipe_next_event)
+    def next_event (self, temp_ima, cycle):
+        if (self.mem_op != '' and temp_ima.mem_interface.wait):
+            return float('inf')
+        return max (cycle + 1, self.wake_cycle)
+
+    # Extrapolated cycles & total access count of functional iterations - [value, 95% confidence half-width plus the
+    # systematic error of the switches] each
+    def get_estimate (self):
+        estimate = [[0.0, 0.0], [0.0, 0.0]]
+        for key in self.func_dict:
+            [sum_scale, sum_scale2] = self.func_dict[key]
+            stats = self.sample_dict[key]
+            num = stats[0]
+            for [value, s1, s2] in [[estimate[0]] + stats[1:3], [estimate[1]] + stats[4:6]]:
+                mean = s1 / num
+                var = max (0.0, s2 / num - mean**2) * num / (num - 1) if (num > 1) else 0.0
+                # variance of the iterations and of the sample mean
+                value[0] += sum_scale * mean
+                value[1] += sum_scale2 * var + sum_scale**2 * var / num
+        for k in range (2):
+            estimate[k][1] = 1.96 * math.sqrt (estimate[k][1]) + self.switch_error[k]
+        return estimate
+
+### Sampled simulation of all imas of a (new) node
+def sample_init (node_dut, num_warmup, num_sample):
+    for temp_tile in node_dut.tile_list:
+        for temp_ima in temp_tile.ima_list:
+            temp_ima.sample = ima_sample (num_warmup, num_sample)
+
+### Write the extrapolated cycles & access counts with confidence bounds - returns the node's cycle bound
+def sample_stats (fid, node_dut, cycle):
+    fid.write ('APPROXIMATE: sampled simulation - ' + str(node_dut.tile_list[0].ima_list[0].sample.num_warmup) + \
+            ' warm-up & ' + str(node_dut.tile_list[0].ima_list[0].sample.num_sample) + \
+            ' sampled iterations per loop\n')
+    fid.write ('Extrapolated values of functional iterations with 95% confidence bounds (sample variance) plus the ' + \
+            'systematic error of the switches to detailed simulation\n')
+    fid.write ('tile  ima  iterations (detailed/functional)  switches  cycles  access counts\n')
+    max_bound = 0.0
+    for i in range (node_dut.cfg.num_tile):
+        for j in range (node_dut.cfg.num_ima):
+            temp_sample = node_dut.tile_list[i].ima_list[j].sample
+            if (temp_sample.num_func == 0):
+                continue
+            [[cycles, cycle_bound], [count, count_bound]] = temp_sample.get_estimate ()
+            max_bound = max (max_bound, cycle_bound)
+            fid.write (str(i) + '  ' + str(j) + '  ' + str(temp_sample.num_detail) + '/' + str(temp_sample.num_func) + \
+                    '  ' + str(temp_sample.num_switch) + '  ' + str(int (round (cycles))) + ' +- ' + str(int (math.ceil (cycle_bound))) + \
+                    '  ' + str(int (round (count))) + ' +- ' + str(int (math.ceil (count_bound))) + '\n')
+    fid.write ('cycles: ' + str(cycle) + ' [' + str(int (cycle - math.ceil (max_bound))) + ', ' + \
+            str(int (cycle + math.ceil (max_bound))) + ']\n')
+    return max_bound
@@ -0,0 +1,138 @@
+# Transaction-level timing of imas
+# Instructions execute atomically, in order (ima.do_fetch/do_decode/do_execute, mvm with inner_product_fast). The
+# cycles in which an instruction's fetch, decode and execute end are computed from the stage latencies
+# (fetch - instrnMem, decode - dataMem, execute - ima.getExLatency) with the overlap rules of the pipeline (see
+# ima.fetch/decode/execute):
+# 1. a stage takes 1 cycle for a latency of 1, else max (2, ceil (latency)) cycles
+# 2. a stage ends only when the succeeding stage is done - decode in the cycle the previous instruction's execute
+#    ends (or later), fetch in the cycle the previous instruction's decode ends (or later)
+# 3. a taken branch turns an instruction fetched before it ends into a nop (fetches after it read the branch target)
+# Only ld/st (a request per vector, waiting for the edram controller) and hlt run in their cycle - the ima sleeps in
+# between. Deviations from the cycle-by-cycle pipeline: st timing for a data memory latency other than 1, access
+# counts and data of an ima run ahead of time till its next ld/st/hlt, and debug traces aren't written
+
+import math
+
+### Cycles taken by a stage of latency (see rule 1)
+def stage_cycles (latency):
+    if (latency == 1):
+        return 1
+    return max (2, int (math.ceil (latency)))
+
+class ima_tlm (object):
+
+    def __init__ (self):
+        # end cycles of the fetch of fd_instrn (None before the first fetch), of the last decode & execute
+        self.fetch_cycle = None
+        self.decode_cycle = -1
+        self.ex_cycle = -1
+
+        # decoded instruction waiting to execute (ld/st/hlt) - ld/st vector request in mem_cycle, waiting if mem_wait
+        self.ex_op = ''
+        self.mem_cycle = 0
+        self.mem_wait = 0
+
+        # sleep till wake_cycle
+        self.wake_cycle = 0
+
+    def fetch (self, temp_ima, cycle):
+        self.fetch_cycle = cycle
+        temp_ima.do_fetch ()
+
+    ### Simulate the ima till its next ld/st/hlt (see ima.pipe_run)
+    def run (self, temp_ima, cycle, fid):
+        if (cycle < self.wake_cycle):
+            return
+        if (self.fetch_cycle == None):
+            self.fetch (temp_ima, cycle - 1 + stage_cycles (temp_ima.instrnMem.getLatency()))
+
+        while (not temp_ima.halt):
+            if (self.ex_op == ''):
+                # program end (no hlt)
+                if (temp_ima.fd_instrn == ''):
+                    self.wake_cycle = float('inf')
+                    return
+                # decode (ends when the previous instruction's execute has ended)
+                ex_op = temp_ima.fd_instrn['opcode']
+                self.decode_cycle = max (self.fetch_cycle + stage_cycles (temp_ima.dataMem.getLatency()), \
+                        self.ex_cycle)
+                temp_ima.do_decode (ex_op)
+                next_fetch = max (self.fetch_cycle + stage_cycles (temp_ima.instrnMem.getLatency()), \
+                        self.decode_cycle)
+                if (ex_op in ['ld', 'st', 'hlt']):
+                    self.ex_op = ex_op
+                    self.mem_cycle = self.decode_cycle + 1
+                    if (ex_op == 'st'):
+                        self.mem_cycle += stage_cycles (temp_ima.dataMem.getLatency())
+                    # the fetch is blocked by the halt from its end cycle
+                    if (ex_op != 'hlt' or next_fetch < self.decode_cycle + 1):
+                        self.fetch (temp_ima, next_fetch)
+                    continue
+
+                # execute - a fetch ending before a taken branch is squashed (do_execute), a later one reads its target
+                self.ex_cycle = self.decode_cycle + stage_cycles (temp_ima.getExLatency (ex_op))
+                if (next_fetch < self.ex_cycle):
+                    self.fetch (temp_ima, next_fetch)
+                    temp_ima.do_execute (ex_op, fid)
+                else:
+                    temp_ima.do_execute (ex_op, fid)
+                    self.fetch (temp_ima, next_fetch)
+
+            elif (self.ex_op == 'hlt'):
+                if (cycle < self.mem_cycle):
+                    self.wake_cycle = self.mem_cycle
+                    return
+                self.ex_cycle = cycle
+                temp_ima.do_execute ('hlt', fid)
+                self.ex_op = ''
+
+            elif (not self.mem_run (temp_ima, cycle, fid)):
+                return
+
+    # ld/st vectors - the request of a vector goes to the edram controller in mem_cycle & the ima waits till it is
+    # served. Returns 1 when the last vector is done
+    def mem_run (self, temp_ima, cycle, fid):
+        while (1):
+            if (cycle < self.mem_cycle):
+                self.wake_cycle = self.mem_cycle
+                return 0
+            if (not self.mem_wait):
+                if (self.ex_op == 'ld'):
+                    temp_ima.mem_interface.rdRequest (temp_ima.de_r1 + temp_ima.ex_vec_count * temp_ima.de_r2, \
+                            temp_ima.de_r2)
+                else:
+                    temp_ima.st_request ()
+                self.mem_wait = 1
+                self.wake_cycle = cycle + 1
+                return 0
+            if (temp_ima.mem_interface.wait):
+                return 0
+
+            # served - ld writes the data in the next cycle, the next vector starts in the cycle after the vector
+            self.mem_wait = 0
+            temp_ima.do_execute (self.ex_op, fid)
+            end_cycle = cycle + 1 if (self.ex_op == 'ld') else cycle
+            temp_ima.ex_vec_count += 1
+            if (temp_ima.ex_vec_count == temp_ima.de_vec):
+                temp_ima.ex_vec_count = 0
+                self.ex_cycle = end_cycle
+                self.ex_op = ''
+                return 1
+            self.mem_cycle = end_cycle + 1
+            if (self.ex_op == 'st'):
+                self.mem_cycle += stage_cycles (temp_ima.dataMem.getLatency())
+
+    ### Next cycle (after cycle) in which the ima does more than sleep (see ima.pipe_next_event)
+    def next_event (self, temp_ima, cycle):
+        if (self.mem_wait and temp_ima.mem_interface.wait):
+            return float('inf')
+        return max (cycle + 1, self.wake_cycle)
+
+### Transaction-level timing of all imas of a (new) node
+def tlm_init (node_dut):
+    for temp_tile in node_dut.tile_list:
+        if (temp_tile == None): # not in this process (parallel modes)
+            continue
+        for temp_ima in temp_tile.ima_list:
+            temp_ima.tlm = ima_tlm ()
+            temp_ima.mvm_fast = 1
@@ -0,0 +1,79 @@
+# NoC statistics of a run - written next to harwdare_stats.txt (noc_stats.txt, noc_stats.npy)
+# Collected by the noc as packets are written to receive buffers (see node_modules.noc):
+# 1. flows - packets, bytes and back-pressure retries (a due packet found its receive buffer entry full) of every
+#    (src, dst) tile pair
+# 2. packet delay histogram - cycles from the send to the receive buffer write (noc latency, send_queue wait,
+#    retries & contention), in power-of-2 bins
+# 3. links - packets that passed each link of the route tables and the cycles packets waited for it (contention)
+# 4. tiles - peak send_queue depth, packets/bytes sent & received, retries
+# noc_stats.npy holds the arrays (a dict) for further analysis
+
+import numpy as np
+
+import node_modules as nmod
+
+# Statistics of node_dut as a dict of arrays (copies) - parallel modes: send_queue peaks from the workers' results
+def get_stats_dict (node_dut):
+    noc = node_dut.noc
+    if (node_dut.tile_result_list != None):
+        peak_list = [result['send_queue_peak'] for result in node_dut.tile_result_list]
+    else:
+        peak_list = [temp_tile.send_queue_peak for temp_tile in node_dut.tile_list]
+    stats_dict = {'flow_count': noc.flow_count, 'flow_bytes': noc.flow_bytes, 'flow_retry': noc.flow_retry,
+            'delay_hist': noc.delay_hist, 'link_count': noc.link_count, 'link_wait': noc.link_wait,
+            'send_queue_peak': peak_list}
+    for name in stats_dict:
+        stats_dict[name] = np.array (stats_dict[name], dtype = np.int64)
+    return stats_dict
+
+# Delay range of a histogram bin
+def bin_name (b):
+    if (b == 0):
+        return '0'
+    if (b == nmod.num_delay_bin-1):
+        return '>=' + str(1 << (b-1))
+    return str(1 << (b-1)) + '-' + str((1 << b) - 1)
+
+### Write the noc statistics of node_dut (run of cycle cycles) to fid - returns them as a dict of arrays
+def get_noc_stats (fid, node_dut, cycle):
+    noc = node_dut.noc
+    stats_dict = get_stats_dict (node_dut)
+    num_packet = int (noc.flow_count.sum ())
+    fid.write ('packets: ' + str(num_packet) + '\n')
+    fid.write ('bytes: ' + str(int (noc.flow_bytes.sum ())) + '\n')
+    fid.write ('retries: ' + str(int (noc.flow_retry.sum ())) + '\n')
+    fid.write ('contention wait cycles: ' + str(int (noc.link_wait.sum ())) + '\n')
+    fid.write ('noc busy cycles: ' + str(noc.num_cycles_intra) + ' of ' + str(cycle) + '\n')
+
+    fid.write ('\npacket delay (send to receive buffer write)\n')
+    fid.write ('cycles'.ljust (16) + 'packets'.ljust (12) + 'share\n')
+    for b in range (nmod.num_delay_bin):
+        if (noc.delay_hist[b]):
+            fid.write (bin_name (b).ljust (16) + str(noc.delay_hist[b]).ljust (12) + \
+                    ('%.2f' % (100.0 * noc.delay_hist[b] / num_packet)) + ' %\n')
+
+    # flows by bytes (most first)
+    fid.write ('\nflows (src -> dst)\n')
+    fid.write ('src'.ljust (8) + 'dst'.ljust (8) + 'packets'.ljust (12) + 'bytes'.ljust (12) + 'retries\n')
+    [src_array, dst_array] = np.nonzero ((noc.flow_count + noc.flow_retry) > 0)
+    order = np.lexsort ((dst_array, src_array, -noc.flow_bytes[src_array, dst_array]))
+    for k in order:
+        [src, dst] = [src_array[k], dst_array[k]]
+        fid.write (str(src).ljust (8) + str(dst).ljust (8) + str(noc.flow_count[src, dst]).ljust (12) + \
+                str(noc.flow_bytes[src, dst]).ljust (12) + str(noc.flow_retry[src, dst]) + '\n')
+
+    fid.write ('\ntiles\n')
+    fid.write ('tile'.ljust (8) + 'peak_queue'.ljust (12) + 'sent'.ljust (12) + 'sent_bytes'.ljust (12) + \
+            'received'.ljust (12) + 'recv_bytes'.ljust (12) + 'retries\n')
+    for i in range (node_dut.cfg.num_tile):
+        fid.write (str(i).ljust (8) + str(stats_dict['send_queue_peak'][i]).ljust (12) + \
+                str(noc.flow_count[i].sum ()).ljust (12) + str(noc.flow_bytes[i].sum ()).ljust (12) + \
+                str(noc.flow_count[:, i].sum ()).ljust (12) + str(noc.flow_bytes[:, i].sum ()).ljust (12) + \
+                str(noc.flow_retry[i].sum ()) + '\n')
+
+    fid.write ('\nlinks (' + node_dut.noc.noc_model + ' noc model)\n')
+    fid.write ('link'.ljust (32) + 'packets'.ljust (12) + 'wait_cycles\n')
+    for link in np.nonzero ((noc.link_count + noc.link_wait) > 0)[0]:
+        fid.write (noc.get_link_name (link).ljust (32) + str(noc.link_count[link]).ljust (12) + \
+                str(noc.link_wait[link]) + '\n')
+    return stats_dict
@@ -1,11 +1,10 @@
 # Defines a configurable node with its methods
-import sys, getopt
+import os, sys, getopt
 sys.path.insert (0, '/home/aa/dpe_emulate/include/')
 sys.path.insert (0, '/home/aa/dpe_emulate/src/')
 
 import numpy as np
-import config as cfg
-import constants as param
+import dpe_config
 import ima_modules
 import ima
 import tile_modules
@@ -17,44 +16,76 @@ class node (object):
     instances_created = 0
 
     ### Instantiate different modules in a node
-    def __init__ (self):
+    # active_set - only tiles (imas) with a pending event are simulated in a cycle, others sleep and catch up
+    # (count-down cycles) when woken by their own next event, a receive buffer write or a send_queue drain
+    # config - dpe_config (default - the config & constants modules)
+    # tile_ids - tiles instantiated in this process (None - all), the others are None: a parallel worker's partition
+    # or the coordinator (no tiles) - see node_parallel
+    def __init__ (self, active_set = 0, config = None, tile_ids = None):
+
+        # Configuration (cfg - config.py values, param - constants.py values)
+        self.config = dpe_config.get_config (config)
+        self.cfg = self.config.cfg
+        self.param = self.config.param
 
         # Assign a node_id for identification purpose in debug trace
         self.node_id = node.instances_created
 
         # Instantiate the tile list
-        self.tile_list = []
-        for i in range (cfg.num_tile): #first & last tiles - dummy, others - compute
-            temp_tile = tile.tile ()
-            self.tile_list.append (temp_tile)
+        self.tile_list = [None] * self.cfg.num_tile
+        for i in range (self.cfg.num_tile): #first & last tiles - dummy, others - compute
+            if (tile_ids == None or i in tile_ids):
+                self.tile_list[i] = tile.tile (active_set, self.config)
 
         # Instantiate the NOC
-        self.noc = nmod.noc ()
+        self.noc = nmod.noc (self.config)
 
         # Some book-keeping variables (Can have harwdare correspondance)
         self.node_halt = 0
-        self.tile_halt_list = [0] * cfg.num_tile
-        self.tile_fid_list = []
+        self.tile_halt_list = [0] * self.cfg.num_tile
+        self.tile_fid_list = [None] * self.cfg.num_tile
 
         self.noc_start = 0
 
+        # Active-set scheduling - next cycle each tile needs to be simulated in
+        self.active_set = active_set
+        self.tile_wake_list = [0] * self.cfg.num_tile
+
+        # Fast-forward - next event of each tile (recomputed once it has passed or the noc wrote to/drained the tile)
+        self.tile_event_list = [0] * self.cfg.num_tile
+
+        # Tile deduplication - classes of tiles with the same program (see tile_dedup)
+        self.dedup_list = []
+
+        # Noc record - packets delivered to receive buffers (see tile_replay), None if not recorded
+        self.noc_record = None
+
+        # Parallel modes - results of the tiles simulated by the workers (see node_parallel.tile_result), None if the
+        # tiles were simulated in this process
+        self.tile_result_list = None
+
 
     ### Initialize the tiles within node and open the trace file for each tile
     def node_init (self, instrnpath, tracepath):
-        for i in range (cfg.num_tile):
+        for i in range (self.cfg.num_tile):
+            if (self.tile_list[i] == None):
+                continue
             # open tracefile for tile - place where stats are dumped
-            tracefile = tracepath + 'tile' + str(i) + '/tile_trace.txt'
+            # no trace files if tracepath is None (traces go to os.devnull)
+            tracefile = tracepath + 'tile' + str(i) + '/tile_trace.txt' if (tracepath != None) else os.devnull
             fid_temp = open (tracefile, 'w')
-            self.tile_fid_list.append (fid_temp)
+            self.tile_fid_list[i] = fid_temp
 
             # initialize the tile
             temp_instrnpath = instrnpath + 'tile' + str(i) + '/'
-            temp_tracepath = tracepath + 'tile' + str(i) + '/'
+            temp_tracepath = tracepath + 'tile' + str(i) + '/' if (tracepath != None) else None
             self.tile_list[i].tile_init (temp_instrnpath, temp_tracepath)
 
         # intialize the tile_halt_list and node_halt
         self.node_halt = 0
-        self.tile_halt_list = [0] * cfg.num_tile
+        self.tile_halt_list = [0] * self.cfg.num_tile
+        self.tile_wake_list = [0] * self.cfg.num_tile
+        self.tile_event_list = [0] * self.cfg.num_tile
 
     ## A cyle execution of each tile and probe each tile's halt
     #def node_tile_run (self, cycle, i):
@@ -74,56 +105,80 @@ class node (object):
 
 
         # A cyle execution of each tile and probe each tile's halt
-        for i in range (cfg.num_tile):
-            # run a tile only if has not halted
+        run_list = []
+        for i in range (self.cfg.num_tile):
+            # run a tile only if has not halted (and is awake in active-set mode)
             if (not self.tile_list[i].tile_halt):
+                if (self.active_set):
+                    if (self.tile_wake_list[i] > cycle):
+                        continue
+                    self.tile_list[i].tile_skip (cycle - 1 - self.tile_list[i].last_cycle)
+                    run_list.append (i)
                 self.tile_list[i].tile_run (cycle, self.tile_fid_list[i])
                 self.tile_halt_list[i] = self.tile_list[i].tile_halt
 
-        # Start noc based on send_queue of all tiles - one non-empty
-        if (self.noc_start == 0):
-            for i in range (cfg.num_tile):
-                if (not self.tile_list[i].send_queue.empty()):
-                    self.noc_start = 1
-                    self.noc.start_noc (cycle)
-                    break
-
-        # Stop noc based on send_queue of all tiles -- all empty
-        if (self.noc_start == 1):
-            count = 0
-            for i in range (cfg.num_tile):
-                if (not self.tile_list[i].send_queue.empty()):
-                    count += 1
-                    break
-            if (count == 0):
-                self.noc.stop_noc (cycle)
-                self.noc_start = 0
-
-        # A cycle execution of noc (data transfers between tiles)
-        # If latency satisfies, write to destination tile's receive buffer
-        for i in range (cfg.num_tile):
-            # check entry at head of queue (if non-empty) for all tiles for noc latency
-            if (not self.tile_list[i].send_queue.empty()):
-                temp_queue_head = self.tile_list[i].send_queue.queue[0]
-                target_addr = temp_queue_head['target_addr']
-                transfer_latency = self.noc.getLatency (target_addr, i) + \
-                        self.tile_list[0].receive_buffer.getLatency()
-                if (((cycle - temp_queue_head['cycle']) >= transfer_latency-1)):
-                    # attempt to write to destination's receive buffer
-                    tile_addr = self.noc.propagate (target_addr, i)
-                    temp_data = temp_queue_head['data'][:]
-                    temp_vtile_id = temp_queue_head['vtile_id']
-                    #print (tile_addr)
-                    write_hit = self.tile_list[tile_addr].receive_buffer.write (temp_vtile_id, temp_data)
-                    # if write is success - remove from queue
-                    if (write_hit == 1):
-                        self.tile_list[i].send_queue.get()
-                        # added to get HT counts
-                        self.noc.propagate_count (target_addr, i)
-
-        # For DEBUG
-        #if (cycle%5000 == 0):
-        print ('Cycle: ', cycle, 'Tile halt list', self.tile_halt_list)
+        # A cycle execution of noc (data transfers between tiles) - send_queue heads due in this cycle (noc & receive
+        # buffer latency passed) or blocked by a full receive buffer entry, from the delivery heap of the noc
+        # If latency satisfies, write to destination tile's receive buffer (the packet's data is shared)
+        # noc is busy if any send_queue is non-empty before the transfers (start/stop don't affect transfers)
+        if (not self.noc.attached):
+            self.noc.attach (self.tile_list)
+        busy = self.noc.busy ()
+        wake_list = []
+        for i in self.noc.pop_due (cycle):
+            send_queue = self.tile_list[i].send_queue
+            temp_queue_head = send_queue[0]
+            target_addr = temp_queue_head.target_addr
+            # attempt to write to destination's receive buffer
+            tile_addr = self.noc.propagate (target_addr, i)
+            # contention - the packet waits till the links of its route are free (a blocked write doesn't take them)
+            if (self.noc.noc_contention and self.tile_list[tile_addr].receive_buffer.isempty (temp_queue_head.vtile_id)):
+                delay = self.noc.acquire_links (target_addr, i, cycle)
+                if (delay > 0):
+                    self.noc.delay (i, cycle + delay)
+                    continue
+            write_hit = self.tile_list[tile_addr].receive_buffer.write (temp_queue_head.vtile_id, \
+                    temp_queue_head.data)
+            # if write is success - remove from queue (the next packet is due in the next cycle at the earliest)
+            if (write_hit == 1):
+                if (self.noc_record != None):
+                    self.noc_record.append ({'cycle':cycle, 'src':i, 'dst':tile_addr, \
+                            'vtile_id':temp_queue_head.vtile_id, 'data':temp_queue_head.data})
+                send_queue.popleft()
+                if (send_queue):
+                    self.noc.schedule (i, send_queue[0], cycle + 1)
+                # added to get HT counts
+                self.noc.propagate_count (target_addr, i)
+                self.noc.count_flow (target_addr, i, temp_queue_head.cycle, len(temp_queue_head.data), cycle)
+                # receiving tile (receive buffer write) and sending tile (send_queue drain) wake up
+                wake_list.append (tile_addr)
+                wake_list.append (i)
+            else:
+                self.noc.retry_list.append (i)
+                self.noc.count_retry (target_addr, i)
+
+        # Start noc based on send_queue of all tiles - one non-empty, stop it if all are empty
+        if (self.noc_start == 0 and busy):
+            self.noc_start = 1
+            self.noc.start_noc (cycle)
+        elif (self.noc_start == 1 and not busy):
+            self.noc.stop_noc (cycle)
+            self.noc_start = 0
+
+        # Active-set mode - find the next cycle the tiles simulated in this cycle (or woken by noc) need to run
+        # (halted tiles never)
+        if (self.active_set):
+            for i in run_list:
+                if (not self.tile_list[i].tile_halt):
+                    self.tile_wake_list[i] = self.tile_list[i].tile_next_event (cycle)
+                else:
+                    self.tile_wake_list[i] = float('inf')
+            for i in wake_list:
+                if (not self.tile_list[i].tile_halt):
+                    self.tile_wake_list[i] = cycle + 1
+        else:
+            for i in wake_list:
+                self.tile_event_list[i] = 0
 
         # check if node halted
         if (all (self.tile_halt_list)):
@@ -132,3 +187,87 @@ class node (object):
                 tr_id.close ()
             print ('cycle: ' + str (cycle) + ' Node Halted')
 
+    ### Event-driven (fast-forward) support
+    # Returns the next cycle (after cycle) in which any tile, ima or the noc does more than count-down
+    # A tile only counts down till its next event (unless the noc writes to/drains it) - only tiles whose event has
+    # passed are asked for a new one (active-set mode keeps them in tile_wake_list)
+    def node_next_event (self, cycle):
+        next_cycle = self.noc.get_next_event (cycle, self.tile_list, self.noc_start)
+        if (self.active_set):
+            return min (next_cycle, min (self.tile_wake_list))
+        event_list = self.tile_event_list
+        for i in range (self.cfg.num_tile):
+            if (event_list[i] <= cycle):
+                if (self.tile_list[i].tile_halt):
+                    event_list[i] = float('inf')
+                else:
+                    event_list[i] = self.tile_list[i].tile_next_event (cycle)
+        return min (next_cycle, min (event_list))
+
+    ### Simulate num_cycles idle cycles of a node (no transfers and no state changes other than count-downs)
+    # In active-set mode tiles catch up on their own (when woken or by node_sync)
+    def node_skip (self, num_cycles):
+        if (num_cycles == 0):
+            return
+        # send_queue heads blocked by a full receive buffer entry are retried in every skipped cycle (statistics)
+        for i in self.noc.retry_list:
+            self.noc.count_retry (self.tile_list[i].send_queue[0].target_addr, i, num_cycles)
+        if (self.active_set):
+            return
+        for i in range (self.cfg.num_tile):
+            if (not self.tile_list[i].tile_halt):
+                self.tile_list[i].tile_skip (num_cycles)
+
+    ### Active-set mode: bring sleeping tiles/imas up to date till cycle (inclusive), e.g. when cycles_max is hit
+    def node_sync (self, cycle):
+        if (not self.active_set):
+            return
+        for i in range (self.cfg.num_tile):
+            if (not self.tile_list[i].tile_halt):
+                self.tile_list[i].tile_sync (cycle)
+
+
+    ### Deadlock detection - progress count of the node (no change over a long window - deadlock)
+    def node_progress (self):
+        count = 0
+        for i in range (self.cfg.num_tile):
+            count += self.tile_list[i].tile_progress ()
+        return count
+
+    # An ima pipeline of the node counts down a latency at cycle (see tile_busy)
+    def node_busy (self, cycle):
+        for i in range (self.cfg.num_tile):
+            if ((not self.tile_list[i].tile_halt) and self.tile_list[i].tile_busy (cycle)):
+                return 1
+        return 0
+
+    ### Describe what the tiles/imas (that haven't halted) and noc transfers are blocked on
+    # (parallel modes - from the results of the workers)
+    def node_diagnose (self):
+        diag_list = []
+        for i in range (self.cfg.num_tile):
+            if (self.tile_result_list != None):
+                result = self.tile_result_list[i]
+                [tile_halt, tile_diag, queue_head] = [result['halt'], result['diagnose'], result['queue_head']]
+            else:
+                temp_tile = self.tile_list[i]
+                [tile_halt, queue_head] = [temp_tile.tile_halt, None]
+                tile_diag = temp_tile.tile_diagnose () if (not tile_halt) else []
+                if (temp_tile.send_queue):
+                    queue_head = [temp_tile.send_queue[0].target_addr, temp_tile.send_queue[0].vtile_id]
+            if (tile_halt):
+                continue
+            for temp_str in tile_diag:
+                diag_list.append ('tile ' + str(i) + ': ' + temp_str)
+            if (queue_head != None):
+                [target_addr, vtile_id] = queue_head
+                temp_str = 'tile ' + str(i) + ': send_queue head -> tile ' + str(target_addr) + \
+                        ' vtile_id ' + str(vtile_id)
+                if (self.tile_result_list != None):
+                    entry_full = self.tile_result_list[target_addr]['rb_valid'][vtile_id]
+                else:
+                    entry_full = not self.tile_list[target_addr].receive_buffer.isempty (vtile_id)
+                if (entry_full):
+                    temp_str += ' (receive buffer entry full)'
+                diag_list.append (temp_str)
+        return diag_list
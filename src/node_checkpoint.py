@@ -0,0 +1,235 @@
+# Checkpoint (save/restore) of the full state of a node during simulation
+# The node (tiles, imas, memories, receive buffers, send_queues, noc, access counters) is pickled with the cycle
+# and the run loop state. To keep the checkpoint compact and picklable:
+# 1. trace files are saved as (name, offset) - restored files are truncated to the offset and appended to
+# 2. all-zero (unprogrammed) xbars are saved as (shape, dtype), bw-xbars equal to their fw-xbars share the values
+#
+# Snapshot cache of programmed xbars - runs of the same net (weights & config) with other inputs map the xbar values
+# from the snapshot instead of loading and programming every weight file. A snapshot is a directory with all
+# programmed xbar values in one array (xbar_value.npy) and their location (xbar_index.npy). The values are
+# memory-mapped (copy-on-write) - only the pages that are read are loaded from disk.
+# Note: the rest of the node is cheaper to construct (node, node_init) than to unpickle - it isn't cached
+
+import os
+import sys
+import importlib
+import shutil
+import hashlib
+import cPickle
+import numpy as np
+
+import dpe_config
+
+def get_xbar_dict_list (node_dut):
+    xbar_dict_list = []
+    for temp_tile in node_dut.tile_list:
+        for temp_ima in temp_tile.ima_list:
+            xbar_dict_list += temp_ima.matrix_list
+    return xbar_dict_list
+
+# Objects of the config/constants modules referenced by the node (e.g. dummy instructions) are pickled by name - the
+# restored node refers to the module objects like a fresh one does (and traces print them in the same key order)
+# Note: some modules import them as include.config/include.constants (separate module objects)
+module_name_list = ['config', 'constants', 'include.config', 'include.constants']
+
+def get_module_object_dict ():
+    obj_dict = {}
+    for module_name in module_name_list:
+        if (module_name in sys.modules):
+            temp_module = sys.modules[module_name]
+            for name in dir(temp_module):
+                value = getattr (temp_module, name)
+                if (type(value) in [dict, list]):
+                    obj_dict[id(value)] = module_name + ':' + name
+    return obj_dict
+
+def pickle_dump (obj, fid):
+    obj_dict = get_module_object_dict ()
+    pickler = cPickle.Pickler (fid, cPickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda temp_obj: obj_dict.get (id(temp_obj))
+    pickler.dump (obj)
+
+def pickle_load (fid):
+    def persistent_load (pid):
+        [module_name, name] = pid.split (':')
+        return getattr (importlib.import_module (module_name), name)
+    unpickler = cPickle.Unpickler (fid)
+    unpickler.persistent_load = persistent_load
+    return unpickler.load ()
+
+### Checkpoint
+def file_state (fid):
+    if (fid.closed):
+        return [fid.name, -1]
+    fid.flush ()
+    return [fid.name, fid.tell()]
+
+def file_restore (state):
+    [name, offset] = state
+    fid = open (name, 'a')
+    if (offset == -1):
+        fid.close ()
+    else:
+        fid.truncate (offset)
+    return fid
+
+def xbar_state (temp_matrix, key, l):
+    xbar_value = temp_matrix[key][l].xbar_value
+    if (not np.any (xbar_value)):
+        return (xbar_value.shape, xbar_value.dtype.str)
+    elif (key == 'b' and np.array_equal (xbar_value, temp_matrix['f'][l].xbar_value)):
+        return temp_matrix['f'][l].xbar_value
+    return xbar_value
+
+def xbar_restore (temp_matrix, key, l):
+    xbar_value = temp_matrix[key][l].xbar_value
+    if (type(xbar_value) == tuple):
+        return np.zeros (xbar_value[0], xbar_value[1])
+    elif (key == 'b' and xbar_value is temp_matrix['f'][l].xbar_value):
+        return xbar_value.copy ()
+    return xbar_value
+
+# Replace the trace files and xbar values of the node by picklable state
+# Returns what node_restore needs to put the node back
+def node_strip (node_dut):
+    saved_fid_list = node_dut.tile_fid_list
+    node_dut.tile_fid_list = [file_state (fid) for fid in saved_fid_list]
+    saved_tile_list = []
+    for temp_tile in node_dut.tile_list:
+        saved_tile_list.append (temp_tile.fid_list)
+        temp_tile.fid_list = [file_state (fid) for fid in temp_tile.fid_list]
+    # xbar_state looks at fw-xbars - replace values only once all are computed
+    saved_xbar_list = []
+    for temp_matrix in get_xbar_dict_list (node_dut):
+        for key in temp_matrix:
+            for l in range (len(temp_matrix[key])):
+                saved_xbar_list.append ([temp_matrix[key][l], xbar_state (temp_matrix, key, l)])
+    for i in range (len(saved_xbar_list)):
+        [temp_xbar, xbar_value] = saved_xbar_list[i]
+        saved_xbar_list[i][1] = temp_xbar.xbar_value
+        temp_xbar.xbar_value = xbar_value
+    return [saved_fid_list, saved_tile_list, saved_xbar_list]
+
+def node_restore (node_dut, saved_state):
+    [saved_fid_list, saved_tile_list, saved_xbar_list] = saved_state
+    node_dut.tile_fid_list = saved_fid_list
+    for i in range (len(node_dut.tile_list)):
+        node_dut.tile_list[i].fid_list = saved_tile_list[i]
+    for [temp_xbar, xbar_value] in saved_xbar_list:
+        temp_xbar.xbar_value = xbar_value
+
+# Rebuild an unpickled node (inverse of node_strip)
+def node_rebuild (node_dut):
+    node_dut.tile_fid_list = [file_restore (state) for state in node_dut.tile_fid_list]
+    for temp_tile in node_dut.tile_list:
+        temp_tile.fid_list = [file_restore (state) for state in temp_tile.fid_list]
+    rebuilt_list = []
+    for temp_matrix in get_xbar_dict_list (node_dut):
+        for key in temp_matrix:
+            for l in range (len(temp_matrix[key])):
+                rebuilt_list.append ([temp_matrix[key][l], xbar_restore (temp_matrix, key, l)])
+    for [temp_xbar, xbar_value] in rebuilt_list:
+        temp_xbar.xbar_value = xbar_value
+
+### Save the node state at the end of cycle-1 (simulation continues from cycle)
+def save_checkpoint (filename, node_dut, cycle, loop_state):
+    saved_state = node_strip (node_dut)
+    try:
+        # write to a temporary file first - an interrupted save keeps the previous checkpoint
+        temp_filename = filename + '.tmp'
+        fid = open (temp_filename, 'wb')
+        pickle_dump ([cycle, loop_state, node_dut], fid)
+        fid.close ()
+        os.rename (temp_filename, filename)
+    finally:
+        node_restore (node_dut, saved_state)
+
+### Restore a node saved by save_checkpoint - returns [node_dut, cycle, loop_state]
+def load_checkpoint (filename):
+    fid = open (filename, 'rb')
+    [cycle, loop_state, node_dut] = pickle_load (fid)
+    fid.close ()
+    node_rebuild (node_dut)
+    return [node_dut, cycle, loop_state]
+
+
+### Snapshot
+key_list = ['f', 'b', 'd']
+
+# Key - hash of the net's weight files and the config values (of config - a dpe_config, default if None)
+def snapshot_key (instrnpath, config = None):
+    h = hashlib.sha1 ()
+    file_list = []
+    for temp_dir, dir_list, name_list in os.walk (instrnpath + 'weights'):
+        for name in name_list:
+            file_list.append (os.path.relpath (os.path.join (temp_dir, name), instrnpath))
+    for name in sorted (file_list):
+        h.update (name)
+        fid = open (instrnpath + name, 'rb')
+        h.update (fid.read ())
+        fid.close ()
+    hash_config (h, config)
+    return h.hexdigest ()
+
+# Add the (effective) config & constants values (of config - a dpe_config, default if None) to the hash h
+def hash_config (h, config = None):
+    for temp_values in dpe_config.get_values (config):
+        for name in sorted (dir(temp_values)):
+            value = getattr (temp_values, name)
+            if (not name.startswith ('_') and type(value) in [bool, int, long, float, str, list, tuple, dict]):
+                h.update (name + repr(value))
+
+### Save the programmed xbars of a node to the snapshot directory
+def save_snapshot (snapshot_dir, node_dut):
+    # xbar_index row - tile, ima, matrix, key (key_list index), xbar, offset (in xbar_value), rows, columns
+    # bw-xbars equal to their fw-xbars share the values
+    value_list = []
+    index_list = []
+    offset = 0
+    for i in range (len(node_dut.tile_list)):
+        for j in range (len(node_dut.tile_list[i].ima_list)):
+            matrix_list = node_dut.tile_list[i].ima_list[j].matrix_list
+            for k in range (len(matrix_list)):
+                offset_dict = {}
+                for key_id in range (len(key_list)):
+                    key = key_list[key_id]
+                    for l in range (len(matrix_list[k][key])):
+                        xbar_value = matrix_list[k][key][l].xbar_value
+                        if (not np.any (xbar_value)):
+                            continue
+                        assert (xbar_value.dtype == np.float64 and xbar_value.ndim == 2), \
+                                'Snapshot Error: xbar values should be float64 matrices'
+                        if (key == 'b' and l in offset_dict and \
+                                np.array_equal (xbar_value, matrix_list[k]['f'][l].xbar_value)):
+                            index_list.append ([i, j, k, key_id, l, offset_dict[l]] + list (xbar_value.shape))
+                            continue
+                        if (key == 'f'):
+                            offset_dict[l] = offset
+                        index_list.append ([i, j, k, key_id, l, offset] + list (xbar_value.shape))
+                        value_list.append (xbar_value.ravel ())
+                        offset += xbar_value.size
+
+    # write to a temporary directory first - readers only see complete snapshots
+    temp_dir = snapshot_dir + '.tmp' + str(os.getpid())
+    os.makedirs (temp_dir)
+    np.save (os.path.join (temp_dir, 'xbar_value.npy'), np.concatenate (value_list + [np.zeros(0)]))
+    np.save (os.path.join (temp_dir, 'xbar_index.npy'), np.array (index_list, dtype = np.int64).reshape (-1, 8))
+    if (os.path.exists (snapshot_dir)): # saved by a concurrent run
+        shutil.rmtree (temp_dir)
+    else:
+        os.rename (temp_dir, snapshot_dir)
+
+### Program the xbars of a (new) node from the snapshot directory (only its tiles in this process - parallel modes)
+def load_snapshot (snapshot_dir, node_dut):
+    # bw-xbars get their own copy-on-write mapping - a write to a fw-xbar must not show up in its bw-xbar
+    value_file = os.path.join (snapshot_dir, 'xbar_value.npy')
+    value_map = {'f': np.load (value_file, mmap_mode = 'c'), 'b': np.load (value_file, mmap_mode = 'c')}
+    index_array = np.load (os.path.join (snapshot_dir, 'xbar_index.npy'))
+    for [i, j, k, key_id, l, offset, rows, columns] in index_array.tolist ():
+        if (node_dut.tile_list[i] == None):
+            continue
+        key = key_list[key_id]
+        temp_map = value_map.get (key, value_map['f'])
+        # plain ndarray views of the mapping (np.memmap subclass adds overhead to every operation)
+        xbar_value = np.asarray (temp_map[offset:offset+rows*columns]).reshape (rows, columns)
+        node_dut.tile_list[i].ima_list[j].matrix_list[k][key][l].xbar_value = xbar_value
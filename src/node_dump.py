@@ -10,10 +10,12 @@ import sys
 sys.path.insert (0, '/home/aa/dpe_emulate/src/')
 
 from data_convert import *
-import config as cfg
+import dpe_config
 
 # define a dump function for a generic memory entity
-def mem_dump (fid, memfile, name, node = '', tile_id = ''):
+# config - dpe_config of the memory's node (default - the config & constants modules)
+def mem_dump (fid, memfile, name, edram_controller = '', config = None):
+    cfg = dpe_config.get_config (config).cfg
     assert (type(memfile) == list), 'memfile should be list'
     fid.write (name + ' contents\n')
 
@@ -25,9 +27,9 @@ def mem_dump (fid, memfile, name, node = '', tile_id = ''):
             #temp_val = bin2int (memfile[addr], cfg.num_bits)
         #else: # not printing zero values for ease of view
         #    temp_val = 0.0
-            if (name == 'EDRAM' and (node != '') and (tile_id != '')): # for EDRAM also show counter/valid
-                fid.write ('valid: ' + str(node.tile_list[tile_id].edram_controller.valid[addr]) \
-                        + ' | counter: ' + str(node.tile_list[tile_id].edram_controller.counter[addr]) + ' | ')
+            if (name == 'EDRAM' and (edram_controller != '')): # for EDRAM also show counter/valid
+                fid.write ('valid: ' + str(edram_controller.valid[addr]) \
+                        + ' | counter: ' + str(edram_controller.counter[addr]) + ' | ')
             fid.write(str(temp_val) + '\n')
 
 def node_dump (node, filepath = ''):
@@ -35,28 +37,32 @@ def node_dump (node, filepath = ''):
     for i in range(len(node.tile_list)):
         print ('Dumping tile num: ', i)
         filename = filepath + 'tile' + str(i) + '/memsim.txt'
-        fid = open (filename, 'w')
-
-        # dump the edram - one per tile
-        mem_dump (fid, node.tile_list[i].edram_controller.mem.memfile, 'EDRAM', node, i)
-
-        # dump the memory components of IMA
-        for j in range (cfg.num_ima):
-            # dump the datamemory
-            fid.write ('IMA id: ' + str(j) + '\n')
-            mem_dump (fid, node.tile_list[i].ima_list[j].dataMem.memfile, 'DataMemory')
-
-            # traverse the matrices in an ima
-            mvmu_list = ['f', 'b', 'd']
-            for k in range (cfg.num_matrix):
-                # traverse mvmus in a matrix
-                for mvmu_t in mvmu_list:
-                    # dump the xbar input memory
-                    mem_dump (fid, node.tile_list[i].ima_list[j].xb_inMem_list[k][mvmu_t].memfile, \
-                            'Xbar Input Memory: matrixId: ' + str(k) + 'mvmu_type: ' + mvmu_t, 'Xbar Input Memory')
-                    # dump the xbar output memory
-                    mem_dump (fid, node.tile_list[i].ima_list[j].xb_outMem_list[k][mvmu_t].memfile, \
-                            'Xbar Output Memory: matrixId: ' + str(k) + 'mvmu_type: ' + mvmu_t, 'Xbar Output Memory')
-
-        fid.close()
+        tile_dump (node.tile_list[i], filename)
+
+# dump the contents of a tile (memsim.txt)
+def tile_dump (tile, filename):
+    fid = open (filename, 'w')
+
+    # dump the edram - one per tile
+    mem_dump (fid, tile.edram_controller.mem.memfile, 'EDRAM', tile.edram_controller, tile.config)
+
+    # dump the memory components of IMA
+    for j in range (tile.cfg.num_ima):
+        # dump the datamemory
+        fid.write ('IMA id: ' + str(j) + '\n')
+        mem_dump (fid, tile.ima_list[j].dataMem.memfile, 'DataMemory', '', tile.config)
+
+        # traverse the matrices in an ima
+        mvmu_list = ['f', 'b', 'd']
+        for k in range (tile.cfg.num_matrix):
+            # traverse mvmus in a matrix
+            for mvmu_t in mvmu_list:
+                # dump the xbar input memory
+                mem_dump (fid, tile.ima_list[j].xb_inMem_list[k][mvmu_t].memfile, \
+                        'Xbar Input Memory: matrixId: ' + str(k) + 'mvmu_type: ' + mvmu_t, 'Xbar Input Memory', tile.config)
+                # dump the xbar output memory
+                mem_dump (fid, tile.ima_list[j].xb_outMem_list[k][mvmu_t].memfile, \
+                        'Xbar Output Memory: matrixId: ' + str(k) + 'mvmu_type: ' + mvmu_t, 'Xbar Output Memory', tile.config)
+
+    fid.close()
 
@@ -0,0 +1,207 @@
+# Functional (untimed) execution of a node - DNN outputs without the timing models
+# Tile and ima programs are interpreted in dependency order, without pipelines, latencies or arbitration. In each
+# round every tile and ima runs its instructions till it blocks on the edram valid/counter protocol and the noc then
+# delivers the send_queues to the receive buffers:
+# 1. ima - instructions execute in order (ima.do_decode/do_execute, mvm with inner_product_fast). A ld (st) vector
+#    waits till its edram address is valid (invalid) and goes through edram_controller.propagate
+# 2. tile - a send vector waits till its edram entries are valid (tile.do_send), a receive vector till the receive
+#    buffer entry is written and its edram entries are invalid (tile.do_receive), halt till all imas halt and the
+#    send_queue drains
+# 3. noc - send_queue heads are written to the target receive buffers (in order, while the entries are free)
+# Data moves as in the cycle-by-cycle simulation, so the outputs are the same. Cycles and access counts aren't modeled
+
+
+class node_functional (object):
+
+    def __init__ (self, node_dut):
+        self.node_dut = node_dut
+        self.cfg = node_dut.cfg
+        # ld/st of each ima waiting for the edram controller ('' - none)
+        self.mem_op = [[''] * self.cfg.num_ima for i in range (self.cfg.num_tile)]
+        self.num_round = 0
+
+    # ld/st request of the current vector (see ima.execute)
+    def mem_request (self, temp_ima):
+        if (temp_ima.de_opcode == 'ld'):
+            temp_ima.mem_interface.rdRequest (temp_ima.de_r1 + temp_ima.ex_vec_count * temp_ima.de_r2, temp_ima.de_r2)
+        else:
+            temp_ima.st_request ()
+
+    # Serve the request of ima idx if its edram address is valid (ld) or invalid (st) - returns 1 if served
+    def mem_access (self, temp_tile, idx):
+        mem_interface = temp_tile.ima_list[idx].mem_interface
+        valid = temp_tile.edram_controller.valid[mem_interface.addr]
+        if ((mem_interface.ren and not valid) or (mem_interface.wen and valid)):
+            return 0
+        ren_list = [0] * self.cfg.num_ima
+        wen_list = ren_list[:]
+        rd_width_list = ren_list[:]
+        wr_width_list = ren_list[:]
+        ramstore_list = [''] * self.cfg.num_ima
+        addr_list = ren_list[:]
+        ren_list[idx] = mem_interface.ren
+        wen_list[idx] = mem_interface.wen
+        rd_width_list[idx] = mem_interface.rd_width
+        wr_width_list[idx] = mem_interface.wr_width
+        ramstore_list[idx] = mem_interface.ramstore
+        addr_list[idx] = mem_interface.addr
+        [found, idx, ramload] = temp_tile.edram_controller.propagate (ren_list, wen_list, rd_width_list, \
+                wr_width_list, ramstore_list, addr_list)
+        assert (found), 'Functional Error: edram request not served'
+        mem_interface.wait = 0
+        mem_interface.ren = 0
+        mem_interface.wen = 0
+        mem_interface.ramload = ramload
+        return 1
+
+    ### Run ima i of tile tile_id till it blocks (ld/st) or halts - returns 1 on progress
+    def ima_run (self, tile_id, i):
+        temp_tile = self.node_dut.tile_list[tile_id]
+        temp_ima = temp_tile.ima_list[i]
+        fid = temp_tile.fid_list[i]
+        progress = 0
+        while (not temp_ima.halt):
+            # ld/st vectors wait for the edram controller
+            if (self.mem_op[tile_id][i] != ''):
+                if (not self.mem_access (temp_tile, i)):
+                    break
+                progress = 1
+                if (self.mem_op[tile_id][i] == 'ld'):
+                    temp_ima.do_execute ('ld', fid)
+                temp_ima.ex_vec_count += 1
+                if (temp_ima.ex_vec_count < temp_ima.de_vec):
+                    self.mem_request (temp_ima)
+                    continue
+                temp_ima.ex_vec_count = 0
+                temp_ima.stage_empty[2] = 1
+                self.mem_op[tile_id][i] = ''
+                continue
+
+            # program end (no hlt) - the ima never halts
+            instrn = temp_ima.instrnMem.read (temp_ima.pc)
+            if (instrn == ''):
+                break
+            progress = 1
+            temp_ima.fd_instrn = instrn
+            temp_ima.fd_pc = temp_ima.pc
+            temp_ima.pc = temp_ima.pc + 1
+            temp_ima.do_decode (instrn['opcode'])
+            if (temp_ima.de_opcode in ['ld', 'st']):
+                self.mem_op[tile_id][i] = temp_ima.de_opcode
+                self.mem_request (temp_ima)
+                continue
+            temp_ima.do_execute (temp_ima.de_opcode, fid)
+            temp_ima.stage_empty[2] = 1
+        temp_tile.halt_list[i] = temp_ima.halt
+        return progress
+
+    # Next vector of the current send/receive instruction (or the next instruction)
+    def tile_next_vec (self, temp_tile):
+        if (temp_tile.vec_count == temp_tile.instrn['vec']-1):
+            temp_tile.vec_count = 0
+            temp_tile.stall = 0
+        else:
+            temp_tile.vec_count += 1
+
+    ### Run the send/receive/halt instructions of tile tile_id till one blocks or the tile halts - returns 1 on progress
+    def tile_run (self, tile_id):
+        temp_tile = self.node_dut.tile_list[tile_id]
+        progress = 0
+        while (not temp_tile.tile_halt):
+            if (not temp_tile.stall):
+                temp_tile.instrn = temp_tile.instrn_memory.read (temp_tile.pc)
+                temp_tile.pc = temp_tile.pc + 1
+                temp_tile.stall = 1
+                progress = 1
+            opcode = temp_tile.instrn['opcode']
+            if (opcode in ['send', 'receive']):
+                width = temp_tile.instrn['r1']
+                mem_addr = temp_tile.instrn['mem_addr'] + temp_tile.vec_count * width
+                valid_list = temp_tile.edram_controller.valid[mem_addr:mem_addr+width]
+
+            if (opcode == 'send'):
+                assert (width <= self.cfg.receive_buffer_width), 'Send width must be sm/eq to rec_buff_width'
+                if (not all (valid_list)):
+                    break
+                temp_tile.do_send (self.num_round)
+                self.tile_next_vec (temp_tile)
+                progress = 1
+
+            elif (opcode == 'receive'):
+                if (temp_tile.tag_matched == 0):
+                    vtile_id = temp_tile.instrn['vtile_id']
+                    [tag_hit, data] = temp_tile.receive_buffer.read (vtile_id)
+                    temp_tile.tag_matched = tag_hit if (vtile_id >= 0) else 1
+                    temp_tile.received_data = data
+                if (not temp_tile.tag_matched):
+                    break
+                progress = 1
+                if (any (valid_list)):
+                    break
+                temp_tile.do_receive ()
+                temp_tile.tag_matched = 0
+                self.tile_next_vec (temp_tile)
+
+            elif (opcode == 'compute'): # deprecated
+                temp_tile.stall = 0
+
+            else: # halt - after all (used) imas halt and the send_queue drains
+                for k in range (self.cfg.num_ima):
+                    if (not temp_tile.ima_nma_list[k]):
+                        temp_tile.halt_list[k] = 1
+                if (not (all (temp_tile.halt_list) and not temp_tile.send_queue)):
+                    break
+                temp_tile.tile_halt = 1
+                temp_tile.stall = 0
+                for tr_fid in temp_tile.fid_list:
+                    tr_fid.close ()
+                progress = 1
+        return progress
+
+    ### Deliver the send_queue heads to the target receive buffers - returns 1 on progress
+    def noc_run (self):
+        progress = 0
+        tile_list = self.node_dut.tile_list
+        for i in range (self.cfg.num_tile):
+            send_queue = tile_list[i].send_queue
+            while (send_queue):
+                temp_queue_head = send_queue[0]
+                target_addr = temp_queue_head.target_addr
+                tile_addr = self.node_dut.noc.propagate (target_addr, i)
+                if (not tile_list[tile_addr].receive_buffer.write (temp_queue_head.vtile_id, temp_queue_head.data)):
+                    break
+                send_queue.popleft()
+                self.node_dut.noc.propagate_count (target_addr, i)
+                progress = 1
+        return progress
+
+    ### Run rounds till the node halts or a round makes no progress (deadlock) - returns the number of rounds
+    def run (self):
+        node_dut = self.node_dut
+        while (not node_dut.node_halt):
+            progress = 0
+            for i in range (self.cfg.num_tile):
+                temp_tile = node_dut.tile_list[i]
+                if (temp_tile.tile_halt):
+                    continue
+                progress |= self.tile_run (i)
+                for j in range (self.cfg.num_ima):
+                    if (not temp_tile.halt_list[j] and temp_tile.ima_nma_list[j]):
+                        progress |= self.ima_run (i, j)
+                node_dut.tile_halt_list[i] = temp_tile.tile_halt
+            progress |= self.noc_run ()
+            self.num_round += 1
+            if (all (node_dut.tile_halt_list)):
+                node_dut.node_halt = 1
+                for tr_id in node_dut.tile_fid_list:
+                    tr_id.close ()
+            elif (not progress):
+                break
+        return self.num_round
+
+### Functional execution of a (new) node - returns the number of rounds
+def functional_run (node_dut):
+    for temp_tile in node_dut.tile_list:
+        for temp_ima in temp_tile.ima_list:
+            temp_ima.mvm_fast = 1
+    return node_functional (node_dut).run ()
@@ -2,15 +2,58 @@
 # Tile, Network-on-Chip (NOC)
 
 import sys
-import config as cfg
-import constants as param
+import heapq
+import numpy as np
+import dpe_config
+
+# bins of the packet delay histogram - bin b counts delays in [2^(b-1), 2^b) cycles (bin 0 - no delay)
+num_delay_bin = 32
+
+# A packet in a send_queue - data (list of edram values) is shared by reference on its way to the receive buffer
+# (it is never written in place), compact record (no per-packet dict)
+class packet (object):
+    __slots__ = ['data', 'target_addr', 'cycle', 'vtile_id']
+
+    def __init__ (self, data, target_addr, cycle, vtile_id):
+        self.data = data
+        self.target_addr = target_addr
+        self.cycle = cycle
+        self.vtile_id = vtile_id
+
+    # pickled (checkpoints, parallel workers) as a list
+    def __getstate__ (self):
+        return [self.data, self.target_addr, self.cycle, self.vtile_id]
+
+    def __setstate__ (self, state):
+        [self.data, self.target_addr, self.cycle, self.vtile_id] = state
 
 # define an noc class - deals with data transfers between tiles
-# 1. send_queue in each tile is a prt of noc
+# 1. send_queue in each tile (a deque of packets, head first) is a prt of noc
 # 2. noc class here does the decoding part
+# 3. delivery heap - the head of every non-empty send_queue is kept in a heap by the cycle it is due (can be written
+#    to the receive buffer), heads blocked by a full receive buffer entry in a retry list. A cycle only looks at the
+#    due & blocked heads (node.node_run), not at all send_queues. Tiles schedule their head when their send_queue
+#    becomes non-empty (attach)
+# 4. route tables - latency, hops, inter-node flag and links of every (src, dst) tile pair, built once (build_routes)
+#    - fixed model: noc_intra_lat within a node, noc_inter_lat added across nodes (no hops, no mesh links)
+#    - cmesh model: tiles of a logical node sit on a mesh of routers (noc_num_port/2 dimensions, cmesh_c tiles per
+#      router, num_tile_max tiles), packets take dimension-ordered routes. Latency grows by noc_hop_lat per hop, with
+#      noc_intra_lat as the average over all routes of a node. Inter-node packets go to router 0 of their node, take
+#      the HT link (ht_lat) and continue from router 0 of the destination node. I/O tiles sit on router 0 of the
+#      node of the tile they talk to
+#    Links of a route: mesh links, HT link (inter-node), ejection port of the destination tile (see get_links)
+# 5. contention (noc_contention) - link_free holds the cycle each link is free from. A packet due in a cycle passes
+#    each link of its route link_offset cycles before it arrives - it is delayed till all of them are free, then
+#    holds them for packet_width cycles (see acquire_links). Packets due in the same cycle get the links in tile order
+# 6. statistics (see noc_stats) - per flow (src, dst tile): packets, bytes and back-pressure retries (write to a full
+#    receive buffer entry), histogram of packet delays (send to receive buffer write), per link: packets & cycles
+#    packets waited for it (contention). Arrays are allocated with the route tables
 class noc (object):
 
-    def __init__ (self):
+    def __init__ (self, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
 
         self.start_cycle = 0
 
@@ -20,14 +63,42 @@ class noc (object):
         self.num_access_inter = 0 # number of times inter_noc was accessed
 
         # define latency
-        self.latency_intra = param.noc_intra_lat
-        self.latency_inter = param.noc_inter_lat
+        self.latency_intra = self.param.noc_intra_lat
+        self.latency_inter = self.param.noc_inter_lat
+
+        # noc model & contention - config sets without them (include/*Panther, backup) get the fixed model without
+        # contention
+        self.noc_model = getattr (self.cfg, 'noc_model', 'fixed')
+        self.noc_contention = getattr (self.cfg, 'noc_contention', 0)
+
+        # route tables (see build_routes)
+        assert (self.noc_model in ['fixed', 'cmesh']), 'noc_model should be fixed or cmesh'
+        self.build_routes ()
+        self.link_free = np.zeros (self.num_link, dtype = np.int64)
+
+        # statistics
+        self.flow_count = np.zeros ((self.num_tile, self.num_tile), dtype = np.int64)
+        self.flow_bytes = np.zeros ((self.num_tile, self.num_tile), dtype = np.int64)
+        self.flow_retry = np.zeros ((self.num_tile, self.num_tile), dtype = np.int64)
+        self.delay_hist = np.zeros (num_delay_bin, dtype = np.int64)
+        self.link_count = np.zeros (self.num_link, dtype = np.int64)
+        self.link_wait = np.zeros (self.num_link, dtype = np.int64)
+
+        # delivery heap - (due cycle, src tile) of scheduled send_queue heads, src tiles of blocked heads
+        self.attached = 0
+        self.rb_latency = 0
+        self.ready_heap = []
+        self.retry_list = []
+
+    # Logical node a tile belongs to
+    def get_node_id (self, tileId):
+        return (tileId-2) / int(self.cfg.num_tile_max) # integer division (first 2 tiles are i/o tiles)
 
     # Checks if souce and destination tiles belong to the same node
     def check_inter (self, src_tileId, dest_tileId):
         inter_flag = 1
-        src_nodeId = (src_tileId-2) / int(cfg.num_tile_max) # integer division (first 2 tiles are i/o tiles)
-        dest_nodeId = (dest_tileId-2) / int(cfg.num_tile_max)
+        src_nodeId = self.get_node_id (src_tileId)
+        dest_nodeId = self.get_node_id (dest_tileId)
 
         # Note: Input (Output) dummy tile are assumed to communicate (communicated) by intra-node NoC
         #if ((src_tileId == 0) or (dest_tileId == 1) or (src_nodeId == dest_nodeId)): # use this for intermediate layers
@@ -36,13 +107,103 @@ class noc (object):
             inter_flag = 0
         return inter_flag
 
-    # Choose data transfer latency based on inter_flag
+    # Data transfer latency (from the route table)
     def getLatency (self, target_addr, src_tileId):
-        inter_flag = self.check_inter (src_tileId, target_addr)
-        if (inter_flag == 1):
-            #print ('HT occuring', target_addr, src_tileId)
-            return (self.latency_inter + self.latency_intra)
-        return self.latency_intra
+        return int (self.route_latency[src_tileId, target_addr])
+
+    # Links (ids) of the route from src_tileId to target_addr
+    def get_links (self, target_addr, src_tileId):
+        index = src_tileId * self.num_tile + target_addr
+        return self.link_array[self.link_ptr[index]:self.link_ptr[index+1]]
+
+    ### Route tables of all (src, dst) tile pairs
+    def build_routes (self):
+        num_tile = self.cfg.num_tile
+        self.num_tile = num_tile
+        num_node = self.get_node_id (num_tile-1) + 1
+        # cmesh geometry - routers per node, routers per dimension
+        self.num_dim = max (1, self.cfg.noc_num_port / 2)
+        self.num_router = int (np.ceil (self.cfg.num_tile_max / self.cfg.cmesh_c))
+        self.radix = int (np.ceil (self.num_router ** (1.0 / self.num_dim) - 1e-9))
+        # link ids - mesh links (router, dimension, direction) of all nodes, HT link of each node, ejection ports
+        self.ht_link_base = num_node * self.num_router * 2 * self.num_dim
+        self.eject_link_base = self.ht_link_base + num_node
+        self.num_link = self.eject_link_base + num_tile
+        self.router_coord = self.get_coord (np.arange (self.num_router)).tolist ()
+
+        # latency of a route of hops within a node (cmesh) - average over all routes of a node is noc_intra_lat
+        # (noc_hop_lat is read for the cmesh model only - fixed routes have no hops)
+        self.hop_lat = 0
+        if (self.noc_model == 'cmesh'):
+            self.hop_lat = self.param.noc_hop_lat
+            coord = self.get_coord (np.arange (int(self.cfg.num_tile_max)) / self.cfg.cmesh_c)
+            hops = np.abs (coord[:, None, :] - coord[None, :, :]).sum (axis = 2)
+            num_pair = max (1, len(coord) * (len(coord) - 1))
+            self.latency_base = self.latency_intra - self.hop_lat * hops.sum () / float(num_pair)
+
+        self.route_inter = np.zeros ((num_tile, num_tile), dtype = np.int8)
+        self.route_hops = np.zeros ((num_tile, num_tile), dtype = np.int32)
+        self.route_latency = np.zeros ((num_tile, num_tile), dtype = np.int64)
+        link_ptr = [0]
+        link_list = []
+        offset_list = []
+        for src in range (num_tile):
+            for dst in range (num_tile):
+                inter = self.check_inter (src, dst)
+                if (self.noc_model == 'fixed'):
+                    latency = (self.latency_inter + self.latency_intra) if (inter) else self.latency_intra
+                    route = []
+                else:
+                    [src_node, src_router] = self.get_router (src, dst)
+                    [dst_node, dst_router] = self.get_router (dst, src)
+                    if (inter):
+                        route_src = self.get_route (src_node, src_router, 0)
+                        route_dst = self.get_route (dst_node, 0, dst_router)
+                        latency = self.get_hop_latency (len(route_src)) + self.param.ht_lat + \
+                                self.get_hop_latency (len(route_dst))
+                        route = route_src + [self.ht_link_base + src_node] + route_dst
+                        self.route_hops[src, dst] = len(route_src) + len(route_dst)
+                    else:
+                        route = self.get_route (src_node, src_router, dst_router)
+                        latency = self.get_hop_latency (len(route))
+                        self.route_hops[src, dst] = len(route)
+                self.route_inter[src, dst] = inter
+                self.route_latency[src, dst] = latency
+                link_list += route + [self.eject_link_base + dst]
+                link_ptr.append (len(link_list))
+                # cycles before the arrival each link is passed (one hop per link)
+                offset_list += [(len(route) - k) * self.hop_lat for k in range (len(route) + 1)]
+        self.link_ptr = np.array (link_ptr, dtype = np.int64)
+        self.link_array = np.array (link_list, dtype = np.int32)
+        self.link_offset = np.array (offset_list, dtype = np.int64)
+
+    # Coordinates of routers (array) in the mesh of a node
+    def get_coord (self, router):
+        return np.stack ([(router / (self.radix ** d)) % self.radix for d in range (self.num_dim)], axis = -1)
+
+    # [logical node, router] of a tile - I/O tiles sit on router 0 of the node of peer_tileId
+    def get_router (self, tileId, peer_tileId):
+        if (tileId < 2):
+            return [self.get_node_id (peer_tileId) if (peer_tileId >= 2) else 0, 0]
+        local_id = (tileId-2) % int(self.cfg.num_tile_max)
+        return [self.get_node_id (tileId), local_id / self.cfg.cmesh_c]
+
+    # Mesh links (dimension-ordered route) from router src_router to dst_router of a node
+    def get_route (self, nodeId, src_router, dst_router):
+        route = []
+        src_coord = self.router_coord[src_router]
+        dst_coord = self.router_coord[dst_router]
+        router = src_router
+        for d in range (self.num_dim):
+            step = 1 if (dst_coord[d] > src_coord[d]) else -1
+            for k in range (abs (dst_coord[d] - src_coord[d])):
+                route.append (((nodeId * self.num_router + router) * self.num_dim + d) * 2 + (step < 0))
+                router += step * (self.radix ** d)
+        return route
+
+    # Latency of a route of num_hops hops within a node (cmesh)
+    def get_hop_latency (self, num_hops):
+        return max (1, int (round (self.latency_base + self.hop_lat * num_hops)))
 
     # target addr is same as dest_tileId (tiles are numbered from 0 to num_node*num_tile+1) -- includes 2 dummy tiles
     def propagate (self, target_addr, src_tileId):
@@ -55,7 +216,7 @@ class noc (object):
 
         # Check if target address is supported by the DPE configuration
         assert ((type(target_addr) == int) and \
-                (target_addr <= cfg.num_node * (cfg.num_tile_compute + 2))), \
+                (target_addr <= self.cfg.num_node * (self.cfg.num_tile_compute + 2))), \
                 'target addr is invalid - check format and length'
         return target_addr
 
@@ -63,15 +224,103 @@ class noc (object):
     # target addr is same as dest_tileId (tiles are numbered from 0 to num_node*num_tile+1) -- includes 2 dummy tiles
     def propagate_count (self, target_addr, src_tileId):
         # Based on flag add to NoC (intra) or HT (inter) access
-        inter_flag = self.check_inter (src_tileId, target_addr)
+        inter_flag = self.route_inter[src_tileId, target_addr]
         if (inter_flag == 1):
-            print ('inter node ' + str(src_tileId) + ' ' + str(target_addr))
             self.num_access_inter += 1
         self.num_access_intra += 1
 
+    ### Statistics of a packet (size values, sent in send_cycle) written to the receive buffer in cycle
+    def count_flow (self, target_addr, src_tileId, send_cycle, size, cycle):
+        self.flow_count[src_tileId, target_addr] += 1
+        self.flow_bytes[src_tileId, target_addr] += size * self.cfg.data_width / 8
+        self.delay_hist[min (int (cycle - send_cycle).bit_length (), num_delay_bin-1)] += 1
+        index = src_tileId * self.num_tile + target_addr
+        self.link_count[self.link_array[self.link_ptr[index]:self.link_ptr[index+1]]] += 1
+
+    # A packet due in a cycle found its receive buffer entry full (retried) - in num_cycles cycles
+    def count_retry (self, target_addr, src_tileId, num_cycles = 1):
+        self.flow_retry[src_tileId, target_addr] += num_cycles
+
+    # Name of a link (see build_routes)
+    def get_link_name (self, link):
+        if (link >= self.eject_link_base):
+            return 'eject tile ' + str(link - self.eject_link_base)
+        if (link >= self.ht_link_base):
+            return 'ht node ' + str(link - self.ht_link_base)
+        [router, direction] = divmod (link, 2 * self.num_dim)
+        [nodeId, router] = divmod (router, self.num_router)
+        return 'node ' + str(nodeId) + ' router ' + str(router) + ' dim ' + str(direction / 2) + \
+                (' -' if (direction % 2) else ' +')
+
     def start_noc (self, cycle):
         self.start_cycle = cycle
 
     def stop_noc (self, cycle):
         self.num_cycles_intra += (cycle - self.start_cycle+1)
 
+
+    ### Delivery heap
+    # Tiles notify the noc (schedule) when their send_queue becomes non-empty - heads already queued are scheduled
+    def attach (self, tile_list):
+        self.attached = 1
+        self.rb_latency = tile_list[0].receive_buffer.getLatency()
+        for i in range (len(tile_list)):
+            tile_list[i].noc = self
+            tile_list[i].noc_port = i
+            if (tile_list[i].send_queue):
+                self.schedule (i, tile_list[i].send_queue[0], 0)
+
+    # Schedule the send_queue head of tile src_tileId - due once noc & receive buffer latency have passed (not
+    # before min_cycle)
+    def schedule (self, src_tileId, temp_packet, min_cycle):
+        transfer_latency = self.getLatency (temp_packet.target_addr, src_tileId) + self.rb_latency
+        heapq.heappush (self.ready_heap, (max (temp_packet.cycle + transfer_latency - 1, min_cycle), src_tileId))
+
+    # Reschedule the send_queue head of tile src_tileId (delayed by contention) to cycle
+    def delay (self, src_tileId, cycle):
+        heapq.heappush (self.ready_heap, (cycle, src_tileId))
+
+    # Contention - the links of the route of a packet arriving in cycle are taken if free (held for packet_width
+    # cycles from the cycle each is passed) - returns the delay till all of them are free (0 - taken)
+    def acquire_links (self, target_addr, src_tileId, cycle):
+        index = src_tileId * self.num_tile + target_addr
+        start = self.link_ptr[index]
+        end = self.link_ptr[index+1]
+        link_list = self.link_array[start:end]
+        use_cycle = cycle - self.link_offset[start:end]
+        wait = self.link_free[link_list] - use_cycle
+        delay = int (wait.max ())
+        if (delay > 0):
+            self.link_wait[link_list[wait.argmax ()]] += delay
+            return delay
+        self.link_free[link_list] = use_cycle + self.cfg.packet_width
+        return 0
+
+    # Any send_queue non-empty
+    def busy (self):
+        return (len (self.ready_heap) + len (self.retry_list)) > 0
+
+    # Src tiles (in tile order) of the heads to transfer in cycle - due or blocked (removed from the heap/retry list)
+    def pop_due (self, cycle):
+        ready_heap = self.ready_heap
+        if (not self.retry_list and (not ready_heap or ready_heap[0][0] > cycle)):
+            return []
+        src_list = self.retry_list
+        self.retry_list = []
+        while (ready_heap and ready_heap[0][0] <= cycle):
+            src_list.append (heapq.heappop (ready_heap)[1])
+        src_list.sort ()
+        return src_list
+
+    # Returns the next cycle (after cycle) in which the noc has work - start/stop or a packet transfer
+    # Used by event-driven (fast-forward) mode, send_queues are part of noc (stored in tiles)
+    def get_next_event (self, cycle, tile_list, noc_start):
+        # a packet blocked by a full receive buffer entry is retried once the entry is read
+        for i in self.retry_list:
+            temp_queue_head = tile_list[i].send_queue[0]
+            if (tile_list[temp_queue_head.target_addr].receive_buffer.isempty (temp_queue_head.vtile_id)):
+                return cycle + 1
+        # noc starts (stops) in the cycle after a send_queue becomes non-empty (all become empty)
+        if (self.busy () != noc_start):
+            return cycle + 1
+        return self.ready_heap[0][0] if (self.ready_heap) else float('inf')
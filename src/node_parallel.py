@@ -0,0 +1,452 @@
+# Multi-process (parallel) simulation of a node
+# Tiles of a node are split across worker processes (partitions) - either evenly (tile-parallel mode) or one
+# partition per logical node (multi-node mode, conservative parallel discrete-event simulation). Workers
+# run a quantum of cycles on their own and exchange the packets with the parent (coordinator) at its end.
+# The coordinator is centralised (a star): workers are connected only to the parent, every transfer between
+# partitions (e.g. inter-node packets) passes through it - there are no direct links between node workers.
+#
+# Transfers are performed by the partition of the destination tile - the reads and writes of a receive buffer entry
+# are in one process and the writes of a cycle are in tile order (as node_run). In a quantum a send_queue is drained
+# by the partition of its head's destination (deliverer) - its packets till one to another partition, the
+# coordinator sends them to a deliverer other than the sender's partition.
+# The quantum is bounded by the lookahead - the minimum transfer latency (noc + receive buffer) between partitions in
+# the tile programs (noc_inter_lat for multi-node) less a cycle, a packet sent to another partition in a quantum
+# isn't due in it. The quantum ends early before a packet the deliverer doesn't know may be due - one to another
+# partition behind the packets it drains (the deliverer changes at the next quantum), or one a sender drained by
+# another partition may send within its partition.
+# A sender drained by another partition doesn't know when its send_queue empties - its tile is parked when it reaches
+# the halt (the only instruction that reads the send_queue) and catches up at the next quantum, with the cycles its
+# packets were delivered in. The coordinator keeps a copy of the send_queues - noc start/stop, send_queue peaks and
+# noc statistics follow from the send & delivery cycles of the packets.
+# Results (outputs, stats, traces) are cycle-identical to node.node_run.
+# Each worker instantiates, initializes & programs only the tiles of its partition (from the net's instructions and
+# weights) - the coordinator's node has no tiles, it keeps the noc and the state of the transfers. Workers write the
+# traces (and memsim.txt dumps) of their tiles, at the end they return the results the reports read (see tile_result).
+
+from multiprocessing import Process, Pipe
+import collections
+import traceback
+import sys
+
+import node
+import hw_stats
+import ima_loop
+from node_dump import tile_dump
+
+
+# maximum quantum (cycles between syncs) - bounds node halt detection when partitions don't communicate
+quantum_max = 1000
+
+# Receive buffer entries (target_addr, vtile_id) a tile sends to - from the send instructions of its program
+def get_send_list (temp_tile):
+    send_list = []
+    for temp_instrn in temp_tile.instrn_memory.memfile:
+        if (type(temp_instrn) == dict and temp_instrn['opcode'] == 'send'):
+            send_list.append ((temp_instrn['r2'], temp_instrn['vtile_id']))
+    return send_list
+
+# The tile executes a halt in its next cycle (the instruction in progress or the one it fetches)
+def at_halt (temp_tile):
+    if (temp_tile.stall):
+        temp_instrn = temp_tile.instrn
+    else:
+        temp_instrn = temp_tile.instrn_memory.memfile[temp_tile.pc]
+    return (type(temp_instrn) == dict and temp_instrn['opcode'] == 'halt')
+
+
+### Partitions of tiles
+# tile-parallel mode - contiguous split of tiles across num_proc workers
+def tile_split (node_dut, num_proc):
+    num_tile = node_dut.cfg.num_tile
+    num_proc = max (1, min (num_proc, num_tile))
+    return [range (p*num_tile/num_proc, (p+1)*num_tile/num_proc) for p in range (num_proc)]
+
+# multi-node mode - one worker per logical node (i/o tiles go with the first node)
+def node_split (noc):
+    split_dict = {}
+    for i in range (noc.cfg.num_tile):
+        node_id = max (0, noc.get_node_id (i))
+        split_dict.setdefault (node_id, []).append (i)
+    return [split_dict[node_id] for node_id in sorted (split_dict)]
+
+
+### Worker - simulates a partition (tile_ids) of the node of config, initialized by init_func (node with the tiles
+# of the partition), memsim.txt dumps go to tracepath (debug mode)
+# Sends the receive buffer entries the tiles send to and their send_queues to the coordinator, gets count_progress -
+# report the progress count & busy imas (deadlock detection) at quantum ends
+# A quantum message has the delivery cycles of the packets of its senders drained by other partitions, the packets of
+# the senders of other partitions it drains, its senders drained by other partitions and the last cycle to simulate
+# An exception is sent to the coordinator (worker_error) which re-raises it
+def worker_run (config, tile_ids, init_func, tracepath, conn):
+    try:
+        worker_loop (config, tile_ids, init_func, tracepath, conn)
+    except Exception:
+        sys.stdout.flush ()
+        conn.send (worker_error (tile_ids, traceback.format_exc ()))
+        conn.close ()
+
+def worker_loop (config, tile_ids, init_func, tracepath, conn):
+    node_dut = node.node (0, config, tile_ids)
+    init_func (node_dut)
+    sys.stdout.flush ()
+    tile_list = node_dut.tile_list
+    noc = node_dut.noc
+    rb_latency = tile_list[tile_ids[0]].receive_buffer.getLatency()
+    conn.send ([rb_latency, dict ((i, [get_send_list (tile_list[i]), list (tile_list[i].send_queue), \
+            tile_list[i].send_queue_peak, tile_list[i].tile_halt]) for i in tile_ids)])
+    count_progress = conn.recv ()
+    local_set = set (tile_ids)
+    num_known = dict ((i, len (tile_list[i].send_queue)) for i in tile_ids) # packets known to coordinator
+    remote_queue = {} # send_queue heads of the senders of other partitions drained by this one
+    park_dict = {} # tiles parked at halt - the first cycle not simulated
+    cycle = -1 # last cycle simulated
+
+    while (True):
+        msg = conn.recv ()
+        # packets delivered by other partitions in the last quantum leave the send_queues, parked tiles catch up
+        # (a packet delivered in a cycle leaves after the tiles ran in it)
+        pop_dict = msg[1]
+        halt_dict = {}
+        for i in sorted (set (pop_dict) | set (park_dict)):
+            send_queue = tile_list[i].send_queue
+            pop_list = pop_dict.get (i, [])
+            k = 0
+            for c in range (park_dict.pop (i, cycle+1), cycle+1):
+                while (k < len(pop_list) and pop_list[k] < c):
+                    send_queue.popleft ()
+                    k += 1
+                tile_list[i].tile_run (c, node_dut.tile_fid_list[i])
+                if (tile_list[i].tile_halt):
+                    halt_dict[i] = c
+                    break
+            for k in range (k, len(pop_list)):
+                send_queue.popleft ()
+            num_known[i] -= len(pop_list)
+        if (msg[0] == 'end'):
+            break
+        [chain_dict, remote_set, last_cycle] = msg[2:]
+        for i in chain_dict:
+            remote_queue.setdefault (i, collections.deque ()).extend (chain_dict[i])
+        # senders this partition drains (tile order)
+        sender_list = sorted ([i for i in tile_ids if (i not in remote_set)] + \
+                [i for i in remote_queue if (remote_queue[i])])
+
+        # run the tiles and the transfers to them till last_cycle
+        transfer_list = []
+        retry_dict = {}
+        for c in range (cycle+1, last_cycle+1):
+            for i in tile_ids:
+                if (tile_list[i].tile_halt or i in park_dict):
+                    continue
+                if (i in remote_set and tile_list[i].send_queue and at_halt (tile_list[i])):
+                    park_dict[i] = c
+                    continue
+                tile_list[i].tile_run (c, node_dut.tile_fid_list[i])
+                if (tile_list[i].tile_halt):
+                    halt_dict[i] = c
+
+            for i in sender_list:
+                send_queue = tile_list[i].send_queue if (i in local_set) else remote_queue[i]
+                if (not send_queue):
+                    continue
+                temp_queue_head = send_queue[0]
+                target_addr = temp_queue_head.target_addr
+                transfer_latency = noc.getLatency (target_addr, i) + rb_latency
+                if ((c - temp_queue_head.cycle) < transfer_latency-1):
+                    continue
+                tile_addr = noc.propagate (target_addr, i)
+                assert (tile_addr in local_set), 'a packet to another partition must not be due in the quantum'
+                write_hit = tile_list[tile_addr].receive_buffer.write (temp_queue_head.vtile_id, \
+                        temp_queue_head.data)
+                if (write_hit == 1):
+                    send_queue.popleft()
+                    if (i in local_set and num_known[i] > 0):
+                        num_known[i] -= 1
+                    transfer_list.append ((target_addr, i, temp_queue_head.cycle, len(temp_queue_head.data), c))
+                else:
+                    retry_dict[(target_addr, i)] = retry_dict.get ((target_addr, i), 0) + 1
+        cycle = last_cycle
+
+        # report transfers, retries, packets sent in this quantum (still queued) and halts to the coordinator
+        packet_dict = {}
+        for i in tile_ids:
+            temp_queue = tile_list[i].send_queue
+            if (len(temp_queue) > num_known[i]):
+                packet_dict[i] = list(temp_queue)[num_known[i]:]
+                num_known[i] = len(temp_queue)
+        progress = [0, 0]
+        if (count_progress):
+            progress = [sum ([tile_list[i].tile_progress () for i in tile_ids]), \
+                    any ([tile_list[i].tile_busy (cycle+1) for i in tile_ids \
+                    if (not tile_list[i].tile_halt and i not in park_dict)])]
+        conn.send ([transfer_list, retry_dict, packet_dict, halt_dict, len(park_dict), progress])
+
+    # close the traces, dump the memories (debug mode) and return the tiles' results
+    result_list = []
+    for i in tile_ids:
+        for fid in tile_list[i].fid_list + [node_dut.tile_fid_list[i]]:
+            if (not fid.closed):
+                fid.close ()
+        if (node_dut.cfg.debug):
+            print ('Dumping tile num: ', i)
+            tile_dump (tile_list[i], tracepath + 'tile' + str(i) + '/memsim.txt')
+        result_list.append ((i, tile_result (tile_list[i], i == len(tile_list)-1)))
+    sys.stdout.flush ()
+    conn.send (result_list)
+    conn.close ()
+
+
+# Exception of a worker (its traceback) - raised by the coordinator
+class worker_error (object):
+    def __init__ (self, tile_ids, trace):
+        self.tile_ids = tile_ids
+        self.trace = trace
+
+# Message of a worker - raises its exception
+def worker_recv (conn):
+    msg = conn.recv ()
+    if (isinstance (msg, worker_error)):
+        raise RuntimeError ('worker of tiles ' + str(msg.tile_ids[0]) + '-' + str(msg.tile_ids[-1]) + \
+                ' failed:\n' + msg.trace)
+    return msg
+
+
+### Results of a tile read by the reports (worker -> coordinator, see node.tile_result_list): access counts
+# (hw_stats), send_queue peak (noc_stats), fast-forwarded loops (ima_loop), the state node_diagnose reports on and
+# the edram of the output tile (output.txt)
+def tile_result (temp_tile, output):
+    tile_access = hw_stats.get_hw_comp_access ()
+    hw_stats.add_tile_access (tile_access, temp_tile)
+    result = {'access': tile_access, 'send_queue_peak': temp_tile.send_queue_peak, 'halt': temp_tile.tile_halt,
+            'diagnose': [], 'queue_head': None, 'loop': [0, 0], 'memfile': None,
+            'rb_valid': [entry['valid'] for entry in temp_tile.receive_buffer.buffer]}
+    if (temp_tile.ima_list[0].loop != None):
+        result['loop'] = ima_loop.tile_loop_stats ([temp_tile])
+    if (not temp_tile.tile_halt):
+        result['diagnose'] = temp_tile.tile_diagnose ()
+    if (temp_tile.send_queue):
+        result['queue_head'] = [temp_tile.send_queue[0].target_addr, temp_tile.send_queue[0].vtile_id]
+    if (output):
+        result['memfile'] = temp_tile.edram_controller.mem.memfile
+    return result
+
+
+### Coordinator - simulates the node (no tiles - see node.node) with a worker per partition (list of tile ids) till
+# halt, cycles_max or no progress for deadlock_window cycles (checked at quantum ends).
+# Workers initialize their partitions with init_func (see worker_run), debug dumps go to tracepath.
+# Returns the cycle count (same as the serial run loop in dpe.py), the results of the tiles are in
+# node_dut.tile_result_list
+# reporter - heartbeat updated at quantum ends (None - none)
+# An exception of a worker is re-raised with its traceback, the other workers are terminated
+def node_run_parallel (node_dut, split_list, init_func, tracepath, cycles_max, deadlock_window = 0, reporter = None):
+    num_tile = node_dut.cfg.num_tile
+    num_proc = len (split_list)
+
+    owner = [0] * num_tile
+    for p in range (num_proc):
+        for i in split_list[p]:
+            owner[i] = p
+
+    # buffered output would be duplicated by the forked workers
+    sys.stdout.flush ()
+    conn_list = []
+    proc_list = []
+    try:
+        for p in range (num_proc):
+            [parent_conn, child_conn] = Pipe ()
+            proc = Process (target=worker_run, args=(node_dut.config, split_list[p], init_func, tracepath, \
+                    child_conn))
+            proc.daemon = True
+            proc.start ()
+            conn_list.append (parent_conn)
+            proc_list.append (proc)
+        cycle = coordinator_run (node_dut, split_list, owner, conn_list, cycles_max, deadlock_window, reporter)
+        for proc in proc_list:
+            proc.join ()
+        return cycle
+    finally:
+        # workers left blocked by an error (of the coordinator or a worker) are stopped
+        for proc in proc_list:
+            if (proc.is_alive ()):
+                proc.terminate ()
+            proc.join ()
+
+# Runs the node with the workers connected to conn_list (see node_run_parallel)
+def coordinator_run (node_dut, split_list, owner, conn_list, cycles_max, deadlock_window, reporter):
+    num_tile = node_dut.cfg.num_tile
+    num_proc = len (split_list)
+    noc = node_dut.noc
+
+    # noc state - copy of all send_queues and their peaks (initial state from the workers)
+    send_dict = {}
+    queue_list = [None] * num_tile
+    peak_list = [0] * num_tile
+    halt_cycle = [None] * num_tile
+    for p in range (num_proc):
+        [rb_latency, state_dict] = worker_recv (conn_list[p])
+        for i in state_dict:
+            [send_dict[i], queue_list[i], peak_list[i], tile_halt] = state_dict[i]
+            if (tile_halt):
+                halt_cycle[i] = -1
+
+    # lookahead from the tile programs - minimum transfer latency between partitions; the minimum latency of the
+    # transfers of a tile within its partition bounds the quantum while another partition drains its send_queue
+    lookahead = float('inf')
+    local_lat = [float('inf')] * num_tile
+    for i in range (num_tile):
+        for [target_addr, vtile_id] in send_dict[i]:
+            transfer_latency = noc.getLatency (target_addr, i) + rb_latency
+            if (owner[target_addr] != owner[i]):
+                lookahead = min (lookahead, transfer_latency)
+            else:
+                local_lat[i] = min (local_lat[i], transfer_latency)
+    assert (lookahead > 1), 'transfers between partitions must take more than a cycle'
+    quantum = int (min (lookahead-1, quantum_max))
+    print ('Parallel simulation: ' + str(num_proc) + ' partitions, quantum ' + str(quantum) + ' cycles')
+    for p in range (num_proc):
+        conn_list[p].send (deadlock_window > 0)
+
+    # cycle a packet sent by src_id is due in (noc & receive buffer latency passed)
+    def get_ready (src_id, temp_packet):
+        return temp_packet.cycle + noc.getLatency (temp_packet.target_addr, src_id) + rb_latency - 1
+
+    deliverer = list (owner) # partition that drains each send_queue
+    num_chain = [0] * num_tile # packets of a send_queue (head) sent to its deliverer of another partition
+    pop_split = [{} for p in range (num_proc)] # delivery cycles for the partitions of senders drained by others
+    progress = -1
+    progress_cycle = 0
+    num_park = 0
+    cycle = -1 # last simulated cycle
+    while (True):
+        # deliverers and the quantum - a quantum ends before a packet its deliverer doesn't know may be due
+        # (parked tiles catch up in a quantum of no cycles before the run ends)
+        end_cycle = min (cycle+quantum, cycles_max-1)
+        last_cycle = end_cycle
+        chain_split = [{} for p in range (num_proc)]
+        for i in range (num_tile):
+            temp_queue = queue_list[i]
+            temp_deliverer = owner[temp_queue[0].target_addr] if (temp_queue) else owner[i]
+            if (temp_deliverer != deliverer[i]):
+                deliverer[i] = temp_deliverer
+                num_chain[i] = 0
+            due_cycle = cycle # earliest cycle a packet can be delivered in (after the packets ahead of it)
+            k = 0
+            unknown = 1
+            while (k < len(temp_queue)):
+                due_cycle = max (due_cycle+1, get_ready (i, temp_queue[k]))
+                if (due_cycle > end_cycle):
+                    unknown = 0
+                    break
+                if (owner[temp_queue[k].target_addr] != temp_deliverer):
+                    last_cycle = min (last_cycle, due_cycle-1)
+                    unknown = 0
+                    break
+                k += 1
+            if (temp_deliverer == owner[i]):
+                continue
+            # packets sent in the quantum - within the sender's partition (latency may be below the lookahead)
+            if (unknown):
+                last_cycle = min (last_cycle, max (due_cycle+1, cycle+local_lat[i]) - 1)
+            if (k > num_chain[i]):
+                chain_split[temp_deliverer][i] = temp_queue[num_chain[i]:k]
+                num_chain[i] = k
+        if (num_park and (cycle == cycles_max-1 or (deadlock_window and cycle - progress_cycle >= deadlock_window))):
+            last_cycle = cycle
+
+        for p in range (num_proc):
+            remote_set = set ([i for i in split_list[p] if (deliverer[i] != p)])
+            conn_list[p].send (['run', pop_split[p], chain_split[p], remote_set, last_cycle])
+
+        num_queued = [len (temp_queue) for temp_queue in queue_list]
+        pop_list = [[] for i in range (num_tile)] # delivery cycles in the quantum
+        send_list = [[] for i in range (num_tile)] # send cycles in the quantum
+        packet_list = [[] for i in range (num_tile)] # packets sent in the quantum still queued
+        temp_progress = 0
+        ima_busy = 0
+        num_park = 0
+        for p in range (num_proc):
+            [transfer_list, retry_dict, packet_dict, halt_dict, temp_park, worker_progress] = \
+                    worker_recv (conn_list[p])
+            temp_progress += worker_progress[0]
+            ima_busy |= worker_progress[1]
+            num_park += temp_park
+            for [target_addr, src_id, send_cycle, size, c] in transfer_list:
+                noc.propagate_count (target_addr, src_id)
+                noc.count_flow (target_addr, src_id, send_cycle, size, c)
+                # a packet sent and delivered in the quantum (within the partition)
+                if (len(pop_list[src_id]) >= num_queued[src_id]):
+                    send_list[src_id].append (send_cycle)
+                pop_list[src_id].append (c)
+            for [target_addr, src_id] in retry_dict:
+                noc.count_retry (target_addr, src_id, retry_dict[(target_addr, src_id)])
+            for i in packet_dict:
+                packet_list[i] = packet_dict[i]
+                send_list[i] += [temp_packet.cycle for temp_packet in packet_dict[i]]
+            for i in halt_dict:
+                halt_cycle[i] = halt_dict[i]
+
+        if (temp_progress != progress or ima_busy):
+            progress = temp_progress
+            progress_cycle = last_cycle
+
+        # send_queue copies and peaks (depth after each send - a packet delivered in a cycle leaves after the tiles
+        # ran in it), the number of queued packets in each cycle of the quantum (noc busy)
+        busy_list = [0] * (last_cycle - cycle + 1)
+        busy_list[0] = sum (num_queued)
+        pop_split = [{} for p in range (num_proc)]
+        for i in range (num_tile):
+            k = 0
+            for j in range (len(send_list[i])):
+                while (k < len(pop_list[i]) and pop_list[i][k] < send_list[i][j]):
+                    k += 1
+                peak_list[i] = max (peak_list[i], num_queued[i] + j+1 - k)
+                busy_list[send_list[i][j]-cycle-1] += 1
+            for c in pop_list[i]:
+                busy_list[c-cycle] -= 1
+            if (pop_list[i] or packet_list[i]):
+                queue_list[i] = queue_list[i][len(pop_list[i]):] + packet_list[i]
+            if (deliverer[i] != owner[i] and pop_list[i]):
+                num_chain[i] -= len(pop_list[i])
+                pop_split[owner[i]][i] = pop_list[i]
+        for j in range (1, len(busy_list)):
+            busy_list[j] += busy_list[j-1]
+
+        # node halts in the cycle its last tile halts
+        node_halt_cycle = None
+        if (all ((temp_cycle is not None) for temp_cycle in halt_cycle)):
+            node_halt_cycle = max (halt_cycle)
+
+        # noc start/stop and the per-cycle trace for the quantum
+        for c in range (cycle+1, last_cycle+1):
+            if (node_halt_cycle is not None and c > node_halt_cycle):
+                break
+            busy = busy_list[c-cycle-1]
+            if (node_dut.noc_start == 0 and busy):
+                node_dut.noc_start = 1
+                noc.start_noc (c)
+            if (node_dut.noc_start == 1 and not busy):
+                noc.stop_noc (c)
+                node_dut.noc_start = 0
+            node_dut.tile_halt_list = [int (temp_cycle is not None and temp_cycle <= c) for temp_cycle in halt_cycle]
+        cycle = last_cycle
+        if (reporter != None):
+            reporter.update (node_dut, cycle)
+
+        if (node_halt_cycle is not None):
+            node_dut.node_halt = 1
+            print ('cycle: ' + str (node_halt_cycle) + ' Node Halted')
+            cycle = node_halt_cycle
+            break
+        if (num_park == 0 and (cycle == cycles_max-1 or (deadlock_window and cycle - progress_cycle >= deadlock_window))):
+            break
+
+    # collect the tiles' results from workers (send_queue peaks are tracked here)
+    for p in range (num_proc):
+        conn_list[p].send (['end', pop_split[p]])
+    node_dut.tile_result_list = [None] * num_tile
+    for p in range (num_proc):
+        for [i, result] in worker_recv (conn_list[p]):
+            result['send_queue_peak'] = peak_list[i]
+            node_dut.tile_result_list[i] = result
+
+    return cycle + 1
@@ -0,0 +1,113 @@
+# Content-addressed cache of whole-run results
+# A run is keyed by a hash of everything its results depend on: the files of the net's instruction directory
+# (tile/core programs, weights, input.npy), the effective config & constants values, the options changing results
+# (key_option_list - exact modes like -f/-a/-p give the same results) and the simulator sources. An entry is a
+# directory (named by the key) with the run's output.txt, harwdare_stats.txt, noc_stats.txt/.npy (sampling_stats.txt)
+# and metric_dict.json
+# 1. entries are written to a temporary directory first and renamed - readers only see complete entries
+# 2. a hit touches the entry (LRU) - after a save the least recently used entries are evicted till the cache fits
+#    max_size
+# 3. a shared cache (a directory used by several users) is created with group/other read-write permissions
+
+import os
+import json
+import shutil
+import hashlib
+
+import node_checkpoint
+
+result_list = ['output.txt', 'harwdare_stats.txt', 'noc_stats.txt', 'noc_stats.npy', 'sampling_stats.txt']
+key_option_list = ['dedup', 'sample', 'warmup', 'transaction', 'functional', 'deadlock_window']
+
+src_dir = os.path.dirname (os.path.abspath (__file__))
+
+### Key of a run of the net in instrnpath with option_dict (dpe.run options) & config (dpe_config, default if None)
+def run_key (instrnpath, option_dict, config = None):
+    h = hashlib.sha1 ()
+    for [temp_dir, file_dir] in [[instrnpath, ''], [src_dir, 'src']]:
+        file_list = []
+        for temp_path, dir_list, name_list in os.walk (temp_dir):
+            dir_list.sort ()
+            for name in name_list:
+                if (temp_dir == instrnpath or name.endswith ('.py')):
+                    file_list.append (os.path.relpath (os.path.join (temp_path, name), temp_dir))
+        for name in sorted (file_list):
+            h.update (os.path.join (file_dir, name))
+            fid = open (os.path.join (temp_dir, name), 'rb')
+            h.update (fid.read ())
+            fid.close ()
+    node_checkpoint.hash_config (h, config)
+    for name in key_option_list:
+        h.update (name + repr (option_dict.get (name)))
+    return h.hexdigest ()
+
+def get_size (path):
+    size = 0
+    for temp_path, dir_list, name_list in os.walk (path):
+        for name in name_list:
+            size += os.path.getsize (os.path.join (temp_path, name))
+    return size
+
+### Copy the results of entry key to tracepath - returns [hit, metric_dict]
+def cache_load (cache_dir, key, tracepath):
+    entry_dir = os.path.join (cache_dir, key)
+    try:
+        fid = open (os.path.join (entry_dir, 'metric_dict.json'))
+        metric_dict = json.load (fid)
+        fid.close ()
+        for name in result_list:
+            if (os.path.exists (os.path.join (entry_dir, name))):
+                shutil.copyfile (os.path.join (entry_dir, name), tracepath + name)
+        os.utime (entry_dir, None)
+    except (IOError, OSError, ValueError): # missing (or evicted while reading)
+        return [0, None]
+    return [1, metric_dict]
+
+### Save the results of a run (in tracepath) as entry key, then evict entries till the cache fits max_size (MB)
+# name_list - result files written by the run (in result_list)
+def cache_save (cache_dir, key, tracepath, metric_dict, max_size, shared = 0, name_list = result_list[:2]):
+    if (not os.path.exists (cache_dir)):
+        try:
+            os.makedirs (cache_dir)
+            if (shared):
+                os.chmod (cache_dir, 0o2777)
+        except OSError: # created by a concurrent run
+            pass
+    entry_dir = os.path.join (cache_dir, key)
+    temp_dir = entry_dir + '.tmp' + str(os.getpid())
+    os.makedirs (temp_dir)
+    for name in name_list:
+        shutil.copyfile (tracepath + name, os.path.join (temp_dir, name))
+    fid = open (os.path.join (temp_dir, 'metric_dict.json'), 'w')
+    json.dump (metric_dict, fid)
+    fid.close ()
+    if (shared):
+        os.chmod (temp_dir, 0o777)
+        for name in os.listdir (temp_dir):
+            os.chmod (os.path.join (temp_dir, name), 0o666)
+    try:
+        os.rename (temp_dir, entry_dir)
+    except OSError: # saved by a concurrent run
+        shutil.rmtree (temp_dir, ignore_errors = True)
+    cache_evict (cache_dir, max_size)
+
+# Remove the least recently used entries till the cache fits max_size (MB)
+def cache_evict (cache_dir, max_size):
+    entry_list = []
+    total = 0
+    for name in os.listdir (cache_dir):
+        entry_dir = os.path.join (cache_dir, name)
+        if ('.tmp' in name or not os.path.isdir (entry_dir)):
+            continue
+        try:
+            size = get_size (entry_dir)
+            entry_list.append ([os.path.getmtime (entry_dir), size, entry_dir])
+        except OSError: # evicted by a concurrent run
+            continue
+        total += size
+    entry_list.sort ()
+    for [mtime, size, entry_dir] in entry_list:
+        if (total <= max_size * (1 << 20)):
+            break
+        shutil.rmtree (entry_dir, ignore_errors = True)
+        total -= size
@@ -1,15 +1,15 @@
 # Defines a configurable tile with its methods
 
-import sys, json
+import os, sys, json
 sys.path.insert (0, '/home/aa/dpe_emulate/include')
 
-import Queue
+import collections
 
 import numpy as np
-import config as cfg
-import constants as param
+import dpe_config
 import ima as ima
 import tile_modules as tmod
+import node_modules as nmod
 
 # IMA specific modules (should not be needed)
 import ima_modules
@@ -19,7 +19,14 @@ class tile (object):
     instances_created = 0
 
     ### Instantiate different modules in a tile
-    def __init__ (self):
+    # active_set - only imas with a pending event are simulated in a cycle (others catch up when woken)
+    # config - dpe_config (default - the config & constants modules)
+    def __init__ (self, active_set = 0, config = None):
+
+        # Configuration (cfg - config.py values, param - constants.py values)
+        self.config = dpe_config.get_config (config)
+        self.cfg = self.config.cfg
+        self.param = self.config.param
 
         # Assign a tile_id for identification purpose in debug trace
         self.tile_id = tile.instances_created
@@ -28,23 +35,29 @@ class tile (object):
         ## Objects which correspond to a hardware component (at least NOW!)
         # ima_list
         self.ima_list = []
-        for i in range (cfg.num_ima):
-            temp_ima = ima.ima ()
+        for i in range (self.cfg.num_ima):
+            temp_ima = ima.ima (self.config)
             self.ima_list.append(temp_ima)
         # EDRAM controller (icnludes edram)
-        self.edram_controller = tmod.edram_controller ()
+        self.edram_controller = tmod.edram_controller (self.config)
         # intruction memory
-        self.instrn_memory = tmod.instrn_memory (cfg.tile_instrnMem_size)
+        self.instrn_memory = tmod.instrn_memory (self.cfg.tile_instrnMem_size, config = self.config)
         # receive buffer
-        self.receive_buffer = tmod.receive_buffer (cfg.receive_buffer_depth)
+        self.receive_buffer = tmod.receive_buffer (self.cfg.receive_buffer_depth, self.config)
         # program counter
         self.pc = 0
         # fetched instruction
-        self.instrn = param.dummy_instrn_tile
+        self.instrn = self.param.dummy_instrn_tile
 
         ## Book-keeping variables (may not have a harwdare relevance)
         # send_queue - part of NOC that connects the tiles
-        self.send_queue = Queue.Queue()
+        self.send_queue = collections.deque ()
+        # noc notified when the send_queue becomes non-empty (delivery heap, see node_modules.noc) - None if not
+        # attached, noc_port - index of the tile in the node
+        self.noc = None
+        self.noc_port = 0
+        # peak number of packets in the send_queue (noc statistics)
+        self.send_queue_peak = 0
         # track instruction being executed hasn't completed yet or not
         self.stall = 0
         # latch tag_hit and data (prevents unnecessary repeated buff accesses)
@@ -70,6 +83,20 @@ class tile (object):
         # used to calculate leakage energy (power-gated tiles - before they start and after they halt)
         self.cycle_count = 0
 
+        # Active-set scheduling - next cycle each ima needs to be simulated in, last cycle simulated by tile
+        self.active_set = active_set
+        self.ima_wake_list = []
+        self.last_cycle = -1
+
+        # Tile deduplication (see tile_dedup) - representative: record of its units, follower: its representative
+        # & [node_functional, tile id] executing its imas
+        self.dedup_record = None
+        self.dedup_rep = None
+        self.dedup_func = None
+        self.dedup_index = 0
+        self.dedup_wait = 0
+        self.dedup_lag = 0
+
 
     ### Initialize the tile (all IMAs in the tile)
     def tile_init (self, instrnpath, tracepath):
@@ -79,9 +106,9 @@ class tile (object):
         self.instrn_memory.load (dict_list)
 
         # Initialize the IMAs and their trace file ids
-        for i in range (cfg.num_ima):
+        for i in range (self.cfg.num_ima):
             # tracefile is where stats are dumped
-            tracefile = tracepath + 'ima_trace' + str(i) + '.txt'
+            tracefile = tracepath + 'ima_trace' + str(i) + '.txt' if (tracepath != None) else os.devnull
             fid_temp = open (tracefile, 'w')
             self.fid_list.append (fid_temp)
             # instrn_file provides the instrn_list that the IMA will execute
@@ -89,7 +116,7 @@ class tile (object):
             self.ima_list[i].pipe_init (instrnfile, self.fid_list[i])
 
         # Initialize the EDRAM - invalidate all entries (valid_list)
-        self.edram_controller.valid = [0] * (cfg.edram_size*1024/(cfg.data_width/8))
+        self.edram_controller.valid = [0] * (self.cfg.edram_size*1024/(self.cfg.data_width/8))
 
         # Intiialize the receive buffer - invalidate
         self.receive_buffer.inv ()
@@ -99,30 +126,47 @@ class tile (object):
         # Intialize tile
         self.tile_halt = 0
         # Initiaize the halt list & stall flag for tile
-        self.halt_list = [0] * cfg.num_ima
-        self.ima_nma_list = [1] * cfg.num_ima
+        self.halt_list = [0] * self.cfg.num_ima
+        self.ima_nma_list = [1] * self.cfg.num_ima
         self.stall = 0
         self.cycle_count = 0
+        self.ima_wake_list = [0] * self.cfg.num_ima
+        self.last_cycle = -1
 
 
     ### Simulate one cycle exectution of all IMAs (which have't halted) & their EDRAM interactions
     def tile_compute (self, cycle):
+        ## Tile deduplication - a follower's imas are executed functionally (their ld/st don't use the controller)
+        if (self.dedup_func != None):
+            [functional, tile_id] = self.dedup_func
+            for i in range (self.cfg.num_ima):
+                if ((not self.halt_list[i]) and self.ima_nma_list[i]):
+                    functional.ima_run (tile_id, i)
+            return
+
         ## Simulate a cycle if IMA(s) that haven't halted
         if (not all(self.halt_list)): # A tile halts whwn all IMAs (within the tile) halt
-            for i in range (cfg.num_ima):
+            for i in range (self.cfg.num_ima):
                 if ((not self.halt_list[i]) and self.ima_nma_list[i]):
+                    # In active-set mode a sleeping ima is only counting down - catch up when woken
+                    if (self.active_set):
+                        if (self.ima_wake_list[i] > cycle):
+                            continue
+                        self.ima_list[i].pipe_skip (cycle - 1 - self.ima_list[i].last_cycle)
                     self.ima_list[i].pipe_run (cycle, self.fid_list[i])
                     self.halt_list[i] = self.ima_list[i].halt # update halt
+                    if (self.active_set):
+                        self.ima_wake_list[i] = self.ima_list[i].pipe_next_event (cycle)
 
         ## Simulate a cycle of memory operation
         # Probe IMA mem_interface to find one/many pending memory requests
-        ren_list = [0] * cfg.num_ima
+        ren_list = [0] * self.cfg.num_ima
         wen_list = ren_list[:]
         rd_width_list = ren_list[:]
         wr_width_list = ren_list[:]
-        ramstore_list = [''] * cfg.num_ima
+        ramstore_list = [''] * self.cfg.num_ima
         addr_list = ren_list[:]
-        for i in range (cfg.num_ima):
+        for i in range (self.cfg.num_ima):
             ren_list[i] = self.ima_list[i].mem_interface.ren
             wen_list[i] = self.ima_list[i].mem_interface.wen
             rd_width_list[i] = self.ima_list[i].mem_interface.rd_width
@@ -148,6 +192,8 @@ class tile (object):
                     self.ima_list[idx].mem_interface.ren = 0
                     self.ima_list[idx].mem_interface.wen = 0
                     self.ima_list[idx].mem_interface.ramload = ramload
+                    if (self.active_set):
+                        self.ima_wake_list[idx] = cycle + 1 # wake up the served ima
 
             #### This case NEEDS FIXING!!
             # check if access latency is 1 cycle - need to complete execute in this cycle
@@ -165,6 +211,8 @@ class tile (object):
                     self.ima_list[idx].mem_interface.ren = 0
                     self.ima_list[idx].mem_interface.wen = 0
                     self.ima_list[idx].mem_interface.ramload = ramload
+                    if (self.active_set):
+                        self.ima_wake_list[idx] = cycle + 1 # wake up the served ima
 
                     # do a cycle (finish in case of ST) of execute pipeline stage of the served ima
                     # Note - update_ready fo execute stage is always 1 (Current Deisgn)
@@ -191,6 +239,8 @@ class tile (object):
                     self.ima_list[idx].mem_interface.ren = 0
                     self.ima_list[idx].mem_interface.wen = 0
                     self.ima_list[idx].mem_interface.ramload = ramload
+                    if (self.active_set):
+                        self.ima_wake_list[idx] = cycle + 1 # wake up the served ima
 
             # Finish the access and free up controller from previous access
             elif (self.stage_cycle == self.latency -1):
@@ -203,11 +253,52 @@ class tile (object):
                 self.stage_cycle = self.stage_cycle + 1
 
 
+    ### Send (the current vector of the send instruction) - edram data goes to the send_queue
+    def do_send (self, cycle):
+        send_width = self.instrn['r1']
+        mem_addr = self.instrn['mem_addr'] + self.vec_count*send_width
+        # add the entry to send list (send_list is physically part of NOC and not tile)
+        vtile_id = self.instrn['vtile_id']
+        target_addr = self.instrn['r2'] # (node_id+tile_id)
+        #data = [''] * send_width
+        #for i in range (send_width):
+        #    temp_data = self.edram_controller.mem.read(mem_addr+i)
+        #    data[i] = temp_data
+        data = self.edram_controller.mem.read(mem_addr, send_width)
+        temp_packet = nmod.packet (data, target_addr, cycle, vtile_id)
+        if (self.noc != None and not self.send_queue):
+            self.noc.schedule (self.noc_port, temp_packet, cycle)
+        self.send_queue.append (temp_packet)
+        if (len(self.send_queue) > self.send_queue_peak):
+            self.send_queue_peak = len(self.send_queue)
+        # update the counter and valid flag (if req.) for edram
+        # should add some sort of edram_propagate (this adds to energy as well) ???
+        for i in range (send_width):
+            self.edram_controller.counter[mem_addr+i] -= 1
+            if (self.edram_controller.counter[mem_addr+i] <= 0):
+                self.edram_controller.valid[mem_addr+i] = 0
+
+    ### Receive (the current vector of the receive instruction) - received data goes to edram
+    def do_receive (self):
+        receive_width = self.instrn['r1']
+        mem_addr = self.instrn['mem_addr'] + self.vec_count * receive_width
+        # write data to edram and set valid &counter entries
+        if (self.instrn['vtile_id'] < 0): #adding support for zero receive
+            self.received_data = [self.cfg.num_bits * '0'] * receive_width
+        temp_counter = self.instrn['r2']
+        self.edram_controller.mem.write (mem_addr, self.received_data, receive_width)
+        for i in range (receive_width):
+            #self.edram_controller.mem.write (mem_addr+i, self.received_data[i])
+            # should add some sort of edram_propagate (this adds to energy as well) ???
+            self.edram_controller.valid[mem_addr+i] = 1
+            self.edram_controller.counter[mem_addr+i] = temp_counter
+
     ### tile_run - simulate a cycle of execution of the tile
     # data addition to receive buffer happens by the higher level hierarchy
     # ?? - All memory access parts will be modified (based on changes in edram_controller)
     def tile_run (self, cycle, fid):
         self.cycle_count += 1
+        self.last_cycle = cycle
         ## execute the current instruction in tile's instruction memory
         # Fetch a new instrn only after the previous instrn completes
         if (not self.stall and not self.tile_halt):
@@ -216,13 +307,13 @@ class tile (object):
 
         # Check if the current fetched instrn can  be completed
         # For DEBUG only
-        assert (self.instrn['opcode'] in param.op_list_tile), 'Tile: unsupported opcode'
+        assert (self.instrn['opcode'] in self.param.op_list_tile), 'Tile: unsupported opcode'
         if (self.instrn['opcode'] == 'send'):
             # check if the mem_addr is valid
             send_width = self.instrn['r1']
             mem_addr = self.instrn['mem_addr'] + self.vec_count*send_width
-            assert (send_width <= cfg.receive_buffer_width), 'Send width must be sm/eq to rec_buff_width'
-            if (all (self.edram_controller.valid[mem_addr:mem_addr+send_width])): #check if all data (to be sent) is valid
+            assert (send_width <= self.cfg.receive_buffer_width), 'Send width must be sm/eq to rec_buff_width'
+            if (self.dedup_ready (cycle, all (self.edram_controller.valid[mem_addr:mem_addr+send_width]))): #check if all data (to be sent) is valid
                 # first but not last cycle of edram access
                 if (self.stage_cycle_sr == 0 and self.edram_controller.getLatency() != 1):
                     # modify this based on edram bandwidth and send width ???
@@ -233,22 +324,8 @@ class tile (object):
                 elif (self.stage_cycle_sr == self.latency_sr - 1 or self.edram_controller.getLatency() == 1):
                     # reset the stage_cycle
                     self.stage_cycle_sr = 0
-                    # add the entry to send list (send_list is physically part of NOC and not tile)
-                    vtile_id = self.instrn['vtile_id']
-                    target_addr = self.instrn['r2'] # (node_id+tile_id)
-                    #data = [''] * send_width
-                    #for i in range (send_width):
-                    #    temp_data = self.edram_controller.mem.read(mem_addr+i)
-                    #    data[i] = temp_data
-                    data = self.edram_controller.mem.read(mem_addr, send_width)
-                    temp_dict = {'data':data[:], 'target_addr':target_addr, 'cycle':cycle, 'vtile_id':vtile_id}
-                    self.send_queue.put (temp_dict)
-                    # update the counter and valid flag (if req.) for edram
-                    # should add some sort of edram_propagate (this adds to energy as well) ???
-                    for i in range (send_width):
-                        self.edram_controller.counter[mem_addr+i] -= 1
-                        if (self.edram_controller.counter[mem_addr+i] <= 0):
-                            self.edram_controller.valid[mem_addr+i] = 0
+                    self.do_send (cycle)
+                    self.dedup_next (cycle)
                     # send vector instruction completes
                     if (self.vec_count == self.instrn['vec']-1):
                         self.vec_count = 0
@@ -287,7 +364,7 @@ class tile (object):
                     empty = 0
                     break
             #if (self.tag_matched and (not all(self.edram_controller.valid[mem_addr:mem_addr+receive_width]))):
-            if (self.tag_matched and empty):
+            if (self.tag_matched and self.dedup_ready (cycle, empty)):
                 assert (self.instrn['vtile_id'] >= 0 and receive_width == len(self.received_data)), 'receive_width & send widths mismatch'
                 # first but not last cycle of edram access
                 if (self.stage_cycle_sr == 0 and self.edram_controller.getLatency() != 1):
@@ -298,16 +375,8 @@ class tile (object):
                 elif (self.stage_cycle_sr == self.latency_sr - 1 or self.edram_controller.getLatency() == 1):
                     # reset the stage_cycle
                     self.stage_cycle_sr = 0
-                    # write data to edram and set valid &counter entries
-                    if (self.instrn['vtile_id'] < 0): #adding support for zero receive
-                        self.received_data = [cfg.num_bits * '0'] * receive_width
-                    temp_counter = self.instrn['r2']
-                    self.edram_controller.mem.write (mem_addr, self.received_data, receive_width)
-                    for i in range (receive_width):
-                        #self.edram_controller.mem.write (mem_addr+i, self.received_data[i])
-                        # should add some sort of edram_propagate (this adds to energy as well) ???
-                        self.edram_controller.valid[mem_addr+i] = 1
-                        self.edram_controller.counter[mem_addr+i] = temp_counter
+                    self.do_receive ()
+                    self.dedup_next (cycle)
                     # set other book-keeping flags
                     if (self.vec_count == self.instrn['vec']-1):
                         self.vec_count = 0
@@ -338,8 +407,9 @@ class tile (object):
                     self.halt_list[k] = 1
 
             # check if all imas halted and send_queue is empty
-            if (all(self.halt_list) and self.send_queue.empty()):
+            if (self.dedup_ready (cycle, all(self.halt_list)) and not self.send_queue):
                 self.tile_halt = 1
+                self.dedup_next (cycle)
 
                 # Close all ima the trace files
                 for tr_fid in self.fid_list:
@@ -347,7 +417,7 @@ class tile (object):
                     self.stall = 0 # Doesn't matter as this was the last cycle
 
                 # Update the tile trace
-                if (cfg.debug):
+                if (self.cfg.debug):
                     fid.write ('Tile ran for ' + str(cycle) + ' cycles')
             else:
                 # prevent new instructions to befetched
@@ -357,8 +427,177 @@ class tile (object):
         self.tile_compute (cycle)
 
         ## for DEBUG only
-        if (cfg.debug and (not self.tile_halt)):
+        if (self.cfg.debug and (not self.tile_halt)):
             fid.write ('cycle: ' + str(cycle) + '   |   instrn: ' + self.instrn['opcode'] + '   |   \
 addr: ' + str(self.instrn['mem_addr']) + '   |   vtileId: ' + str(self.instrn['vtile_id']) + '   |   ima_halt_list: ')
             json.dump (self.halt_list, fid)
             fid.write ('\n')
+
+    ### Tile deduplication (see tile_dedup) - ready is the edram/ima condition of the current unit (a vector element
+    # of a send/receive or the halt): recorded by a representative, replayed (shifted by the lag) by a follower - its
+    # functionally executed imas meet it no later than the representative's
+    def dedup_ready (self, cycle, ready):
+        if (self.dedup_rep != None):
+            record = self.dedup_rep.dedup_record
+            if (self.dedup_index >= len(record)): # representative hasn't got this far
+                return 0
+            [rep_cycle, rep_wait] = record[self.dedup_index][0:2]
+            return ready and ((not rep_wait) or (cycle >= rep_cycle + self.dedup_lag))
+        if (self.dedup_record != None):
+            if (not ready):
+                self.dedup_wait = 1
+            elif (len(self.dedup_record) == self.dedup_index):
+                self.dedup_record.append ([cycle, self.dedup_wait])
+        return ready
+
+    # The current unit completed - a follower's lag follows its receives (arrival times)
+    def dedup_next (self, cycle):
+        if (self.dedup_rep != None):
+            if (self.instrn['opcode'] == 'receive'):
+                self.dedup_lag = cycle - self.dedup_rep.dedup_record[self.dedup_index][2]
+        elif (self.dedup_record != None):
+            self.dedup_record[self.dedup_index].append (cycle)
+            self.dedup_wait = 0
+        self.dedup_index += 1
+
+    ### Event-driven (fast-forward) support
+    # Check if the current send (receive) can access edram - all entries valid (tag matched and all entries invalid)
+    def sr_ready (self):
+        width = self.instrn['r1']
+        mem_addr = self.instrn['mem_addr'] + self.vec_count*width
+        if (self.instrn['opcode'] == 'send'):
+            return all (self.edram_controller.valid[mem_addr:mem_addr+width])
+        return (self.tag_matched and (not any (self.edram_controller.valid[mem_addr:mem_addr+width])))
+
+    # Returns the next cycle (after cycle) in which the tile (or any of its imas) does more than count-down
+    # Stalls on edram valid flags/receive buffer are re-checked after every simulated cycle, so a tile
+    # blocked on another tile (or ima) wakes up in the cycle after the event it waits on
+    def tile_next_event (self, cycle):
+        idle_cycles = float('inf')
+
+        ## Tile instruction - a new instruction is fetched if not stalled
+        if (not self.stall):
+            return cycle + 1
+        opcode = self.instrn['opcode']
+        if (opcode == 'receive' and self.tag_matched == 0):
+            # receive buffer is probed till tag matches (no state change on a miss)
+            vtile_id = self.instrn['vtile_id']
+            if (self.stage_cycle_sr != 0 or vtile_id < 0 or (not self.receive_buffer.isempty (vtile_id))):
+                return cycle + 1
+        elif (opcode in ['send', 'receive']):
+            if (self.sr_ready ()):
+                # first and last cycle of edram access
+                if (self.stage_cycle_sr == 0 or self.edram_controller.getLatency() == 1 or \
+                        self.stage_cycle_sr >= self.latency_sr-1):
+                    return cycle + 1
+                idle_cycles = self.latency_sr-1 - self.stage_cycle_sr
+        elif (opcode == 'halt'):
+            if (all(self.halt_list) and not self.send_queue):
+                return cycle + 1
+        else:
+            return cycle + 1
+
+        ## EDRAM controller - a free controller serves pending requests, a busy one counts down
+        if (self.memstate == 'free'):
+            for i in range (self.cfg.num_ima):
+                if (self.ima_list[i].mem_interface.ren or self.ima_list[i].mem_interface.wen):
+                    return cycle + 1
+        elif (self.stage_cycle >= self.latency - 2):
+            return cycle + 1
+        else:
+            idle_cycles = min (idle_cycles, self.latency - 2 - self.stage_cycle)
+
+        ## IMAs that haven't halted (in active-set mode sleeping imas have their wake-up cycle recorded)
+        next_cycle = cycle + 1 + idle_cycles
+        for i in range (self.cfg.num_ima):
+            if ((not self.halt_list[i]) and self.ima_nma_list[i]):
+                if (self.active_set):
+                    next_cycle = min (next_cycle, self.ima_wake_list[i])
+                else:
+                    next_cycle = min (next_cycle, self.ima_list[i].pipe_next_event (cycle))
+        return next_cycle
+
+    # Mimics num_cycles idle cycles of tile execution (see tile_next_event)
+    # In active-set mode imas catch up on their own (when woken or by tile_sync)
+    def tile_skip (self, num_cycles):
+        self.cycle_count += num_cycles
+        self.last_cycle += num_cycles
+        if (self.instrn['opcode'] in ['send', 'receive'] and self.stage_cycle_sr != 0 and self.sr_ready ()):
+            self.stage_cycle_sr += num_cycles
+        if (self.memstate == 'busy'):
+            self.stage_cycle = self.stage_cycle + num_cycles
+        if (not self.active_set):
+            for i in range (self.cfg.num_ima):
+                if ((not self.halt_list[i]) and self.ima_nma_list[i]):
+                    self.ima_list[i].pipe_skip (num_cycles)
+
+    # Active-set mode: bring the tile and its sleeping imas up to date till cycle (inclusive)
+    def tile_sync (self, cycle):
+        self.tile_skip (cycle - self.last_cycle)
+        for i in range (self.cfg.num_ima):
+            if ((not self.halt_list[i]) and self.ima_nma_list[i]):
+                self.ima_list[i].pipe_skip (cycle - self.ima_list[i].last_cycle)
+
+    ### Deadlock detection
+    # Progress count - instruction fetches (tile & imas), receive buffer accesses and edram accesses served
+    # (none of these change while tiles/imas are blocked - polling doesn't count)
+    def tile_progress (self):
+        count = self.instrn_memory.num_access + self.receive_buffer.num_access + \
+                self.edram_controller.num_access_counter
+        for i in range (self.cfg.num_ima):
+            count += self.ima_list[i].instrnMem.num_access
+        return count
+
+    # An ima pipeline counts down a latency (e.g. a long mvm) - progress without instruction fetches
+    # (cycle - the next cycle to simulate; in active-set mode imas have their next event recorded)
+    def tile_busy (self, cycle):
+        for i in range (self.cfg.num_ima):
+            if ((not self.halt_list[i]) and self.ima_nma_list[i]):
+                if (self.active_set):
+                    next_cycle = self.ima_wake_list[i]
+                else:
+                    next_cycle = self.ima_list[i].pipe_next_event (cycle-1)
+                if (cycle < next_cycle < float('inf')):
+                    return 1
+        return 0
+
+    # Describes what the tile (current instruction) and its imas are blocked on
+    def tile_diagnose (self):
+        diag_list = []
+        opcode = self.instrn['opcode']
+        if (opcode in ['send', 'receive']):
+            width = self.instrn['r1']
+            mem_addr = self.instrn['mem_addr'] + self.vec_count * width
+            valid_list = self.edram_controller.valid[mem_addr:mem_addr+width]
+            temp_str = opcode + ' (pc ' + str(self.pc-1) + ', vec ' + str(self.vec_count) + ')'
+            if (opcode == 'send' and not all (valid_list)):
+                temp_str += ' waiting for valid edram data at [' + str(mem_addr) + ', ' + str(mem_addr+width) + ')'
+            elif (opcode == 'receive' and self.tag_matched == 0 and self.instrn['vtile_id'] >= 0):
+                temp_str += ' waiting for vtile_id ' + str(self.instrn['vtile_id']) + ' in receive buffer'
+            elif (opcode == 'receive' and any (valid_list)):
+                temp_str += ' waiting for edram entries at [' + str(mem_addr) + ', ' + str(mem_addr+width) + \
+                        ') to be consumed'
+            diag_list.append (temp_str)
+        elif (opcode == 'halt'):
+            temp_str = 'halt waiting for'
+            ima_wait = [i for i in range (self.cfg.num_ima) if (not self.halt_list[i])]
+            if (ima_wait):
+                temp_str += ' imas ' + str(ima_wait)
+            if (self.send_queue):
+                temp_str += ' send_queue (' + str(len(self.send_queue)) + ' packets)'
+            diag_list.append (temp_str)
+        for i in range (self.cfg.num_ima):
+            temp_ima = self.ima_list[i]
+            if (self.halt_list[i] or not self.ima_nma_list[i] or temp_ima.stage_empty[2]):
+                continue
+            temp_str = 'ima ' + str(i) + ': ' + str(temp_ima.de_opcode) + ' in execute (next pc ' + str(temp_ima.pc) + ')'
+            mem_interface = temp_ima.mem_interface
+            if (temp_ima.de_opcode in ['ld', 'st'] and mem_interface.wait):
+                if (mem_interface.ren):
+                    temp_str += ' waiting for valid edram data at addr ' + str(mem_interface.addr)
+                else:
+                    temp_str += ' waiting for edram addr ' + str(mem_interface.addr) + ' to be consumed'
+                temp_str += ' (valid ' + str(self.edram_controller.valid[mem_interface.addr]) + \
+                        ', counter ' + str(self.edram_controller.counter[mem_interface.addr]) + ')'
+            diag_list.append (temp_str)
+        return diag_list
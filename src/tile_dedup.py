@@ -0,0 +1,120 @@
+# Tile deduplication (approximate) - tiles with structurally identical programs are timed by one representative
+# Compiled nets replicate tiles (e.g. conv tiles) whose tile_imem/core_imem streams differ only in addresses. Tiles
+# are grouped by a fingerprint of their programs with the address fields left out. Per class:
+# 1. the representative (lowest tile id) is simulated in detail and records, for every unit of its tile program (a
+#    vector element of a send/receive or the halt), the cycle its edram/ima condition was met (data to send valid,
+#    edram entries to receive into consumed, all imas halted), if it had to wait for it and the cycle it completed
+# 2. followers don't simulate their imas in detail - the imas are executed functionally on the follower's own
+#    weights & received data (node_functional.ima_run, mvm with inner_product_fast) in every cycle, till they block
+#    on the edram valid/counter protocol. Followers run their own send/receive/halt instructions against the noc (real
+#    arrival times, real values) and replay the recorded conditions, shifted by their lag: cycles their last receive
+#    completed after the representative's. A follower doesn't run ahead of its representative.
+# 3. at the end the followers' ima and edram controller access counts are taken from the representative
+# Timing results (cycles, stats) are approximate, outputs are computed as in a detailed run. Nets in which a
+# representative waits (through sends or other followers' records) for one of its followers are refused - the
+# follower would wait for the representative's record forever
+# Input and output tiles (first & last) are always simulated
+
+import hashlib
+import numpy as np
+
+import node_functional
+
+
+# Instruction fields holding addresses - tile: edram address, virtual tile id, target tile (send)
+# core: register/memory addresses, set values (edram addresses of ld/st)
+tile_addr_field_list = ['mem_addr', 'vtile_id']
+core_addr_field_list = ['d1', 'r1', 'r2']
+
+def strip_instrn (instrn, addr_field_list):
+    temp_instrn = dict (instrn)
+    for field in addr_field_list:
+        temp_instrn.pop (field, None)
+    return sorted (temp_instrn.items ())
+
+### Fingerprint of a tile's programs (tile_imem & core_imem) without the address fields
+def tile_fingerprint (instrnpath, num_ima):
+    h = hashlib.sha1 ()
+    for instrn in np.load (instrnpath + 'tile_imem.npy'):
+        field_list = tile_addr_field_list + (['r2'] if (instrn['opcode'] == 'send') else [])
+        h.update (repr (strip_instrn (instrn, field_list)))
+    for i in range (num_ima):
+        h.update ('core' + str(i))
+        for instrn in np.load (instrnpath + 'core_imem' + str(i) + '.npy'):
+            field_list = core_addr_field_list + (['imm'] if (instrn['opcode'] == 'set') else [])
+            h.update (repr (strip_instrn (instrn, field_list)))
+    return h.hexdigest ()
+
+### Tiles a tile's program sends to
+def send_target_set (instrnpath):
+    return set ([instrn['r2'] for instrn in np.load (instrnpath + 'tile_imem.npy') if (instrn['opcode'] == 'send')])
+
+### Tiles a tile waits for (tile id -> set of tile ids) - the tiles sending to it and, for a follower, its
+# representative (rep_dict - follower -> representative)
+def get_wait_dict (node_dut, instrnpath, rep_dict):
+    wait_dict = dict ((i, set ()) for i in range (node_dut.cfg.num_tile))
+    for i in range (node_dut.cfg.num_tile-1):
+        for target_addr in send_target_set (instrnpath + 'tile' + str(i) + '/'):
+            wait_dict[node_dut.noc.propagate (target_addr, i)].add (i)
+    for i in rep_dict:
+        wait_dict[i].add (rep_dict[i])
+    return wait_dict
+
+# Checks if tile src_id waits (directly or through other tiles) for tile dst_id
+def check_wait (wait_dict, src_id, dst_id):
+    visited = set ([src_id])
+    stack = [src_id]
+    while (stack):
+        for i in wait_dict[stack.pop ()]:
+            if (i == dst_id):
+                return 1
+            if (i not in visited):
+                visited.add (i)
+                stack.append (i)
+    return 0
+
+### Group the tiles of a (new) node and set up the representatives and followers
+# Returns the classes with more than one tile (tile id lists, representative first)
+def dedup_init (node_dut, instrnpath):
+    class_dict = {}
+    for i in range (1, node_dut.cfg.num_tile-1):
+        fingerprint = tile_fingerprint (instrnpath + 'tile' + str(i) + '/', node_dut.cfg.num_ima)
+        class_dict.setdefault (fingerprint, []).append (i)
+
+    dedup_list = sorted ([tile_id_list for tile_id_list in class_dict.values () if (len(tile_id_list) > 1)])
+    rep_dict = {}
+    for tile_id_list in dedup_list:
+        for i in tile_id_list[1:]:
+            rep_dict[i] = tile_id_list[0]
+    wait_dict = get_wait_dict (node_dut, instrnpath, rep_dict)
+    for i in sorted (rep_dict):
+        assert (not check_wait (wait_dict, rep_dict[i], i)), 'Dedup Error: tile ' + str(rep_dict[i]) + \
+                ' (representative) waits for data from its follower tile ' + str(i)
+
+    functional = node_functional.node_functional (node_dut)
+    for tile_id_list in dedup_list:
+        rep_tile = node_dut.tile_list[tile_id_list[0]]
+        rep_tile.dedup_record = []
+        for i in tile_id_list[1:]:
+            temp_tile = node_dut.tile_list[i]
+            temp_tile.dedup_rep = rep_tile
+            # imas are executed functionally (no pipeline, sampling, loop fast-forward or transaction-level timing)
+            temp_tile.dedup_func = [functional, i]
+            for temp_ima in temp_tile.ima_list:
+                temp_ima.mvm_fast = 1
+                temp_ima.sample = None
+                temp_ima.loop = None
+                temp_ima.tlm = None
+    node_dut.dedup_list = dedup_list
+    return dedup_list
+
+### Followers take the ima and edram controller access counts of their representative (for hw_stats)
+def dedup_finish (node_dut):
+    for tile_id_list in node_dut.dedup_list:
+        rep_tile = node_dut.tile_list[tile_id_list[0]]
+        for i in tile_id_list[1:]:
+            temp_tile = node_dut.tile_list[i]
+            temp_tile.ima_list = rep_tile.ima_list
+            temp_tile.edram_controller.num_access = rep_tile.edram_controller.num_access
+            temp_tile.edram_controller.num_access_counter = rep_tile.edram_controller.num_access_counter
+            temp_tile.edram_controller.mem.num_access = rep_tile.edram_controller.mem.num_access
@@ -2,15 +2,15 @@
 import sys
 
 # import dependency files
-import config as cfg
-import constants as param
+import dpe_config
 import ima_metrics
 
 # Compute metrics of the tile based on paramaters in config file and dicts file constants file
 # Area is computed as the summation of all component area (doesn't consider physical layout)
-def compute_area (): #in mm2
+def compute_area (config = None): #in mm2
+    [cfg, param] = dpe_config.get_values (config)
     area = 0.0
-    area += cfg.num_ima * ima_metrics.compute_area ()
+    area += cfg.num_ima * ima_metrics.compute_area (config)
     area += param.counter_buff_area
     area += param.edram_bus_area
     area += param.edram_ctrl_area
@@ -27,9 +27,10 @@ def compute_area (): #in mm2
     return area
 
 # Leakage power is computed as sum of leakage powers of all components
-def compute_pow_leak ():
+def compute_pow_leak (config = None):
+    [cfg, param] = dpe_config.get_values (config)
     leak_pow = 0.0
-    leak_pow += cfg.num_ima * ima_metrics.compute_pow_leak ()
+    leak_pow += cfg.num_ima * ima_metrics.compute_pow_leak (config)
     leak_pow += param.counter_buff_pow_leak
     leak_pow += param.edram_bus_pow_leak
     leak_pow += param.edram_ctrl_pow_leak
@@ -40,7 +41,8 @@ def compute_pow_leak ():
     return leak_pow
 
 # useful in computing tile leakage for ima-power-gating
-def compute_pow_leak_non_ima ():
+def compute_pow_leak_non_ima (config = None):
+    [cfg, param] = dpe_config.get_values (config)
     leak_pow = 0.0
     leak_pow += param.counter_buff_pow_leak
     leak_pow += param.edram_bus_pow_leak
@@ -52,9 +54,10 @@ def compute_pow_leak_non_ima ():
     return leak_pow
 
 # Peak dynakic power (assumes all components are being accessed in each cycle)
-def compute_pow_dyn ():
+def compute_pow_dyn (config = None):
+    [cfg, param] = dpe_config.get_values (config)
     dyn_pow = 0.0
-    dyn_pow += cfg.num_ima * ima_metrics.compute_pow_dyn ()
+    dyn_pow += cfg.num_ima * ima_metrics.compute_pow_dyn (config)
     dyn_pow += param.counter_buff_pow_dyn
     dyn_pow += param.edram_bus_pow_dyn
     dyn_pow += param.edram_ctrl_pow_dyn
@@ -65,8 +68,8 @@ def compute_pow_dyn ():
     return dyn_pow
 
 # Peak power of tile - leak_pow + peak dyn_pow
-def compute_pow_peak ():
-    peak_pow = compute_pow_leak() + compute_pow_dyn() # 6 IMA
+def compute_pow_peak (config = None):
+    peak_pow = compute_pow_leak (config) + compute_pow_dyn (config) # 6 IMA
     #print ('Tile peak (leak+dyn) power: ' + str (peak_pow) + ' mW')
 
     ## Compare with ISSAC for iso-xbars (computational effciiency - ops/mm2)
@@ -2,8 +2,7 @@
 # IMA, EDRAM, EDRAM controller
 
 import sys
-import config as cfg
-import constants as param
+import dpe_config
 import ima_modules
 from ima_modules import int2bin
 
@@ -20,13 +19,16 @@ class instrn_memory (ima_modules.instrn_memory):
         self.num_access += 1
         assert (type(addr) == int), 'addr type should be int'
         assert (self.addr_start <= addr <= self.addr_end), 'addr exceeds the memory bounds'
-        assert ((dict_match(data, param.dummy_instrn_tile) == 1) and \
+        assert ((dict_match(data, self.param.dummy_instrn_tile) == 1) and \
                 (len(data) == constants.data_width)), 'data should be a dict if tile_instrn_dummy type'
         self.memfile[addr - self.addr_start] = data
 
 # adding a receive buffer (full-assoc cache (tag = neuron_id)) to enable non-blocking receives
 class receive_buffer (object):
-    def __init__ (self, buff_size):
+    def __init__ (self, buff_size, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
 
@@ -35,7 +37,7 @@ class receive_buffer (object):
         self.latency = 0
 
         # Consists of a list of dictionaries (data, neuron_id)
-        temp_rb_list = [''] * cfg.receive_buffer_width
+        temp_rb_list = [''] * self.cfg.receive_buffer_width
         temp_dict = {'data': temp_rb_list[:], 'valid': 0}
         self.buffer = []
         for i in range (buff_size):
@@ -61,11 +63,11 @@ class receive_buffer (object):
 
     # write the data coming from router to buffer if non-full
     def write (self, vtile_id, list_entry):
-        assert (vtile_id <= cfg.receive_buffer_depth), 'vtile_id must be less than #receive buffer depth'
+        assert (vtile_id <= self.cfg.receive_buffer_depth), 'vtile_id must be less than #receive buffer depth'
         assert (type(list_entry) == list), 'data written to receive buffer should be a list of neuron values'
         if (self.isempty(vtile_id)): # check if receive buffer is empty
             self.num_access += 1
-            self.buffer[vtile_id]['data'] = list_entry[:]
+            self.buffer[vtile_id]['data'] = list_entry # shared with the packet (never written in place)
             self.buffer[vtile_id]['valid'] = 1
             return 1
         return 0
@@ -75,14 +77,14 @@ class receive_buffer (object):
         if (not self.isempty(vtile_id)):
             self.num_access += 1
             self.buffer[vtile_id]['valid'] = 0
-            return [1, self.buffer[vtile_id]['data'][:]]
+            return [1, self.buffer[vtile_id]['data']]
         return [0, 0] # tag-hit, data
 
 # a memory instance for edram - edram reads and writes multiple neuron values (based on memory bandwidth)
 class edram (ima_modules.memory):
 
     def getLatency (self):
-        return param.edram_lat
+        return self.param.edram_lat
 
     # redefine read - for multiple reads
     def read (self, addr, width = 1): # read edram_buswidth/data_width of continuous reads from edram
@@ -90,7 +92,7 @@ class edram (ima_modules.memory):
         assert (type(addr) == int), 'addr type should be int'
         assert (self.addr_start <= addr <= self.addr_end), 'addr exceeds the memory bounds'
         # returns  a list of entries (list has one entry - Typical case)
-        assert (width < cfg.edram_buswidth/cfg.data_width+1), \
+        assert (width < self.cfg.edram_buswidth/self.cfg.data_width+1), \
                 'read edram width exceeds'
         return self.memfile[(addr - self.addr_start) : \
                 (addr - self.addr_start + width)][:]
@@ -104,7 +106,7 @@ class edram (ima_modules.memory):
         #assert ((type(data) ==  str) and (len(data) == cfg.edram_buswidth)), \
         #        'data should be a string with edram_datawidth bits'
         assert (type(data) == list), 'edram write data should be a list'
-        assert (width < cfg.edram_buswidth/cfg.data_width+1), \
+        assert (width < self.cfg.edram_buswidth/self.cfg.data_width+1), \
                 'write data width exceeds'
         # writes to more than one entires (1 entry - typical case)
         for i in range (width):
@@ -113,18 +115,21 @@ class edram (ima_modules.memory):
 
 # edram controller includes edram too
 class edram_controller (object):
-    def __init__ (self):
+    def __init__ (self, config = None):
+        config = dpe_config.get_config (config)
+        self.cfg = config.cfg
+        self.param = config.param
         # define num_access
         self.num_access = 0
         self.num_access_counter = 0
 
         # Instantiate EDRAM, valid and counter fields
-        self.mem  = edram (cfg.edram_size*1024/(cfg.data_width/8)) #edram_size is in KB
-        self.valid  = [0] * (cfg.edram_size*1024/(cfg.data_width/8)) #edram_size is in KB
-        self.counter  = [0] * (cfg.edram_size*1024/(cfg.data_width/8)) #edram_size is in KB
+        self.mem  = edram (self.cfg.edram_size*1024/(self.cfg.data_width/8), config = config) #edram_size is in KB
+        self.valid  = [0] * (self.cfg.edram_size*1024/(self.cfg.data_width/8)) #edram_size is in KB
+        self.counter  = [0] * (self.cfg.edram_size*1024/(self.cfg.data_width/8)) #edram_size is in KB
 
         # Define latency
-        self.latency = param.edram_lat
+        self.latency = self.param.edram_lat
 
         # Last served IMA
         self.lastIdx = -1
@@ -137,15 +142,15 @@ class edram_controller (object):
         if (len(ren_list) > 1):
             if ((1 in ren_list[self.lastIdx+1:]) or (1 in wen_list[self.lastIdx+1:])):
                 idx1 = ren_list[self.lastIdx+1:].index(1) if any(ren_list[self.lastIdx+1:]) \
-                        else param.infinity
+                        else self.param.infinity
                 idx2 = wen_list[self.lastIdx+1:].index(1) if any(wen_list[self.lastIdx+1:]) \
-                        else param.infinity
+                        else self.param.infinity
                 return (self.lastIdx+1) + min (idx1, idx2)
             else:
                 idx1 = ren_list[0:self.lastIdx+1].index(1) if any(ren_list[0:self.lastIdx+1]) \
-                        else param.infinity
+                        else self.param.infinity
                 idx2 = wen_list[0:self.lastIdx+1].index(1) if any(wen_list[0:self.lastIdx+1]) \
-                        else param.infinity
+                        else self.param.infinity
                 return min (idx1, idx2)
         else: # for one IMA case only
             return 0
@@ -159,11 +164,11 @@ class edram_controller (object):
         # Traverse the WEN(s) and REN(s) to find the ima to be served
         found = 0
         count = 0
-        while (found == 0 and count < cfg.num_ima):
+        while (found == 0 and count < self.cfg.num_ima):
             count = count + 1
             # choose the ima to be served
             idx = self.find_next (ren_list, wen_list)
-            assert (idx < cfg.num_ima), 'Find Error: IMA Index not possible'
+            assert (idx < self.cfg.num_ima), 'Find Error: IMA Index not possible'
             self.lastIdx = idx # update last index
 
             # based on ren and wen perfrom the required action
@@ -0,0 +1,56 @@
+# Single-tile replay from recorded noc traffic
+# A run with --record logs every packet delivered by the noc (see node.node_run): cycle, source & destination tile,
+# vtile_id and data. A replay simulates one tile on its own - no other tiles or noc:
+# 1. arrivals - packets recorded for the tile are written to its receive buffer in their cycle (retried in later
+#    cycles if the receive buffer entry is full - e.g. the tile's program was changed)
+# 2. departures - the tile's send_queue head leaves in the cycle its n-th packet left in the recorded run (packets
+#    sent beyond the recorded ones leave after the noc latency)
+# An unchanged tile (program & config) is simulated exactly as in the recorded run
+
+import numpy as np
+
+import node_modules as nmod
+
+### Save (load) the delivered packets (list of dicts: cycle, src, dst, vtile_id, data) to (from) the record file
+def save_record (filename, record_list):
+    np.save (filename, record_list)
+
+def load_record (filename):
+    return list (np.load (filename))
+
+### Simulate the tile (tile_id in the recorded node) till it halts - returns the number of cycles
+def tile_replay (temp_tile, tile_id, record_list, fid, cycles_max):
+    arrival_list = [record for record in record_list if (record['dst'] == tile_id)]
+    departure_list = [record['cycle'] for record in record_list if (record['src'] == tile_id)]
+    noc = nmod.noc (temp_tile.config)
+    pending_list = []
+    arrival_count = 0
+    departure_count = 0
+    cycle = 0
+    while (not temp_tile.tile_halt and cycle < cycles_max):
+        temp_tile.tile_run (cycle, fid)
+
+        # departures (tiles are simulated before noc transfers in a cycle - see node.node_run)
+        if (temp_tile.send_queue):
+            temp_queue_head = temp_tile.send_queue[0]
+            if (departure_count < len(departure_list)):
+                depart = (cycle >= departure_list[departure_count])
+            else:
+                transfer_latency = noc.getLatency (temp_queue_head.target_addr, tile_id) + \
+                        temp_tile.receive_buffer.getLatency()
+                depart = ((cycle - temp_queue_head.cycle) >= transfer_latency-1)
+            if (depart):
+                temp_tile.send_queue.popleft()
+                departure_count += 1
+
+        # arrivals
+        while (arrival_count < len(arrival_list) and arrival_list[arrival_count]['cycle'] <= cycle):
+            pending_list.append (arrival_list[arrival_count])
+            arrival_count += 1
+        temp_list = []
+        for record in pending_list:
+            if (not temp_tile.receive_buffer.write (record['vtile_id'], record['data'])):
+                temp_list.append (record)
+        pending_list = temp_list
+        cycle += 1
+    return cycle
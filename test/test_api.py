@@ -0,0 +1,165 @@
+# Regression of the simulation apis on a test net (test/testasm/<net>)
+# The net is run with DPE.run (reference), then through the apis of check_list - the outputs, cycles and metric_dict
+# they return are compared with the reference's output.txt, harwdare_stats.txt and metric_dict.
+# Traces of the reference go to a temporary directory, the simulator's output goes to test/traces/<net>_api.log
+#
+# python2 test/test_api.py                      - all apis on tbnet
+# python2 test/test_api.py -n tbnet2 -c session - some apis (see check_list)
+
+import os
+import sys
+import csv
+import time
+import signal
+import shutil
+import tempfile
+import argparse
+import multiprocessing
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, 'src'))
+os.environ.setdefault('MPLBACKEND', 'Agg') # record_xbar imports pyplot
+
+import dpe
+import dpe_session
+import dpe_server
+import dpe_sweep
+
+
+# Reference of net - [output values (output.txt lines), cycles, metric_dict]
+def run_reference (net):
+    metric_dict = dpe.DPE().run(net, heartbeat = 0)
+    fid = open(dpe.trace_path + net + '/output.txt')
+    output_list = fid.read().split('\n')[1:-1] # 'EDRAM contents' and a value per line
+    fid.close()
+    return [output_list, metric_dict['cycles'], metric_dict]
+
+# Differences of an api's output (values), cycles & metric_dict from the reference's - [] if the same
+def compare (ref, output, cycles, metric_dict):
+    [ref_output, ref_cycles, ref_metric_dict] = ref
+    diff_list = []
+    if ([str(float(value)) for value in output] != ref_output):
+        diff_list.append('output differs')
+    if (cycles != ref_cycles):
+        diff_list.append('cycles ' + str(cycles) + ' (reference ' + str(ref_cycles) + ')')
+    if (metric_dict != None and metric_dict != ref_metric_dict):
+        diff_list.append('metric_dict differs: ' + str(metric_dict))
+    return diff_list
+
+
+### session - an inference of a dpe_session with the net's input
+def check_session (net, ref):
+    session = dpe_session.dpe_session(net)
+    [output, metric_dict] = session.infer(session.input_dict['data'])
+    return compare(ref, output, session.cycle, metric_dict)
+
+# Replies of a job submitted to the server at address - status -> reply (the last of a status)
+def submit_job (address, job):
+    return dict([(msg['status'], msg) for msg in dpe_server.submit(address, job)])
+
+### server - the job server on a temporary unix socket: the net runs twice (cold, then on the warm worker), then with a
+# config of its default values (cold - a config is part of the session key, same results); with a max_memory below the net's footprint a job of a missing net fails, the net runs (footprint unknown) and a job after
+# it is rejected
+def check_server (net, ref):
+    socket_dir = tempfile.mkdtemp()
+    diff_list = []
+    config_job = {'net': net, 'config': {'noc_contention': 0}}
+    for [max_memory, job_list] in [[0, [{'net': net}, {'net': net}, config_job]], \
+            [1, [{'net': 'no_net'}, {'net': net}, {'net': net}]]]:
+        address = socket_dir + '/dpe.sock'
+        proc = multiprocessing.Process(target=dpe_server.serve, args=(address, 1, max_memory))
+        proc.start()
+        while (not os.path.exists(address)):
+            time.sleep(0.1)
+        reply_list = [submit_job(address, job) for job in job_list]
+        os.kill(proc.pid, signal.SIGINT) # the server stops its workers
+        proc.join()
+
+        if (max_memory == 0):
+            for k in range(len(reply_list)):
+                reply_dict = reply_list[k]
+                if ('done' not in reply_dict):
+                    diff_list.append('job ' + str(k) + ' not done: ' + str(reply_dict))
+                    continue
+                if (reply_dict['running']['warm'] != (k > 0 and job_list[k] == job_list[k-1])):
+                    diff_list.append('job ' + str(k) + ' warm ' + str(reply_dict['running']['warm']))
+                result = reply_dict['result']
+                diff_list += compare(ref, result['output'], result['cycles'], None)
+        else:
+            if ('error' not in reply_list[0]):
+                diff_list.append('job of a missing net did not fail: ' + str(reply_list[0]))
+            if ('done' not in reply_list[1]):
+                diff_list.append('max_memory: first job not done: ' + str(reply_list[1]))
+            if ('rejected' not in reply_list[2]):
+                diff_list.append('max_memory: job not rejected: ' + str(reply_list[2]))
+    shutil.rmtree(socket_dir, ignore_errors = True)
+    return diff_list
+
+### sweep - a sweep of 2 points (with and without fast-forward) in 2 processes, the metrics of both rows of its table
+# are the reference's
+def check_sweep (net, ref):
+    table_dir = tempfile.mkdtemp()
+    table_file = table_dir + '/sweep.csv'
+    dpe_sweep.run_sweep({'net': [net], 'fast_forward': [0, 1]}, table_file, 2)
+    fid = open(table_file)
+    row_list = list(csv.DictReader(fid))
+    fid.close()
+    shutil.rmtree(table_dir, ignore_errors = True)
+    diff_list = []
+    if (len(row_list) != 2):
+        diff_list.append(str(len(row_list)) + ' rows')
+    for row in row_list:
+        if (row['status'] != 'ok'):
+            diff_list.append(row['point'] + ': ' + row['status'])
+            continue
+        for name in dpe_sweep.metric_list:
+            if (float(row[name]) != ref[2][name]): # written as repr
+                diff_list.append(row['point'] + ': ' + name + ' ' + row[name] + ' (reference ' + \
+                        repr(ref[2][name]) + ')')
+    return diff_list
+
+check_list = [
+    ['session', check_session],
+    ['server', check_server],
+    ['sweep', check_sweep],
+]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--net", help="Net to check (default tbnet).", default='tbnet')
+    parser.add_argument(
+        "-c", "--check", help="Apis to check (default all): " + ' '.join([check[0] for check in check_list]) + ".",
+        nargs='+', default=[check[0] for check in check_list])
+    args = parser.parse_args()
+
+    if (not os.path.exists(dpe.trace_path)): # not in a clean checkout
+        os.makedirs(dpe.trace_path)
+    log_file = dpe.trace_path + args.net + '_api.log'
+    stdout = sys.stdout
+    dpe.trace_path = tempfile.mkdtemp() + '/'
+    sys.stdout = open(log_file, 'w')
+    sys.stderr = sys.stdout
+    ref = run_reference(args.net)
+    sys.stdout.flush()
+    stdout.write(args.net + ': reference ' + str(ref[1]) + ' cycles\n')
+
+    num_fail = 0
+    for [name, check_func] in check_list:
+        if (name not in args.check):
+            continue
+        print('### ' + name)
+        diff_list = check_func(args.net, ref)
+        sys.stdout.flush()
+        if (diff_list):
+            num_fail += 1
+            stdout.write(args.net + ' ' + name + ': FAIL\n')
+            for diff in diff_list:
+                stdout.write('    ' + diff + '\n')
+        else:
+            stdout.write(args.net + ' ' + name + ': same\n')
+        stdout.flush()
+    shutil.rmtree(dpe.trace_path, ignore_errors = True)
+    stdout.write(str(num_fail) + ' failed\n')
+    sys.exit(1 if num_fail else 0)
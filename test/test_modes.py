@@ -0,0 +1,284 @@
+# Equivalence regression of the simulation modes on the test nets (test/testasm/tbnet*)
+# Each net is run cycle-by-cycle (reference), then in every mode of mode_list - output.txt, harwdare_stats.txt and
+# noc_stats.txt of the exact modes' runs are compared with the reference's (output.txt only for functional, dedup and
+# sample, see mode_list), then again in the passes of pass_list with their config values.
+# A run is a process of its own with the config values of its net (net_dict, see dpe_config.make_config), the
+# simulator's output goes to test/traces/<net>_modes.log
+#
+# python2 test/test_modes.py                                   - all nets & modes
+# python2 test/test_modes.py -n tbnet tbnet2 -m parallel resume - some nets & modes (see mode_list)
+
+import os
+import sys
+import shutil
+import difflib
+import tempfile
+import argparse
+import multiprocessing
+import numpy as np
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(root_dir, 'src'))
+os.environ.setdefault('MPLBACKEND', 'Agg') # record_xbar imports pyplot
+
+import dpe
+import dpe_config
+import node
+import node_checkpoint
+import tile_dedup
+
+# 4 compute tiles in logical nodes of 2 - multi-node mode runs 2 node partitions
+n2_dict = {'num_tile_compute': 4, 'num_tile_max': 2.0}
+
+# test nets & the config values they need
+net_dict = {
+    'tbnet': {}, # 4 tiles - halts at cycle 1954
+    'tbnet2': {}, # 4 tiles, heavy traffic
+    'tbnet3': {'cycles_max': 20000}, # deadlocks - runs till cycles_max
+    'tbnet4': n2_dict, 'tbnet5': n2_dict, 'tbnet6': n2_dict, # traffic between logical nodes
+    'tbnet7': n2_dict, 'tbnet13': n2_dict, # replicated compute tiles (--dedup)
+    'tbnet8': {}, 'tbnet9': {}, 'tbnet10': {}, # long core loops (ld/mvm/st)
+    'tbnet11': {}, # ld/st-free core loops (--loop_forward)
+    'tbnet12': {'num_tile_compute': 168, 'num_ima': 1, 'xbar_size': 32}, # 170 tiles - all send to tile 1
+}
+
+# modes - [name, dpe.run options of each run] - results of every run are compared with the reference's
+# ('config' - config values of the run in place of the net's)
+# snapshot/cache - the first run misses (programs/simulates & saves), the second hits
+# resume - checkpoints at the half of the reference run, resumes from it
+# replay - records the noc, replays the output tile (its output.txt is compared)
+# deadlock - the window is shorter than the latency of a core pipeline, it must not abort a running net
+# contention - the link contention model with packets of no width (links are never held)
+# functional - no timing, its output.txt is compared
+# dedup - approximate timing, its output.txt is compared and its harwdare_stats.txt must be labelled APPROXIMATE
+# sample - approximate timing, its output.txt is compared and the reference cycles must be in its confidence bound
+mode_list = [
+    ['fast_forward', [{'fast_forward': 1}]],
+    ['active_set', [{'active_set': 1}]],
+    ['active_fast', [{'active_set': 1, 'fast_forward': 1}]],
+    ['parallel', [{'num_proc': 2}]],
+    ['multi_node', [{'multi_node': 1}]],
+    ['transaction', [{'transaction': 1}]],
+    ['loop_forward', [{'loop_forward': 1}]],
+    ['snapshot', [{'snapshot': 1}, {'snapshot': 1}]],
+    ['cache', [{'cache': 1}, {'cache': 1}]],
+    ['resume', [{'checkpoint': 0}, {'resume': 1}]],
+    ['replay', [{'record': 1}, {'replay': 0}]],
+    ['deadlock', [{'deadlock_window': 1000}]],
+    ['contention', [{'config': {'noc_contention': 1, 'packet_width': 0}}]],
+    ['functional', [{'functional': 1}]],
+    ['dedup', [{'dedup': 1}]],
+    ['sample', [{'sample': 4}]],
+]
+# modes of nets that halt - -t counts accesses ahead of time, a deadlocked net aborts (stats at cycles_max differ)
+halt_mode_list = ['transaction', 'deadlock']
+# passes - [name, config values, nets, modes] - the nets are run again with the config values (reference too) in the
+# modes of the pass
+# cmesh - noc latency by the route in a concentrated mesh of a tile per router (routes of several hops), on a net with
+#   traffic between logical nodes
+# contention - the link contention model (packets hold the links of their routes), on a net with heavy traffic - the
+#   reference must have waited for links (contention wait cycles in noc_stats.txt)
+pass_list = [
+    ['cmesh', {'noc_model': 'cmesh', 'cmesh_c': 1}, ['tbnet4'],
+            ['fast_forward', 'active_set', 'active_fast', 'parallel', 'multi_node']],
+    ['contention', {'noc_contention': 1}, ['tbnet2'], ['fast_forward', 'active_set', 'active_fast']],
+]
+# modes run only on some nets - nets with replicated compute tiles (dedup), with long core loops (sample)
+mode_net_dict = {'dedup': ['tbnet7', 'tbnet13'], 'sample': ['tbnet8', 'tbnet10']}
+
+result_list = ['output.txt', 'harwdare_stats.txt', 'noc_stats.txt']
+
+
+### Run net with options (dpe.run arguments) in a process of its own - returns 1 if it finished
+def run_process (net, option_dict, log_file):
+    sys.stdout = open(log_file, 'a')
+    sys.stderr = sys.stdout
+    print('### ' + net + ' ' + str(option_dict))
+    option_dict = dict(option_dict)
+    config_dict = dict(net_dict[net])
+    config_dict.update(option_dict.pop('config', {}))
+    config = dpe_config.make_config(config_dict)
+    dpe.DPE(config).run(net, heartbeat = 0, **option_dict)
+    sys.stdout.flush()
+
+def run_net (net, option_dict, log_file):
+    proc = multiprocessing.Process(target=run_process, args=(net, option_dict, log_file))
+    proc.start()
+    proc.join()
+    return (proc.exitcode == 0)
+
+# Contents of the files of name_list in trace_dir (None - missing)
+def read_files (trace_dir, name_list):
+    file_dict = {}
+    for name in name_list:
+        file_dict[name] = None
+        if (os.path.exists(trace_dir + name)):
+            fid = open(trace_dir + name)
+            file_dict[name] = fid.read()
+            fid.close()
+    return file_dict
+
+# Cycles of a run (harwdare_stats.txt)
+def get_cycles (stats_text):
+    for line in stats_text.split('\n'):
+        if (line.startswith('cycles:')):
+            return int(line.split()[1])
+    return None
+
+# Contention wait cycles of a run (noc_stats.txt)
+def get_wait_cycles (stats_text):
+    for line in stats_text.split('\n'):
+        if (line.startswith('contention wait cycles:')):
+            return int(line.split()[3])
+    return None
+
+# Cycle bound [low, high] of a sampled run (sampling_stats.txt)
+def get_cycle_bound (stats_text):
+    for line in stats_text.split('\n'):
+        if (line.startswith('cycles:')):
+            return [int(value) for value in line.split('[')[1].rstrip(']').split(',')]
+    return None
+
+# Differences (first lines of a diff) of the files of ref_dict & file_dict - [] if the same
+def compare (ref_dict, file_dict):
+    diff_list = []
+    for name in sorted(ref_dict):
+        if (file_dict[name] == None):
+            diff_list.append(name + ' missing')
+        elif (file_dict[name] != ref_dict[name]):
+            diff = difflib.unified_diff(ref_dict[name].split('\n'), file_dict[name].split('\n'), lineterm = '')
+            diff_list.append(name + ' differs\n' + '\n'.join(list(diff)[2:12]))
+    return diff_list
+
+
+### Run net cycle-by-cycle, then in the modes of name_list - returns the number of failed modes
+# pass_name/pass_dict - a pass of pass_list (config values of all its runs, the reference's too)
+def check_net (net, name_list, pass_name = '', pass_dict = {}):
+    name_list = [name for name in name_list if (name not in mode_net_dict or net in mode_net_dict[name])]
+    if (not name_list):
+        return 0
+    config_dict = dict(net_dict[net])
+    config_dict.update(pass_dict)
+    config = dpe_config.make_config(config_dict)
+    trace_dir = dpe.trace_path + net + '/'
+    if (not os.path.exists(dpe.trace_path)): # not in a clean checkout
+        os.makedirs(dpe.trace_path)
+    log_file = dpe.trace_path + net + ('_' + pass_name if pass_name else '') + '_modes.log'
+    if (os.path.exists(log_file)):
+        os.remove(log_file)
+    if (pass_name):
+        net_name = net + ' ' + pass_name
+    else:
+        net_name = net
+
+    shutil.rmtree(trace_dir, ignore_errors = True)
+    if (not run_net(net, {'config': pass_dict}, log_file)):
+        print(net_name + ': reference run failed (see ' + log_file + ')')
+        return 1
+    ref_dict = read_files(trace_dir, result_list)
+    cycles = get_cycles(ref_dict['harwdare_stats.txt'])
+    halt = (cycles < config.cfg.cycles_max)
+    print(net_name + ': reference ' + str(cycles) + ' cycles' + ('' if halt else ' (no halt)'))
+    num_fail = 0
+    if (config.cfg.noc_contention and config.cfg.packet_width and not get_wait_cycles(ref_dict['noc_stats.txt'])):
+        print(net_name + ': FAIL (no contention wait cycles in the reference)')
+        num_fail += 1
+
+    # runs of a mode start from a clean snapshot & result cache
+    snapshot_dir = dpe.snapshot_path + node_checkpoint.snapshot_key(dpe.compiler_path + net + '/', config)
+    for [name, run_list] in mode_list:
+        if (name not in name_list or (name in halt_mode_list and not halt)):
+            continue
+        shutil.rmtree(snapshot_dir, ignore_errors = True)
+        cache_dir = tempfile.mkdtemp()
+        diff_list = []
+        for option_dict in run_list:
+            option_dict = dict(option_dict)
+            option_dict['config'] = dict(pass_dict, **option_dict.get('config', {}))
+            name_dict = dict([(temp_name, temp_name) for temp_name in result_list])
+            if ('cache' in option_dict):
+                option_dict['cache_dir'] = cache_dir + '/'
+            if ('checkpoint' in option_dict):
+                option_dict['checkpoint'] = max(1, cycles / 2)
+            if ('replay' in option_dict):
+                option_dict['replay'] = config.cfg.num_tile - 1
+                name_dict = {'output.txt': 'replay/tile' + str(config.cfg.num_tile - 1) + '/output.txt'}
+            if ('functional' in option_dict or 'dedup' in option_dict or 'sample' in option_dict):
+                name_dict = {'output.txt': 'output.txt'}
+            # resume & replay read the trace directory of the run before
+            if (not ('resume' in option_dict or 'replay' in option_dict)):
+                shutil.rmtree(trace_dir, ignore_errors = True)
+            if (not run_net(net, option_dict, log_file)):
+                diff_list.append('run ' + str(option_dict) + ' failed (see ' + log_file + ')')
+                break
+            file_dict = read_files(trace_dir, [name_dict[temp_name] for temp_name in name_dict])
+            diff_list += compare(dict([(temp_name, ref_dict[temp_name]) for temp_name in name_dict]), \
+                    dict([(temp_name, file_dict[name_dict[temp_name]]) for temp_name in name_dict]))
+            if ('dedup' in option_dict):
+                stats_text = read_files(trace_dir, ['harwdare_stats.txt'])['harwdare_stats.txt']
+                if (stats_text == None or not stats_text.startswith('APPROXIMATE: tile deduplication')):
+                    diff_list.append('harwdare_stats.txt not labelled APPROXIMATE')
+            if ('sample' in option_dict):
+                stats_text = read_files(trace_dir, ['sampling_stats.txt'])['sampling_stats.txt']
+                cycle_bound = get_cycle_bound(stats_text) if (stats_text != None) else None
+                if (cycle_bound == None or not (cycle_bound[0] <= cycles <= cycle_bound[1])):
+                    diff_list.append('reference cycles ' + str(cycles) + ' not in the bound ' + str(cycle_bound))
+        shutil.rmtree(cache_dir, ignore_errors = True)
+        shutil.rmtree(snapshot_dir, ignore_errors = True)
+        if (diff_list):
+            num_fail += 1
+            print(net_name + ' ' + name + ': FAIL')
+            for diff in diff_list:
+                print('    ' + diff.replace('\n', '\n    '))
+        else:
+            print(net_name + ' ' + name + ': same')
+        sys.stdout.flush()
+    return num_fail
+
+### Dedup refusal - tbnet13 with the sends of follower tile 2 retargeted to its representative (tile 1), which then
+# waits for its follower - dedup_init must refuse it. Returns 1 if it didn't
+def check_dedup_refusal ():
+    net = 'tbnet13'
+    config = dpe_config.make_config(net_dict[net])
+    temp_dir = tempfile.mkdtemp()
+    instrnpath = temp_dir + '/' + net + '/'
+    shutil.copytree(dpe.compiler_path + net, instrnpath)
+    instrn_list = np.load(instrnpath + 'tile2/tile_imem.npy')
+    for instrn in instrn_list:
+        if (instrn['opcode'] == 'send'):
+            instrn['r2'] = 1
+    np.save(instrnpath + 'tile2/tile_imem.npy', instrn_list)
+    error = ''
+    try:
+        tile_dedup.dedup_init(node.node(0, config, []), instrnpath)
+    except AssertionError as e:
+        error = str(e)
+    shutil.rmtree(temp_dir, ignore_errors = True)
+    if (not error.startswith('Dedup Error: tile 1 (representative) waits for data from its follower tile 2')):
+        print(net + ' dedup refusal: FAIL (' + (error if error else 'not refused') + ')')
+        return 1
+    print(net + ' dedup refusal: refused')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-n", "--net", help="Nets to check (default all).", nargs='+', default=sorted(net_dict))
+    parser.add_argument(
+        "-m", "--mode", help="Modes to check (default all): " + ' '.join([mode[0] for mode in mode_list]) + ".",
+        nargs='+', default=[mode[0] for mode in mode_list])
+    args = parser.parse_args()
+
+    num_fail = 0
+    for net in args.net:
+        assert (net in net_dict), 'unknown net ' + net
+        num_fail += check_net(net, args.mode)
+        for [pass_name, pass_dict, pass_net_list, pass_mode_list] in pass_list:
+            if (net in pass_net_list):
+                num_fail += check_net(net, [name for name in args.mode if (name in pass_mode_list)], pass_name, \
+                        pass_dict)
+    if ('dedup' in args.mode and 'tbnet13' in args.net):
+        num_fail += check_dedup_refusal()
+    print(str(num_fail) + ' failed')
+    sys.exit(1 if num_fail else 0)